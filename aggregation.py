@@ -0,0 +1,36 @@
+from response_parser import CATEGORIES, SENTIMENTS
+
+def review_frame(reviews):
+    # One row per review, in review order, with the rating and analysis tags as columns
+    import pandas as pd
+    analyses = [review.get('analysis') or {} for review in reviews]
+    frame = pd.DataFrame({
+        'rating': [review.get('rating') for review in reviews],
+        'sentiment': [analysis.get('sentiment') for analysis in analyses],
+        'category': [analysis.get('category') for analysis in analyses],
+    })
+    frame['rating'] = pd.to_numeric(frame['rating'], errors='coerce')
+    return frame
+
+def summarize_reviews(reviews):
+    # Every aggregate the report and results page need, from one frame.
+    # Reviews without an analysis count as NEUTRAL / SATISFACTION.
+    frame = review_frame(reviews)
+    sentiment = frame['sentiment'].fillna('NEUTRAL')
+    category = frame['category'].fillna('SATISFACTION')
+    sentiment_counts = sentiment.value_counts()
+    category_counts = category.value_counts()
+    ratings = frame['rating'].dropna()
+    total = len(frame)
+    positive = int(sentiment_counts.get('POSITIVE', 0))
+    return {
+        'total': total,
+        'rated': len(ratings),
+        'avg_rating': float(ratings.mean()) if len(ratings) else None,
+        'sentiments': {name: int(sentiment_counts.get(name, 0)) for name in SENTIMENTS},
+        'categories': {name: int(category_counts.get(name, 0)) for name in CATEGORIES},
+        'positive_percent': positive / total * 100 if total else 0,
+        # Review positions per analysed category, in review order
+        'category_groups': {name: [int(p) for p in positions] for name, positions
+                            in frame.groupby('category', sort=False).indices.items()},
+    }
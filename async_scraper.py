@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from rate_limiter import RETRY_STATUS_CODES, retry_after_seconds
+from review_index import ReviewIndex
+from scraper import HTTP_USER_AGENT
+from stamped_parser import (
+    STAMPED_REVIEWS_API, extract_widget_html, parse_reviews, parse_total_reviews, parse_widget_config,
+    widget_page_params
+)
+
+logger = logging.getLogger(__name__)
+
+def _parse_page(html):
+    # Runs on the parse pool, timed there so queueing for a thread is not counted
+    start = time.perf_counter()
+    reviews = parse_reviews(html)
+    metrics.observe('page_extract_seconds', time.perf_counter() - start, engine='async')
+    metrics.inc('reviews_extracted_total', len(reviews), engine='async')
+    return reviews
+
+def _parse_total_reviews(page_html, widget_html):
+    return parse_total_reviews(page_html) or parse_total_reviews(widget_html)
+
+class AsyncJashanmalScraper:
+    # asyncio version of JashanmalScraper's HTTP engine for catalog refreshes.
+    # One aiohttp session keeps a pool of keep-alive connections shared by
+    # every product being scraped. The connector caps open connections in
+    # total and per host (every product's reviews come from the one Stamped
+    # host), and each product fetches at most `page_concurrency` widget pages
+    # at once. HTML is parsed on a small thread pool so the event loop keeps
+    # downloading in the meantime.
+    def __init__(self, verify_ssl=False, limit=100, limit_per_host=10, page_concurrency=4, http_timeout=15,
+                 stamped_api=STAMPED_REVIEWS_API, max_retries=2, backoff_factor=0.5, max_retry_delay=60.0,
+                 parse_workers=2):
+        self.verify_ssl = verify_ssl
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.page_concurrency = max(1, page_concurrency)
+        self.http_timeout = http_timeout
+        self.stamped_api = stamped_api
+        # Same retry policy as the requests session of the sync scraper,
+        # Retry-After included
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_delay = max_retry_delay
+        self._session = None
+        self._parse_executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix='review-parse')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        # aiohttp is imported with the first request, and the session has to
+        # be created inside the running event loop
+        if self._session is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ssl=self.verify_ssl, ttl_dns_cache=300)
+            # No total timeout: it would include the wait for a free connection,
+            # and with hundreds of pages queued on the one Stamped host, pages
+            # that never started would time out. Connecting and each read are
+            # bounded instead.
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': HTTP_USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.http_timeout,
+                                              sock_read=self.http_timeout)
+            )
+        return self._session
+
+    async def _get(self, url, params=None):
+        import aiohttp
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff_factor * 2 ** attempt
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                        response.raise_for_status()
+                        return await response.text()
+                    retry_after = retry_after_seconds(response.headers)
+                    if retry_after is not None:
+                        delay = min(self.max_retry_delay, retry_after)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+            metrics.inc('async_http_retries_total')
+            await asyncio.sleep(delay)
+
+    async def _parse(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._parse_executor, function, *args)
+
+    async def _fetch_widget_page(self, widget, page):
+        start = time.perf_counter()
+        body = await self._get(self.stamped_api, widget_page_params(widget, page))
+        metrics.observe('page_load_seconds', time.perf_counter() - start, engine='async')
+        return extract_widget_html(body)
+
+    async def _fetch_page_reviews(self, widget, page):
+        return await self._parse(_parse_page, await self._fetch_widget_page(widget, page))
+
+    async def iter_reviews(self, url, max_reviews=None, index=None, known=None):
+        # Yields one product's reviews in page order (newest first), as the
+        # pages arrive. Duplicates are dropped through `index`, and with `known`
+        # the walk stops at the first already known review, as in JashanmalScraper.
+        index = index if index is not None else ReviewIndex()
+        start = time.perf_counter()
+        html = await self._get(url)
+        metrics.observe('product_page_load_seconds', time.perf_counter() - start, engine='async')
+
+        widget = await self._parse(parse_widget_config, html, url)
+        if widget is None or not widget['product_id'] or not widget['api_key']:
+            logger.info(f"Stamped widget settings not found in page HTML: {url}")
+            return
+
+        page_html = await self._fetch_widget_page(widget, 1)
+        total_reviews = await self._parse(_parse_total_reviews, page_html, widget['html'])
+        pages = [await self._parse(_parse_page, page_html)]
+        limit = max_reviews or total_reviews
+        # Without a review count, pages are walked until one comes back empty
+        last_page = math.ceil(limit / len(pages[0])) if limit and pages[0] else None
+        logger.info(f"Found {total_reviews} total reviews for {url}")
+
+        count = 0
+        page = 1
+        while pages:
+            for page_reviews in pages:
+                new_reviews = 0
+                for review in page_reviews:
+                    if known is not None and review in known:
+                        return
+                    if not index.add(review):
+                        continue
+                    new_reviews += 1
+                    count += 1
+                    yield review
+                    if max_reviews and count >= max_reviews:
+                        return
+                # An empty or repeated page means we ran past the last one
+                if not new_reviews:
+                    return
+
+            window = range(page + 1, page + 1 + self.page_concurrency)
+            if last_page is not None:
+                window = range(window.start, min(window.stop, last_page + 1))
+            pages = await asyncio.gather(*(self._fetch_page_reviews(widget, number) for number in window))
+            page = window.stop - 1
+
+    async def scrape_reviews(self, url, max_reviews=None, index=None, known=None):
+        return [review async for review in self.iter_reviews(url, max_reviews, index, known)]
+
+    async def scrape_products(self, urls, concurrency=50, max_reviews=None):
+        # Scrapes many products at once and yields (url, reviews, error) as
+        # each one finishes. `urls` can be any iterable and is read lazily, so
+        # no more than `concurrency` products are held in memory at a time.
+        async def scrape(url):
+            try:
+                return url, await self.scrape_reviews(url, max_reviews), None
+            except Exception as e:
+                logger.warning(f"Scraping {url} failed: {str(e)}")
+                return url, None, e
+
+        urls = iter(urls)
+        pending = set()
+        try:
+            while True:
+                for url in urls:
+                    pending.add(asyncio.ensure_future(scrape(url)))
+                    if len(pending) >= concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # The consumer stopped early, do not leave scrapes running
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._parse_executor.shutdown(wait=False)
+
+async def _main(urls):
+    async with AsyncJashanmalScraper() as scraper:
+        async for url, reviews, error in scraper.scrape_products(urls):
+            record = {'url': url, 'reviews': reviews} if error is None else {'url': url, 'error': str(error)}
+            print(json.dumps(record, ensure_ascii=False))
+
+if __name__ == '__main__':
+    # python async_scraper.py URL... prints one JSON line per product
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,49 @@
+import math
+import re
+
+# Budgets for one batch prompt and its response
+MAX_INPUT_TOKENS = 6000
+MAX_OUTPUT_TOKENS = 2400
+MAX_REVIEWS_PER_BATCH = 25
+
+# Rough output allowance per review (summary plus tags)
+OUTPUT_TOKENS_PER_REVIEW = 80
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text):
+    # Mistral's tokenizer averages about four characters per token on English
+    # text, punctuation-heavy or non-Latin text runs closer to one per word piece
+    if not text:
+        return 0
+    return math.ceil(max(len(text) / 4, len(_WORD_RE.findall(text)) * 1.3))
+
+def format_review(number, review):
+    return f"Review {number}:\nTitle: {review.get('title', '')}\nText: {review.get('text', '')}"
+
+def review_tokens(review):
+    # Numbered the same way as in the prompt, plus the separator
+    return estimate_tokens(format_review(99, review)) + 2
+
+def plan_batches(reviews, indices=None, prompt_tokens=0, max_input_tokens=MAX_INPUT_TOKENS,
+                 max_output_tokens=MAX_OUTPUT_TOKENS, max_reviews=MAX_REVIEWS_PER_BATCH,
+                 output_tokens_per_review=OUTPUT_TOKENS_PER_REVIEW):
+    # Packs reviews in order into batches that fit the token budgets and returns
+    # lists of review indices. A review too long for any batch gets one of its own.
+    indices = range(len(reviews)) if indices is None else indices
+    max_per_batch = max(1, min(max_reviews, max_output_tokens // output_tokens_per_review))
+
+    batches = []
+    current = []
+    used = prompt_tokens
+    for i in indices:
+        cost = review_tokens(reviews[i])
+        if current and (used + cost > max_input_tokens or len(current) >= max_per_batch):
+            batches.append(current)
+            current = []
+            used = prompt_tokens
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
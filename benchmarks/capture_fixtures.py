@@ -0,0 +1,70 @@
+import argparse
+import itertools
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stamped_fixtures import FIXTURES_DIR, _REVIEW_RE
+
+# Stand-ins for the store's Stamped credentials in the committed fixtures
+BENCH_API_KEY = 'pubkey-bench0000000000000000000000000'
+BENCH_STORE_ID = '123456'
+
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_AUTHOR_RE = re.compile(r'(<strong class="author"[^>]*>)[^<]*(</strong>)')
+_AVATAR_RE = re.compile(r'(class="stamped-review-avatar-content"[^>]*>)[^<]*(<)')
+_NAME_ATTR_RE = re.compile(r'(data-(?:author|reviewer|reviewer-name|name-initials)=")[^"]*(")')
+_STORE_ID_RE = re.compile(r'(data-store-id=["\']|sId["\']?\s*[:=]\s*["\']?)\d+')
+_COUNT_RE = re.compile(r'(data-count=")\d+(")')
+_BASED_ON_RE = re.compile(r'Based on \d+ Reviews')
+
+def scrub(html, api_key):
+    # Removes the store's credentials and the reviewers' personal details,
+    # and turns the review count into the {total} placeholder StampedFixtures fills in
+    if api_key:
+        html = html.replace(api_key, BENCH_API_KEY)
+    html = _STORE_ID_RE.sub(lambda match: match.group(1) + BENCH_STORE_ID, html)
+    html = _EMAIL_RE.sub('customer@example.com', html)
+    authors = itertools.count(1)
+    html = _AUTHOR_RE.sub(lambda match: f"{match.group(1)}Customer {next(authors)}{match.group(2)}", html)
+    html = _AVATAR_RE.sub(r'\1C\2', html)
+    html = _NAME_ATTR_RE.sub(r'\1Customer\2', html)
+    html = _COUNT_RE.sub(r'\1{total}\2', html)
+    return _BASED_ON_RE.sub('Based on {total} Reviews', html)
+
+def capture(url, stamped_api=None):
+    # The product page and the first widget page, fetched like the HTTP engine does
+    from scraper import JashanmalScraper
+    from stamped_parser import STAMPED_REVIEWS_API, parse_reviews, parse_widget_config
+    scraper = JashanmalScraper(engine='http', stamped_api=stamped_api or STAMPED_REVIEWS_API)
+    response = scraper._http_session().get(url, timeout=scraper.http_timeout)
+    response.raise_for_status()
+    widget = parse_widget_config(response.text, url)
+    if widget is None or not widget['product_id'] or not widget['api_key']:
+        raise RuntimeError(f"No Stamped widget settings found on {url}")
+    widget_page = scraper._fetch_widget_page(widget, 1)
+
+    product_html = scrub(response.text, widget['api_key'])
+    widget_html = scrub(widget_page, widget['api_key'])
+    # StampedFixtures repeats the reviews it splits out of the page, a
+    # markup change that breaks the split would make every benchmark page empty
+    reviews = len(parse_reviews(widget_html))
+    if not reviews or len(_REVIEW_RE.findall(widget_html)) != reviews:
+        raise RuntimeError(f"Could not split the {reviews} reviews of the captured widget page, "
+                           f"update _REVIEW_RE in stamped_fixtures.py")
+    return product_html, widget_html
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Capture the benchmark fixtures from a live product page")
+    parser.add_argument('url', help="Product page with a Stamped reviews widget")
+    parser.add_argument('--output-dir', default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    product_html, widget_html = capture(args.url)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name, html in (('product_page.html', product_html), ('widget_page.html', widget_html)):
+        with open(os.path.join(args.output_dir, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+    print(f"Wrote scrubbed fixtures to {args.output_dir}", file=sys.stderr)
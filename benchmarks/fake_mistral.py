@@ -0,0 +1,207 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from types import SimpleNamespace
+
+from stamped_fixtures import BenchServer
+
+CHAT_PATH = '/v1/chat/completions'
+
+_REVIEW_RE = re.compile(r'^Review (\d+):\nTitle: (.*)\nText: (.*)$', re.M)
+
+NEGATIVE_WORDS = ('not', 'slow', 'fraying', 'thin', 'dented', 'stiff')
+CATEGORY_WORDS = (
+    ('DELIVERY', ('delivery', 'packed', 'arrived')),
+    ('AUTHENTICATION', ('genuine', 'photos')),
+    ('QUALITY', ('leather', 'stitching', 'zip', 'strap')),
+)
+
+def fake_analysis(number, title, text):
+    words = f"{title} {text}".lower()
+    sentiment = 'NEGATIVE' if any(word in words.split() for word in NEGATIVE_WORDS) else 'POSITIVE'
+    category = next((name for name, keys in CATEGORY_WORDS if any(key in words for key in keys)), 'SATISFACTION')
+    return {'id': number, 'summary': f"{title}: {text[:60]}", 'sentiment': sentiment, 'category': category}
+
+class FakeReplies:
+    # Builds Mistral-style answers for a batch prompt, in the format it asks
+    # for. A share of the answers is malformed the ways real ones have been:
+    # a review left out, a tag outside the schema, or the output cut short.
+    def __init__(self, malformed_rate=0.0, seed=0):
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.malformed = 0
+        self._lock = threading.Lock()
+
+    def reply(self, prompt):
+        items = [fake_analysis(int(number), title, text) for number, title, text in _REVIEW_RE.findall(prompt)]
+        with self._lock:
+            corruption = self.random.choice(('drop', 'schema', 'truncate')) \
+                if items and self.random.random() < self.malformed_rate else None
+            position = self.random.randrange(len(items)) if items else 0
+            if corruption:
+                self.malformed += 1
+        if corruption == 'drop':
+            items.pop(position)
+        elif corruption == 'schema':
+            items[position] = dict(items[position], sentiment='MOSTLY POSITIVE')
+
+        if 'JSON array' in prompt:
+            content = "```json\n" + json.dumps(items, indent=1) + "\n```"
+        else:
+            content = '\n\n'.join(
+                f"REVIEW {item['id']}:\nSUMMARY: {item['summary']}\nSENTIMENT: {item['sentiment']}\n"
+                f"CATEGORY: {item['category']}" for item in items
+            )
+        if corruption == 'truncate':
+            content = content[:len(content) * 2 // 3]
+        return content
+
+def _usage(prompt, content):
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(content) // 4
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}
+
+class CannedClient:
+    # In-process stand-in for MistralClient, for timing parsing without HTTP
+    def __init__(self, replies=None):
+        self.replies = replies or FakeReplies()
+        self.calls = 0
+
+    def chat(self, model, messages):
+        self.calls += 1
+        prompt = messages[-1].content
+        content = self.replies.reply(prompt)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(**_usage(prompt, content)),
+        )
+
+    def chat_stream(self, model, messages):
+        response = self.chat(model, messages)
+        content = response.choices[0].message.content
+        for i in range(0, len(content), 64):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 64]))],
+                                  usage=None)
+        yield SimpleNamespace(choices=[], usage=response.usage)
+
+class FakeMistralServer:
+    # Local HTTP server speaking the chat completions API, so MistralClient
+    # can be pointed at it with endpoint=server.url. Every answer waits
+    # `latency` seconds and every `rate_limit_every`-th request gets a 429
+    # with a Retry-After header.
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, rate_limit_every=0, retry_after=0.1,
+                 malformed_rate=0.0, seed=0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.replies = FakeReplies(malformed_rate, seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip('/') != CHAT_PATH:
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                    limited = server.rate_limit_every and server.requests % server.rate_limit_every == 0
+                    if limited:
+                        server.rate_limited += 1
+                if limited:
+                    self._send_json(429, {'object': 'error', 'message': 'Requests rate limit exceeded'},
+                                    {'Retry-After': str(server.retry_after)})
+                    return
+
+                time.sleep(server.latency)
+                prompt = body['messages'][-1]['content']
+                content = server.replies.reply(prompt)
+                if body.get('stream'):
+                    self._send_stream(body['model'], prompt, content)
+                    return
+                self._send_json(200, {
+                    'id': f"bench-{server.requests}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body['model'],
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                                 'finish_reason': 'stop'}],
+                    'usage': _usage(prompt, content),
+                })
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model, prompt, content):
+                # Server-sent events, the connection closing ends the stream
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                pieces = [content[i:i + 64] for i in range(0, len(content), 64)]
+                for i, piece in enumerate(pieces):
+                    last = i == len(pieces) - 1
+                    chunk = {
+                        'id': 'bench-stream',
+                        'object': 'chat.completion.chunk',
+                        'model': model,
+                        'choices': [{'index': 0, 'delta': {'content': piece},
+                                     'finish_reason': 'stop' if last else None}],
+                    }
+                    if last:
+                        chunk['usage'] = _usage(prompt, content)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = BenchServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def stats(self):
+        return {'requests': self.requests, 'rate_limited': self.rate_limited,
+                'malformed': self.replies.malformed}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a fake Mistral chat completions API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds before each answer")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Share of malformed answers, 0 to 1")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with FakeMistralServer(args.host, args.port, args.latency, args.rate_limit_every, args.retry_after,
+                           args.malformed_rate, args.seed) as server:
+        print(f"Fake Mistral API on {server.url} (set MISTRAL_ENDPOINT to use it)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
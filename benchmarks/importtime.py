@@ -0,0 +1,93 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ['review_analysis_app.py', 'cli.py', 'genai_analysis.py', 'scraper.py', 'jobs.py']
+
+# Only loaded once a scrape, parse or Mistral call actually needs them
+HEAVY_MODULES = ['selenium', 'fake_useragent', 'bs4', 'lxml', 'pandas', 'mistralai', 'sklearn', 'requests']
+
+# Framework imports the app can't avoid, reported but left out of the budget
+FRAMEWORK_MODULES = ['streamlit', 'dotenv']
+
+def top_level_imports(path):
+    # Modules an entry point imports at module level, i.e. on startup
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def measure(modules):
+    # One fresh interpreter per run, so nothing is already imported
+    code = '\n'.join(f"import {module}" for module in modules) or 'pass'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    top_level = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        loaded.add(name.strip())
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative) / 1000
+    return top_level, loaded
+
+def startup_modules():
+    # What a bare `python -c pass` imports (site, encodings, ...), paid by
+    # every entry point whatever it imports
+    return set(measure([])[0])
+
+def run(entry_points, repeats):
+    results = {}
+    startup = startup_modules()
+    for entry in entry_points:
+        modules = top_level_imports(os.path.join(ROOT, entry))
+        runs = [measure(modules) for _ in range(repeats)]
+        # The fastest run is the one least disturbed by the rest of the machine
+        top_level, loaded = min(runs, key=lambda run: sum(ms for name, ms in run[0].items() if name not in startup))
+        framework = sum(ms for name, ms in top_level.items() if name.split('.')[0] in FRAMEWORK_MODULES)
+        # Taken from the same run, startup times vary too much between runs
+        baseline = sum(ms for name, ms in top_level.items() if name in startup)
+        total = sum(top_level.values())
+        own = total - framework - baseline
+        results[entry] = {
+            'total_ms': round(total, 1),
+            'baseline_ms': round(baseline, 1),
+            'framework_ms': round(framework, 1),
+            'own_ms': round(own, 1),
+            'heavy_modules': sorted(module for module in HEAVY_MODULES if module in loaded),
+            'imports_ms': {name: round(ms, 1) for name, ms in sorted(top_level.items(), key=lambda item: -item[1])},
+        }
+        print(f"{entry:>24}: {own:.1f}ms own, {framework:.1f}ms framework, {baseline:.1f}ms interpreter, "
+              f"heavy: {', '.join(results[entry]['heavy_modules']) or 'none'}", file=sys.stderr)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure startup import time of the entry points")
+    parser.add_argument('entry_points', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help="Fail when an entry point's own imports take longer than this")
+    args = parser.parse_args()
+
+    results = run(args.entry_points, args.repeats)
+    print(json.dumps(results, indent=2))
+
+    failures = [entry for entry, result in results.items()
+                if result['own_ms'] > args.budget_ms or result['heavy_modules']]
+    if failures:
+        print(f"Import budget exceeded by: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper import JashanmalScraper
+from wait_strategies import WAIT_STRATEGIES, get_wait_strategy
+
+class TimedWait:
+    # Wraps a strategy and records the wall time between page clicks
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.name = strategy.name
+        self.page_times = []
+        self.wait_times = []
+        self._last_click = None
+
+    def wait_for_load(self, driver):
+        self.strategy.wait_for_load(driver)
+        self._last_click = time.perf_counter()
+
+    def page_marker(self, driver):
+        now = time.perf_counter()
+        if self._last_click is not None:
+            self.page_times.append(now - self._last_click)
+        self._last_click = now
+        return self.strategy.page_marker(driver)
+
+    def wait_for_page_change(self, driver, marker):
+        start = time.perf_counter()
+        changed = self.strategy.wait_for_page_change(driver, marker)
+        self.wait_times.append(time.perf_counter() - start)
+        return changed
+
+    def wait_before_retry(self, driver):
+        self.strategy.wait_before_retry(driver)
+
+def _summary(values):
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': statistics.mean(values),
+        'median': statistics.median(values),
+        'max': max(values),
+    }
+
+def run(url, strategies, max_reviews, repeats):
+    results = {}
+    for name in strategies:
+        timed = TimedWait(get_wait_strategy(name))
+        scraper = JashanmalScraper(engine='selenium', wait_strategy=timed, pool_size=1)
+        try:
+            # Warm the browser so startup is not charged to the first strategy
+            scraper.driver_pool.warm(1)
+            start = time.perf_counter()
+            review_count = 0
+            for _ in range(repeats):
+                review_count = len(scraper.scrape_reviews(url, max_reviews=max_reviews))
+            total = time.perf_counter() - start
+        finally:
+            scraper.close()
+        results[name] = {
+            'reviews': review_count,
+            'total_seconds': total / repeats,
+            'page_seconds': _summary(timed.page_times),
+            'wait_seconds': _summary(timed.wait_times),
+        }
+        print(f"{name:>10}: {total / repeats:.2f}s per scrape, "
+              f"{results[name]['page_seconds'].get('mean', 0):.3f}s mean per page", file=sys.stderr)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare per-page wall time of pagination wait strategies")
+    parser.add_argument('url', help="Product URL with a Stamped reviews widget")
+    parser.add_argument('--strategies', nargs='+', default=list(WAIT_STRATEGIES), choices=list(WAIT_STRATEGIES))
+    parser.add_argument('--max-reviews', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.url, args.strategies, args.max_reviews, args.repeats), indent=2))
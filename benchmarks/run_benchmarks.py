@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The limiter reads its pace at import; the fake server is the only thing
+# limiting here, so let 429s come from it rather than from the client side
+os.environ.setdefault("MISTRAL_REQUESTS_PER_MINUTE", "100000")
+os.environ.setdefault("MISTRAL_TOKENS_PER_MINUTE", "1000000000")
+
+import genai_analysis
+from aggregation import summarize_reviews
+from async_scraper import AsyncJashanmalScraper
+from batch_planner import plan_batches
+from response_parser import parse_json_analyses, parse_text_analyses
+from scraper import JashanmalScraper
+from stamped_parser import parse_reviews
+
+from fake_mistral import CannedClient, FakeMistralServer, FakeReplies, fake_analysis
+from stamped_fixtures import FixtureServer, StampedFixtures, sample_reviews
+
+BENCHMARKS = ['scrape_http', 'scrape_async', 'parse_widget_pages', 'parse_batch_responses', 'analyze_batches',
+              'analyze_end_to_end', 'aggregate']
+
+MODEL = 'mistral-large-latest'
+
+def _timed(fn, repeats):
+    # Returns per-run seconds and the last run's result
+    seconds = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return seconds, result
+
+def _summary(seconds, items):
+    best = min(seconds)
+    return {
+        'runs': len(seconds),
+        'min_s': round(best, 6),
+        'mean_s': round(statistics.mean(seconds), 6),
+        'median_s': round(statistics.median(seconds), 6),
+        'items_per_s': round(items / best, 1) if best else None,
+    }
+
+def bench_scrape_http(size, args):
+    with FixtureServer(size) as server:
+        scraper = JashanmalScraper(engine='http', workers=args.scrape_workers, stamped_api=server.widget_api)
+        seconds, reviews = _timed(lambda: scraper.scrape_reviews(server.product_url), args.repeats)
+        scraper.close()
+    return dict(_summary(seconds, size), reviews=len(reviews))
+
+def bench_scrape_async(size, args):
+    async def scrape(server):
+        async with AsyncJashanmalScraper(stamped_api=server.widget_api,
+                                         page_concurrency=args.scrape_workers) as scraper:
+            return await scraper.scrape_reviews(server.product_url)
+
+    with FixtureServer(size) as server:
+        seconds, reviews = _timed(lambda: asyncio.run(scrape(server)), args.repeats)
+    return dict(_summary(seconds, size), reviews=len(reviews))
+
+def bench_parse_widget_pages(size, args):
+    fixtures = StampedFixtures(size)
+    pages = [fixtures.widget_page(page) for page in range(1, fixtures.pages + 1)]
+    seconds, reviews = _timed(lambda: [review for page in pages for review in parse_reviews(page)], args.repeats)
+    return dict(_summary(seconds, size), pages=len(pages), reviews=len(reviews))
+
+def _batch_prompts(reviews, output_mode):
+    # The prompts analyze_reviews_with_genai would send for these reviews
+    prompt_tokens = genai_analysis.PROMPT_TOKENS[output_mode]
+    prompts = []
+    for batch in plan_batches(reviews, prompt_tokens=prompt_tokens):
+        reviews_text = "\n---\n".join(
+            genai_analysis.format_review(number, reviews[i]) for number, i in enumerate(batch, 1)
+        )
+        prompts.append(genai_analysis.BATCH_PROMPTS[output_mode].format(reviews_text=reviews_text))
+    return prompts
+
+def bench_parse_batch_responses(size, args):
+    reviews = sample_reviews(size)
+    parse = parse_json_analyses if args.output_mode == 'json' else parse_text_analyses
+    replies = FakeReplies(args.malformed_rate, args.seed)
+    responses = [replies.reply(prompt) for prompt in _batch_prompts(reviews, args.output_mode)]
+    seconds, parsed = _timed(lambda: [parse(response) for response in responses], args.repeats)
+    return dict(_summary(seconds, size), batches=len(responses),
+                analyses=sum(len(analyses) for analyses in parsed))
+
+def bench_analyze_batches(size, args):
+    # analyze_reviews_batch against an in-process client: prompt building,
+    # parsing and repair requests without any network time
+    reviews = sample_reviews(size)
+    batches = plan_batches(reviews, prompt_tokens=genai_analysis.PROMPT_TOKENS[args.output_mode])
+
+    def run():
+        client = CannedClient(FakeReplies(args.malformed_rate, args.seed))
+        missing = 0
+        for batch in batches:
+            analyses = genai_analysis.analyze_reviews_batch([reviews[i] for i in batch], MODEL, client,
+                                                            args.output_mode, stream=args.stream)
+            missing += analyses.count(None)
+        return client.calls, missing
+
+    seconds, (calls, missing) = _timed(run, args.repeats)
+    return dict(_summary(seconds, size), batches=len(batches), calls=calls, missing=missing)
+
+def bench_analyze_end_to_end(size, args):
+    from mistralai.client import MistralClient
+    runs = []
+    stats = None
+    for _ in range(args.repeats):
+        # Fresh reviews and server per run, so every run pays for every review
+        reviews = sample_reviews(size)
+        with FakeMistralServer(latency=args.latency, rate_limit_every=args.rate_limit_every,
+                               retry_after=args.retry_after, malformed_rate=args.malformed_rate,
+                               seed=args.seed) as server:
+            client = genai_analysis.read_error_bodies(
+                MistralClient(api_key='bench', endpoint=server.url, max_retries=1)
+            )
+            start = time.perf_counter()
+            genai_analysis.analyze_reviews_with_genai(reviews, MODEL, client, max_concurrency=args.concurrency,
+                                                      output_mode=args.output_mode, stream=args.stream)
+            runs.append(time.perf_counter() - start)
+            stats = server.stats()
+    return dict(_summary(runs, size), server=stats)
+
+def bench_aggregate(size, args):
+    reviews = sample_reviews(size)
+    for number, review in enumerate(reviews, 1):
+        analysis = fake_analysis(number, review['title'], review['text'])
+        review['analysis'] = {key: analysis[key] for key in ('summary', 'sentiment', 'category')}
+    seconds, _ = _timed(lambda: summarize_reviews(reviews), args.repeats)
+    return _summary(seconds, size)
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    results = {}
+    for name in args.benchmarks:
+        bench = globals()[f"bench_{name}"]
+        results[name] = {}
+        for size in args.sizes:
+            # Keep the pipeline's progress prints off stdout, which carries the JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                result = bench(size, args)
+            results[name][str(size)] = result
+            print(f"{name:>22} {size:>6}: {result['min_s']:.4f}s "
+                  f"({result['items_per_s']} reviews/s)", file=sys.stderr)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        },
+        'results': results,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time scraping, parsing, analysis and aggregation on fixtures")
+    parser.add_argument('--benchmarks', nargs='+', default=BENCHMARKS, choices=BENCHMARKS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    parser.add_argument('--output-mode', default='json', choices=['json', 'text'])
+    parser.add_argument('--stream', action='store_true', help="Stream Mistral responses")
+    parser.add_argument('--concurrency', type=int, default=genai_analysis.MAX_CONCURRENCY)
+    parser.add_argument('--scrape-workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05, help="Fake Mistral seconds per answer")
+    parser.add_argument('--rate-limit-every', type=int, default=50, help="Fake Mistral 429 every Nth request")
+    parser.add_argument('--retry-after', type=float, default=0.05)
+    parser.add_argument('--malformed-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # Backoff jitter scales with base_delay; at the fake server's Retry-After
+    # the default one second would dominate the measurement
+    genai_analysis.mistral_limiter.base_delay = args.retry_after
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
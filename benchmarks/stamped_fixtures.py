@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+PRODUCT_PATH = '/products/leather-weekender-bag'
+WIDGET_PATH = '/api/widget/reviews'
+
+_REVIEW_RE = re.compile(r'\s*<div id="stamped-review-\d+".*?</p>\s*(?:<div class="stamped-review-image">.*?</div>\s*)?</div>\s*</div>',
+                        re.S)
+
+class BenchServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when a concurrent
+    # client opens more at once, which shows up as 1s SYN retransmits
+    request_queue_size = 256
+    daemon_threads = True
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+class StampedFixtures:
+    # Widget pages of any size built from the fixture page: its reviews are
+    # repeated with unique ids and texts so deduplication keeps all of them
+    def __init__(self, total):
+        self.total = total
+        self.product_html = load_fixture('product_page.html').replace('{total}', str(total))
+        page = load_fixture('widget_page.html').replace('{total}', str(total))
+        self.reviews = [match.group(0) for match in _REVIEW_RE.finditer(page)]
+        first = page.index(self.reviews[0])
+        last = page.index(self.reviews[-1]) + len(self.reviews[-1])
+        self.head, self.tail = page[:first], page[last:]
+        self.per_page = len(self.reviews)
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    def _review(self, number):
+        block = self.reviews[number % self.per_page]
+        block = re.sub(r'stamped-review-\d+', f'stamped-review-{900000 + number}', block)
+        block = re.sub(r'data-review-id="\d+"', f'data-review-id="{900000 + number}"', block)
+        return block.replace('</p>', f' (review {number + 1})</p>', 1)
+
+    def widget_page(self, page):
+        # Pages past the end come back without reviews, like the real widget
+        start = (page - 1) * self.per_page
+        numbers = range(start, min(start + self.per_page, self.total)) if page >= 1 else []
+        return self.head + ''.join(self._review(number) for number in numbers) + self.tail
+
+def sample_reviews(count):
+    # Parsed review dicts, as the scraper returns them, for the analysis benchmarks
+    from stamped_parser import parse_reviews
+    fixtures = StampedFixtures(count)
+    reviews = []
+    for page in range(1, fixtures.pages + 1):
+        reviews.extend(parse_reviews(fixtures.widget_page(page)))
+    return reviews
+
+class FixtureServer:
+    # Serves the product page and the widget endpoint locally, so the HTTP
+    # scrape path runs end to end without touching the network
+    def __init__(self, total, host='127.0.0.1', port=0):
+        fixtures = StampedFixtures(total)
+        self.fixtures = fixtures
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                parts = urlsplit(self.path)
+                if parts.path == PRODUCT_PATH:
+                    body, content_type = fixtures.product_html, 'text/html; charset=utf-8'
+                elif parts.path == WIDGET_PATH:
+                    page = int(parse_qs(parts.query).get('page', ['1'])[0])
+                    body = json.dumps({'widget': fixtures.widget_page(page)})
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = BenchServer((host, port), Handler)
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.product_url = self.base_url + PRODUCT_PATH
+        self.widget_api = self.base_url + WIDGET_PATH
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
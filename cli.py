@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MODEL = "mistral-large-latest"
+
+def read_urls(urls, url_file):
+    # Command line URLs first, then one per line from the file ('-' for stdin).
+    # Blank lines and '#' comments are skipped, so catalog lists can be annotated.
+    yield from urls
+    if url_file is None:
+        return
+    with contextlib.ExitStack() as stack:
+        f = sys.stdin if url_file == '-' else stack.enter_context(open(url_file, encoding='utf-8'))
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+def result_record(url, job_id, result, elapsed, include_reviews=False):
+    from jobs import result_status
+    reviews = result['reviews']
+    record = {
+        'url': url,
+        'job_id': job_id,
+        'status': result_status(result),
+        'reviews': len(reviews),
+        'elapsed_s': round(elapsed, 3),
+    }
+    if result.get('error'):
+        # The job is left incomplete in the datastore, resuming it retries the failed batches
+        record['error'] = result['error']
+    if reviews:
+        aggregates = result['aggregates']
+        record.update(
+            avg_rating=round(aggregates['avg_rating'], 2) if aggregates['rated'] else None,
+            positive_percent=round(aggregates['positive_percent'], 1),
+            sentiments=aggregates['sentiments'],
+            categories=aggregates['categories'],
+            genai_output=result['genai_output'],
+        )
+    if include_reviews:
+        record['review_items'] = reviews
+    return record
+
+class BatchRunner:
+    # Runs scrape + analysis for many product URLs on `jobs` threads that
+    # share one scraper (and its browser pool), one Mistral client and its
+    # rate limiter, the caches and the datastore. Only a few URLs more than
+    # there are threads are read ahead, so a catalog of thousands of products
+    # streams through in flat memory.
+    def __init__(self, pipeline, jobs=4, include_reviews=False, datastore=None):
+        from jobs import JobStore
+        self.pipeline = pipeline
+        self.jobs = jobs
+        self.include_reviews = include_reviews
+        # Jobs older than REVIEWAI_DB_RETENTION are pruned from it before a run
+        self.datastore = datastore
+        # Finished jobs are pruned as soon as they are written out
+        self.store = JobStore(ttl=0)
+        self.done = 0
+        self.incomplete = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def _run(self, url):
+        from jobs import JOB_DONE
+        job_id = uuid.uuid4().hex
+        self.store.create(url, job_id=job_id)
+        start = time.perf_counter()
+        try:
+            result = self.pipeline(job_id, url, self.store)
+            return result_record(url, job_id, result, time.perf_counter() - start, self.include_reviews)
+        except Exception as e:
+            return {'url': url, 'job_id': job_id, 'status': 'failed', 'error': str(e),
+                    'elapsed_s': round(time.perf_counter() - start, 3)}
+        finally:
+            # Any status other than an active one lets prune() drop the job
+            self.store.update(job_id, status=JOB_DONE)
+
+    def run(self, urls):
+        # Yields one record per distinct URL as soon as it finishes, in completion order
+        from jobs import normalize_url
+        if self.datastore is not None:
+            self.datastore.prune()
+        seen = set()
+        urls = iter(urls)
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='review-batch') as executor:
+            while True:
+                for url in urls:
+                    key = normalize_url(url)
+                    if key in seen:
+                        self.skipped += 1
+                        continue
+                    seen.add(key)
+                    pending.add(executor.submit(self._run, url))
+                    if len(pending) >= self.jobs * 2:
+                        break
+                if not pending:
+                    return
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    if record['status'] == 'done':
+                        self.done += 1
+                    elif record['status'] == 'incomplete':
+                        self.incomplete += 1
+                    else:
+                        self.failed += 1
+                    yield record
+                self.store.prune()
+
+def build_pipeline(args):
+    from functools import partial
+    from datastore import DEFAULT_DB_PATH, ReviewStore
+    from genai_analysis import MAX_CONCURRENCY, read_error_bodies
+    from jobs import run_review_analysis
+    from llm_cache import AnalysisCache
+    from mistralai.client import MistralClient
+    from preclassifier import PreClassifier
+    from scrape_cache import ScrapeCache
+    from scraper import JashanmalScraper
+    from stamped_parser import STAMPED_REVIEWS_API
+
+    endpoint = os.environ.get("MISTRAL_ENDPOINT", "https://api.mistral.ai")
+    client = read_error_bodies(MistralClient(api_key=os.environ["MISTRAL_API_KEY"], endpoint=endpoint,
+                                             max_retries=1))
+    scraper = JashanmalScraper(verify_ssl=False, pool_size=args.browsers, engine=args.engine,
+                               wait_strategy=args.wait_strategy, workers=args.scrape_workers,
+                               stamped_api=args.stamped_api or STAMPED_REVIEWS_API)
+    datastore = None if args.no_db else ReviewStore(args.db or DEFAULT_DB_PATH)
+    preclassifier = None
+    if not args.no_preclassify:
+        preclassifier = PreClassifier()
+        if datastore is not None:
+            preclassifier.fit(datastore.labelled_reviews())
+    pipeline = partial(run_review_analysis, scraper=scraper, scrape_cache=ScrapeCache(), client=client,
+                       model=args.model, analysis_cache=None if args.no_cache else AnalysisCache(),
+                       datastore=datastore, preclassifier=preclassifier,
+                       max_concurrency=args.llm_concurrency or MAX_CONCURRENCY)
+    return pipeline, scraper, datastore
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scrape and analyze the reviews of many product URLs, writing one JSON line per product"
+    )
+    parser.add_argument('urls', nargs='*', help="Product URLs")
+    parser.add_argument('-f', '--file', help="File with one product URL per line, '-' for stdin")
+    parser.add_argument('-o', '--output', help="Write the JSON lines here instead of stdout")
+    parser.add_argument('--append', action='store_true', help="Append to --output instead of overwriting it")
+    parser.add_argument('--jobs', type=int, default=int(os.environ.get("REVIEWAI_JOB_WORKERS", "4")),
+                        help="Products scraped and analyzed at the same time")
+    parser.add_argument('--browsers', type=int, default=2, help="Warm Chrome drivers kept for Selenium scrapes")
+    parser.add_argument('--scrape-workers', type=int, default=1, help="Review pages fetched in parallel per product")
+    parser.add_argument('--llm-concurrency', type=int,
+                        help="Mistral batches in flight per product (default MISTRAL_MAX_CONCURRENCY)")
+    parser.add_argument('--engine', default='auto', choices=['auto', 'http', 'async', 'selenium'])
+    parser.add_argument('--wait-strategy', default='mutation', choices=['fixed', 'dom', 'mutation'])
+    parser.add_argument('--stamped-api', help="Stamped widget endpoint, e.g. a benchmarks fixture server")
+    parser.add_argument('--model', default=MODEL)
+    parser.add_argument('--db', help="SQLite file for job checkpoints (default REVIEWAI_DB)")
+    parser.add_argument('--no-db', action='store_true', help="Do not checkpoint jobs to the datastore")
+    parser.add_argument('--no-cache', action='store_true', help="Do not reuse cached Mistral analyses")
+    parser.add_argument('--no-preclassify', action='store_true', help="Send every review to Mistral")
+    parser.add_argument('--include-reviews', action='store_true', help="Add each review and its analysis")
+    args = parser.parse_args(argv)
+
+    if not args.urls and args.file is None:
+        parser.error("give product URLs or --file")
+    if not os.environ.get("MISTRAL_API_KEY"):
+        from dotenv import load_dotenv
+        load_dotenv()
+        if not os.environ.get("MISTRAL_API_KEY"):
+            parser.error("MISTRAL_API_KEY is not set")
+    if os.environ.get("REVIEWAI_METRICS_PORT"):
+        import metrics
+        metrics.start_metrics_server(int(os.environ["REVIEWAI_METRICS_PORT"]))
+
+    out = open(args.output, 'a' if args.append else 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    pipeline, scraper, datastore = build_pipeline(args)
+    runner = BatchRunner(pipeline, jobs=max(1, args.jobs), include_reviews=args.include_reviews,
+                         datastore=datastore)
+    try:
+        # The pipeline reports progress with print, keep stdout for the JSON lines
+        with contextlib.redirect_stdout(sys.stderr):
+            for record in runner.run(read_urls(args.urls, args.file)):
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+    finally:
+        scraper.close()
+        if datastore is not None:
+            datastore.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"{runner.done} done, {runner.incomplete} incomplete, {runner.failed} failed, "
+          f"{runner.skipped} duplicate URLs skipped in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 1 if runner.failed or runner.incomplete else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.environ.get("REVIEWAI_DB", os.path.join(".review_cache", "reviewai.sqlite3"))
+# Seconds a job's rows are kept after its last update
+DEFAULT_RETENTION = int(os.environ.get("REVIEWAI_DB_RETENTION", str(7 * 24 * 3600)))
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+class ReviewStore:
+    # Reviews and analyses of each job in SQLite. Rows are keyed by job id,
+    # so concurrent sessions never touch each other's data, and writes go
+    # in one transaction per call instead of rewriting a whole file.
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                genai_output TEXT,
+                sentiments TEXT,
+                error TEXT,
+                aggregates TEXT
+            );
+            CREATE TABLE IF NOT EXISTS reviews (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                review TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS analyses (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                analysis TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_url ON jobs (url, created_at);
+        """)
+        # Databases created before the aggregates were stored with the job
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if 'aggregates' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN aggregates TEXT")
+        self._conn.commit()
+
+    def create_job(self, job_id, url, status):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, url, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, url, status, now, now)
+            )
+            self._conn.commit()
+
+    def update_job(self, job_id, status, genai_output=None, sentiments=None, error=None, aggregates=None):
+        # The error always follows the latest update, so a resumed job drops its old one
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, genai_output = COALESCE(?, genai_output), "
+                "sentiments = COALESCE(?, sentiments), error = ?, aggregates = COALESCE(?, aggregates) "
+                "WHERE id = ?",
+                (status, time.time(), genai_output, _dumps(sentiments) if sentiments is not None else None,
+                 error, _dumps(aggregates) if aggregates is not None else None, job_id)
+            )
+            self._conn.commit()
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, url, status, created_at, updated_at, genai_output, sentiments, error, aggregates "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(('id', 'url', 'status', 'created_at', 'updated_at', 'genai_output',
+                        'sentiments', 'error', 'aggregates'), row))
+        for field in ('sentiments', 'aggregates'):
+            job[field] = json.loads(job[field]) if job[field] else None
+        return job
+
+    def jobs_with_status(self, statuses, max_age=24 * 3600):
+        # Recent jobs in any of the given statuses, newest first
+        placeholders = ','.join('?' * len(statuses))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, url, status FROM jobs WHERE status IN ({placeholders}) AND created_at >= ? "
+                "ORDER BY created_at DESC", list(statuses) + [time.time() - max_age]
+            ).fetchall()
+        return [{'id': job_id, 'url': url, 'status': status} for job_id, url, status in rows]
+
+    def save_reviews(self, job_id, reviews):
+        # The analysis is stored separately, keep the review row as scraped
+        rows = [(job_id, position, _dumps({k: v for k, v in review.items() if k != 'analysis'}))
+                for position, review in enumerate(reviews)]
+        with self._lock:
+            self._conn.execute("DELETE FROM reviews WHERE job_id = ?", (job_id,))
+            self._conn.executemany("INSERT INTO reviews (job_id, position, review) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def save_analyses(self, job_id, analyses):
+        # analyses maps review position to its analysis
+        rows = [(job_id, position, _dumps(analysis)) for position, analysis in analyses.items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analyses (job_id, position, analysis) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def load_analyses(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, analysis FROM analyses WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {position: json.loads(analysis) for position, analysis in rows}
+
+    def load_reviews(self, job_id):
+        # Reviews in scrape order with whatever analyses have been saved attached
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT review FROM reviews WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+        reviews = [json.loads(review) for review, in rows]
+        for position, analysis in self.load_analyses(job_id).items():
+            if position < len(reviews):
+                reviews[position]['analysis'] = analysis
+        return reviews
+
+    def labelled_reviews(self, limit=5000):
+        # Most recent reviews with a Mistral analysis, for training local models.
+        # Analyses tagged with a source (pre-classifier guesses, fallbacks) are
+        # left out so the local model never learns from its own output.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.review, a.analysis FROM reviews r JOIN analyses a "
+                "ON a.job_id = r.job_id AND a.position = r.position "
+                "WHERE json_extract(a.analysis, '$.source') IS NULL "
+                "ORDER BY r.rowid DESC LIMIT ?", (limit,)
+            ).fetchall()
+        reviews = []
+        for review, analysis in rows:
+            review = json.loads(review)
+            review['analysis'] = json.loads(analysis)
+            reviews.append(review)
+        return reviews
+
+    def prune(self, max_age=DEFAULT_RETENTION):
+        # Drop jobs not updated for max_age seconds with their reviews and
+        # analyses, so the file stops growing with every analysis ever run.
+        # Returns the number of jobs removed.
+        cutoff = time.time() - max_age
+        with self._lock:
+            for table in ('analyses', 'reviews'):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE job_id IN (SELECT id FROM jobs WHERE updated_at < ?)", (cutoff,)
+                )
+            removed = self._conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
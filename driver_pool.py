@@ -0,0 +1,161 @@
+import atexit
+import logging
+import threading
+import time
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class DriverPool:
+    def __init__(self, driver_factory, max_size=2, max_uses=20, acquire_timeout=120):
+        self.driver_factory = driver_factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._uses = {}
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'started': 0,
+            'recycled': 0,
+            'crashed': 0,
+            'startup_total': 0.0,
+            'startup_last': 0.0,
+        }
+        atexit.register(self.close)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                driver = None
+                if self._idle:
+                    driver = self._idle.pop()
+                elif self._live < self.max_size:
+                    self._live += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a free Chrome driver")
+                    self._cond.wait(remaining)
+                    continue
+
+            if driver is None:
+                # Pool has room, start a new browser outside the lock
+                with self._cond:
+                    self._stats['misses'] += 1
+                metrics.inc('driver_pool_acquire_total', result='miss')
+                try:
+                    return self._start_driver()
+                except Exception:
+                    with self._cond:
+                        self._live -= 1
+                        self._cond.notify()
+                    raise
+
+            # Idle drivers can die while parked (Chrome crash, OOM kill)
+            if self._is_alive(driver):
+                with self._cond:
+                    self._stats['hits'] += 1
+                metrics.inc('driver_pool_acquire_total', result='hit')
+                return driver
+            logger.warning("Discarding crashed idle Chrome driver")
+            self._discard(driver, crashed=True)
+
+    def release(self, driver, broken=False):
+        if driver is None:
+            return
+        with self._cond:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            uses = self._uses[id(driver)]
+            closed = self._closed
+
+        if broken or not self._is_alive(driver):
+            self._discard(driver, crashed=True)
+        elif closed or uses >= self.max_uses:
+            self._discard(driver)
+        elif not self._reset(driver):
+            self._discard(driver, crashed=True)
+        else:
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    def warm(self, count=None):
+        count = self.max_size if count is None else min(count, self.max_size)
+        drivers = []
+        try:
+            while len(drivers) < count:
+                with self._cond:
+                    if self._live >= self.max_size and not self._idle:
+                        break
+                drivers.append(self.acquire())
+        finally:
+            for driver in drivers:
+                self.release(driver)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['live'] = self._live
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['startup_avg'] = stats['startup_total'] / stats['started'] if stats['started'] else 0.0
+        return stats
+
+    def _start_driver(self):
+        start = time.perf_counter()
+        with metrics.span('driver_startup'):
+            driver = self.driver_factory()
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self._uses[id(driver)] = 0
+            self._stats['started'] += 1
+            self._stats['startup_total'] += elapsed
+            self._stats['startup_last'] = elapsed
+        logger.info(f"Started Chrome driver in {elapsed:.2f}s")
+        return driver
+
+    def _reset(self, driver):
+        try:
+            driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+            driver.delete_all_cookies()
+            driver.get('about:blank')
+            return True
+        except Exception as e:
+            logger.debug(f"Failed to reset Chrome driver: {str(e)}")
+            return False
+
+    def _is_alive(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver, crashed=False):
+        with self._cond:
+            self._uses.pop(id(driver), None)
+            self._live -= 1
+            self._stats['crashed' if crashed else 'recycled'] += 1
+            self._cond.notify()
+        metrics.inc('driver_discarded_total', reason='crashed' if crashed else 'recycled')
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Failed to quit Chrome driver: {str(e)}")
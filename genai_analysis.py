@@ -1,22 +1,89 @@
-from mistralai.client import MistralClient
-from scraper import JashanmalScraper
-import json
+import os
+import queue
 import time
-from mistralai.exceptions import MistralException
-from mistralai.models.chat_completion import ChatMessage
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from rate_limiter import RateLimiter
+from llm_cache import analysis_cache_key
+from batch_planner import OUTPUT_TOKENS_PER_REVIEW, estimate_tokens, format_review, plan_batches
+from response_parser import STREAM_PARSERS, parse_json_analyses, parse_text_analyses
+from aggregation import summarize_reviews
 
-def analyze_reviews_batch(reviews_batch, model, client, retry_count=0):
-    max_retries = 3
-    try:
-        time.sleep(1)  # Small delay between batches
-        
-        # Format all reviews in the batch
-        reviews_text = "\n---\n".join([
-            f"Review {i+1}:\nTitle: {review.get('title', '')}\nText: {review.get('text', '')}"
-            for i, review in enumerate(reviews_batch)
-        ])
-        
-        prompt = f'''
+# Batches sent to Mistral at the same time
+MAX_CONCURRENCY = int(os.environ.get("MISTRAL_MAX_CONCURRENCY", "4"))
+
+# Shared by every Mistral call in the process so concurrent batches and
+# sessions stay under the account limits together
+mistral_limiter = RateLimiter(
+    requests_per_minute=int(os.environ.get("MISTRAL_REQUESTS_PER_MINUTE", "60")),
+    tokens_per_minute=int(os.environ.get("MISTRAL_TOKENS_PER_MINUTE", "500000")),
+)
+
+# Bump whenever the prompt or the parsed fields change, so cached analyses are not reused
+PROMPT_VERSION = 2
+
+def _read_error_body(response):
+    if response.status_code >= 400:
+        response.read()
+
+def read_error_bodies(client):
+    # mistralai builds its exception from the body of a failed streaming
+    # response without reading it, so a streamed 429 surfaces as an httpx
+    # error with no status and is never retried. Reading error bodies as the
+    # response arrives keeps the status and Retry-After for the limiter.
+    # This reaches into the SDK's private httpx client (mistralai is pinned
+    # in requirements.txt), so fail at startup rather than lose retries if
+    # an upgrade moves it.
+    http_client = getattr(client, '_client', None)
+    hooks = getattr(http_client, 'event_hooks', None)
+    if not isinstance(hooks, dict) or 'response' not in hooks:
+        raise RuntimeError(
+            f"{type(client).__name__} has no httpx client at ._client, check read_error_bodies "
+            f"against the installed mistralai version"
+        )
+    hooks['response'].append(_read_error_body)
+    http_client.event_hooks = hooks
+    return client
+
+def _record_tokens(span, estimated_tokens, usage):
+    metrics.inc('mistral_tokens_total', estimated_tokens, kind='estimated')
+    span.set(estimated_tokens=estimated_tokens)
+    if usage:
+        metrics.inc('mistral_tokens_total', usage.prompt_tokens, kind='prompt')
+        metrics.inc('mistral_tokens_total', usage.completion_tokens, kind='completion')
+        span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        mistral_limiter.record_usage(estimated_tokens, usage.total_tokens)
+
+def chat(client, model, messages, estimated_tokens=0):
+    # The span includes limiter waits and retries, the attempts are counted by the limiter
+    with metrics.span('mistral_call', stream=False) as span:
+        chat_response = mistral_limiter.call(
+            client.chat, model=model, messages=messages, estimated_tokens=estimated_tokens
+        )
+        _record_tokens(span, estimated_tokens, chat_response.usage)
+    metrics.inc('mistral_requests_total', stream=False)
+    return chat_response
+
+def chat_stream(client, model, messages, estimated_tokens=0):
+    # The request is only sent when the first chunk is read, so that read is
+    # what goes through the limiter and its retries
+    def start():
+        stream = client.chat_stream(model=model, messages=messages)
+        return next(stream, None), stream
+
+    with metrics.span('mistral_call', stream=True) as span:
+        first_chunk, stream = mistral_limiter.call(start, estimated_tokens=estimated_tokens)
+        metrics.inc('mistral_requests_total', stream=True)
+        if first_chunk is None:
+            return
+        span.set(first_chunk_ms=round((time.perf_counter() - span.start) * 1000, 3))
+        chunk = first_chunk
+        yield chunk
+        for chunk in stream:
+            yield chunk
+        _record_tokens(span, estimated_tokens, chunk.usage)
+
+PROMPT_INSTRUCTIONS = '''
 You are a professional Product Review Analyst AI. Analyze each review and provide a summary and tags.
 For each review, provide:
 1. A brief summary (1-2 sentences)
@@ -27,7 +94,16 @@ For each review, provide:
       - DELIVERY (shipping, packaging, timing)
       - AUTHENTICATION (product authenticity, matching description)
       - QUALITY (build quality, durability, materials)
+'''
+
+REVIEWS_SECTION = '''
+Here are the reviews to analyze:
 
+{reviews_text}
+'''
+
+BATCH_PROMPTS = {
+    'text': PROMPT_INSTRUCTIONS + '''
 Format your response exactly like this for each review:
 REVIEW 1:
 SUMMARY: [Your 1-2 sentence summary]
@@ -36,92 +112,247 @@ CATEGORY: [SATISFACTION/DELIVERY/AUTHENTICATION/QUALITY]
 
 REVIEW 2:
 ... and so on for each review.
+''' + REVIEWS_SECTION,
+    'json': PROMPT_INSTRUCTIONS + '''
+Respond with only a JSON array containing one object per review, using the review number as "id":
+[
+  {{"id": 1, "summary": "Your 1-2 sentence summary", "sentiment": "POSITIVE", "category": "QUALITY"}},
+  {{"id": 2, ...}}
+]
+Include every review exactly once and do not write anything outside the JSON array.
+''' + REVIEWS_SECTION,
+}
 
-Here are the reviews to analyze:
+RESPONSE_PARSERS = {
+    'text': parse_text_analyses,
+    'json': parse_json_analyses,
+}
 
-{reviews_text}
-'''
-        chat_response = client.chat(
-            model=model,
-            messages=[
-                ChatMessage(role="user", content=prompt)
-            ]
-        )
-        response = chat_response.choices[0].message.content
-        
-        # Parse the batch response
-        analyses = []
-        current_analysis = {}
-        current_review_num = None
-        
-        for line in response.strip().split('\n'):
-            line = line.strip()
-            if line.startswith('REVIEW '):
-                if current_analysis and current_review_num is not None:
-                    analyses.append(current_analysis)
-                current_analysis = {}
-                try:
-                    current_review_num = int(line.split()[1].strip(':')) - 1
-                except:
-                    current_review_num = len(analyses)
-            elif line.startswith('SUMMARY:'):
-                current_analysis['summary'] = line[8:].strip()
-            elif line.startswith('SENTIMENT:'):
-                current_analysis['sentiment'] = line[10:].strip()
-            elif line.startswith('CATEGORY:'):
-                current_analysis['category'] = line[9:].strip()
-        
-        if current_analysis:
-            analyses.append(current_analysis)
-            
-        return analyses
-        
-    except MistralException as e:
-        if "rate limit" in str(e).lower() and retry_count < max_retries:
-            time.sleep(5 * (retry_count + 1))
-            return analyze_reviews_batch(reviews_batch, model, client, retry_count + 1)
-        raise e
-
-def analyze_reviews_with_genai(reviews, model, client):
-    # Process reviews in batches of 5
-    BATCH_SIZE = 5
-    all_analyses = []
+# 'json' asks for a JSON array keyed by review id, 'text' for the REVIEW n: blocks
+OUTPUT_MODE = os.environ.get("MISTRAL_OUTPUT_MODE", "json")
+
+# Stream responses so finished analyses are available before the whole batch is done
+STREAM_RESPONSES = os.environ.get("MISTRAL_STREAM", "1") != "0"
+
+# Times the reviews missing from a response are asked for again
+MAX_REPAIR_ATTEMPTS = 2
+
+# Instructions sent with every batch, counted against the input budget
+PROMPT_TOKENS = {mode: estimate_tokens(prompt) for mode, prompt in BATCH_PROMPTS.items()}
+
+def request_analyses(reviews_batch, model, client, output_mode=OUTPUT_MODE, stream=False, on_result=None):
+    # One Mistral call for the batch, returns {review number: analysis} for the items that parsed.
+    # When streaming, on_result(review number, analysis) fires as each item completes.
+    reviews_text = "\n---\n".join([
+        format_review(i + 1, review) for i, review in enumerate(reviews_batch)
+    ])
     
-    for i in range(0, len(reviews), BATCH_SIZE):
-        batch = reviews[i:i + BATCH_SIZE]
+    prompt = BATCH_PROMPTS[output_mode].format(reviews_text=reviews_text)
+    # mistralai is only needed once a request is made, keep it out of startup
+    from mistralai.models.chat_completion import ChatMessage
+    estimated_tokens = estimate_tokens(prompt) + OUTPUT_TOKENS_PER_REVIEW * len(reviews_batch)
+    if stream:
+        parser = STREAM_PARSERS[output_mode]()
+        analyses = {}
+
+        def collect(items):
+            for number, analysis in items:
+                if number not in analyses:
+                    analyses[number] = analysis
+                    if on_result is not None:
+                        on_result(number, analysis)
+
+        # Parsing is interleaved with the stream, so only its own time is summed up
+        parse_seconds = 0.0
+        for chunk in chat_stream(client, model, [ChatMessage(role="user", content=prompt)],
+                                 estimated_tokens=estimated_tokens):
+            if chunk.choices and chunk.choices[0].delta.content:
+                start = time.perf_counter()
+                items = parser.feed(chunk.choices[0].delta.content)
+                parse_seconds += time.perf_counter() - start
+                collect(items)
+        start = time.perf_counter()
+        items = parser.close()
+        parse_seconds += time.perf_counter() - start
+        collect(items)
+        metrics.observe('response_parse_seconds', parse_seconds, mode=output_mode, stream=True)
+        return analyses
+
+    chat_response = chat(
+        client,
+        model,
+        [ChatMessage(role="user", content=prompt)],
+        estimated_tokens=estimated_tokens
+    )
+    response = chat_response.choices[0].message.content
+    with metrics.span('response_parse', mode=output_mode, stream=False) as span:
+        analyses = RESPONSE_PARSERS[output_mode](response)
+        span.set(requested=len(reviews_batch), parsed=len(analyses))
+    return analyses
+
+def analyze_reviews_batch(reviews_batch, model, client, output_mode=OUTPUT_MODE,
+                          max_repair_attempts=MAX_REPAIR_ATTEMPTS, stream=False, on_result=None):
+    # Returns one analysis per review in the batch, None where the model never produced a valid one.
+    # on_result(batch position, analysis) fires once per review as soon as its analysis is known.
+    analyses = [None] * len(reviews_batch)
+    missing = list(range(len(reviews_batch)))
+    for attempt in range(max_repair_attempts + 1):
+        if attempt:
+            # Only re-send the reviews the model skipped, merged or got wrong
+            print(f"Re-requesting {len(missing)} of {len(reviews_batch)} reviews missing from the response")
+
+        def report(number, analysis, requested=missing):
+            if on_result is not None and 0 < number <= len(requested):
+                on_result(requested[number - 1], analysis)
+
+        if attempt:
+            metrics.inc('analysis_repair_requests_total')
+        parsed = request_analyses([reviews_batch[i] for i in missing], model, client, output_mode,
+                                  stream=stream, on_result=report)
+        for number, i in enumerate(missing, 1):
+            if number in parsed:
+                analyses[i] = parsed[number]
+                if not stream and on_result is not None:
+                    on_result(i, analyses[i])
+        missing = [i for i in missing if analyses[i] is None]
+        if not missing:
+            break
+    return analyses
+
+# Tags the stand-in analyses of reviews Mistral never analyzed
+FALLBACK_SOURCE = 'fallback'
+
+def fallback_analysis(summary, error=None):
+    # Stands in for reviews Mistral never analyzed, so they still count (as neutral).
+    # error marks a batch that failed outright, worth retrying when the job resumes.
+    analysis = {'summary': summary, 'sentiment': 'NEUTRAL', 'category': 'SATISFACTION', 'source': FALLBACK_SOURCE}
+    if error is not None:
+        analysis['error'] = error
+    return analysis
+
+def analyze_reviews_with_genai(reviews, model, client, max_concurrency=MAX_CONCURRENCY, cache=None,
+                               batch_budget=None, output_mode=OUTPUT_MODE, stream=STREAM_RESPONSES,
+                               on_result=None, datastore=None, job_id=None, preclassifier=None):
+    # batch_budget overrides the plan_batches limits, e.g. {'max_input_tokens': 4000}.
+    # on_result(review index, review, analysis) is called on the calling thread
+    # as each review's analysis becomes available, cached ones first.
+    # With a datastore each finished batch is checkpointed under job_id, and
+    # analyses already saved for the job are reused, so a rerun of an
+    # interrupted job only pays for the reviews that are still missing.
+    # A preclassifier settles the clear-cut reviews locally before any batching.
+    # Reuse analyses of reviews that were already sent with this prompt and model
+    keys = [analysis_cache_key(review, model, f"{PROMPT_VERSION}-{output_mode}") for review in reviews]
+    cached = cache.get_many(keys) if cache is not None else {}
+    checkpointing = datastore is not None and job_id is not None
+    saved = datastore.load_analyses(job_id) if checkpointing else {}
+    all_analyses = [saved.get(i) or cached.get(key) for i, key in enumerate(keys)]
+    cache_hits = sum(1 for i, key in enumerate(keys) if i not in saved and key in cached)
+    pending = [i for i, analysis in enumerate(all_analyses) if analysis is None]
+    if saved:
+        print(f"Resuming job {job_id}: {len(saved)} of {len(reviews)} reviews already analyzed")
+    if preclassifier is not None and pending:
+        for i in pending:
+            all_analyses[i] = preclassifier.classify(reviews[i])
+        remaining = [i for i in pending if all_analyses[i] is None]
+        print(f"Pre-classifier: {len(pending) - len(remaining)} of {len(pending)} reviews settled locally")
+        pending = remaining
+    if checkpointing:
+        datastore.save_analyses(job_id, {
+            i: analysis for i, analysis in enumerate(all_analyses) if analysis is not None and i not in saved
+        })
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Analysis cache: {cache_hits} of {len(reviews)} reviews cached "
+              f"(hit rate {stats['hit_rate']:.0%})")
+
+    # Pack the remaining reviews into as few prompts as the token budgets allow
+    batches = plan_batches(reviews, pending, prompt_tokens=PROMPT_TOKENS[output_mode], **(batch_budget or {}))
+
+    if on_result is not None:
+        for i, analysis in enumerate(all_analyses):
+            if analysis is not None:
+                on_result(i, reviews[i], analysis)
+
+    # Workers report single results and finished batches here, so callbacks
+    # (and any UI updates in them) run on the calling thread
+    events = queue.Queue()
+    # Batch spans run on worker threads, hang them off the caller's span
+    parent = metrics.current_span()
+
+    def run_batch(batch_index, batch):
         try:
-            batch_analyses = analyze_reviews_batch(batch, model, client)
-            all_analyses.extend(batch_analyses)
+            with metrics.span('analysis_batch', parent=parent) as span:
+                span.set(batch=batch_index, reviews=len(batch))
+                batch_analyses = analyze_reviews_batch(
+                    [reviews[i] for i in batch], model, client, output_mode, stream=stream,
+                    on_result=lambda position, analysis: events.put(('result', batch[position], analysis))
+                )
+                span.set(missing=batch_analyses.count(None))
+            events.put(('done', batch_index, batch_analyses))
         except Exception as e:
-            print(f"Error analyzing batch {i//BATCH_SIZE + 1}: {str(e)}")
-            # Add fallback analysis for failed batch
-            all_analyses.extend([{
-                'summary': 'Analysis failed due to API limits',
-                'sentiment': 'NEUTRAL',
-                'category': 'SATISFACTION'
-            } for _ in batch])
+            events.put(('failed', batch_index, e))
+
+    # Dispatch batches concurrently and slot results back by review index
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        for batch_index, batch in enumerate(batches):
+            executor.submit(run_batch, batch_index, batch)
+
+        finished = 0
+        while finished < len(batches):
+            kind, key, value = events.get()
+            if kind == 'result':
+                all_analyses[key] = value
+                if on_result is not None:
+                    on_result(key, reviews[key], value)
+                continue
+
+            finished += 1
+            batch = batches[key]
+            if kind == 'failed':
+                print(f"Error analyzing batch {key + 1}: {str(value)}")
+                # Add fallback analysis for failed batch. These are not
+                # checkpointed, so resuming the job sends the batch again.
+                for i in batch:
+                    if all_analyses[i] is None:
+                        all_analyses[i] = fallback_analysis('Analysis failed due to API limits', str(value))
+                        if on_result is not None:
+                            on_result(i, reviews[i], all_analyses[i])
+                if checkpointing:
+                    # Keep the reviews that streamed in before the failure
+                    datastore.save_analyses(job_id, {i: all_analyses[i] for i in batch
+                                                     if 'error' not in all_analyses[i]})
+                continue
+            # Only real analyses are cached, the fallbacks are checkpointed with
+            # the job so a resume does not ask for the same reviews again
+            if cache is not None:
+                cache.put_many({
+                    keys[i]: analysis for i, analysis in zip(batch, value) if analysis is not None
+                })
+            missing = [i for i, analysis in zip(batch, value) if analysis is None]
+            if missing:
+                print(f"{len(missing)} reviews of batch {key + 1} still missing after repair, counted as neutral")
+            for i, analysis in zip(batch, value):
+                if analysis is None:
+                    analysis = fallback_analysis('Analysis missing from the model response')
+                    if on_result is not None:
+                        on_result(i, reviews[i], analysis)
+                all_analyses[i] = analysis
+            if checkpointing:
+                datastore.save_analyses(job_id, {i: all_analyses[i] for i in batch})
     
     # Attach analyses to reviews
     for review, analysis in zip(reviews, all_analyses):
-        review['analysis'] = analysis
-    
-    # Save progress
-    with open('review_analysis_progress.json', 'w', encoding='utf-8') as f:
-        json.dump(reviews, f, ensure_ascii=False, indent=2)
+        if analysis is not None:
+            review['analysis'] = analysis
     
     # Do the overall analysis with a summary of the analyzed reviews
     try:
         # Count sentiments and categories for a quick summary
-        sentiments = {'POSITIVE': 0, 'NEGATIVE': 0, 'NEUTRAL': 0}
-        categories = {'SATISFACTION': 0, 'DELIVERY': 0, 'AUTHENTICATION': 0, 'QUALITY': 0}
-        
-        for review in reviews:
-            analysis = review.get('analysis', {})
-            sentiments[analysis.get('sentiment', 'NEUTRAL')] += 1
-            categories[analysis.get('category', 'SATISFACTION')] += 1
-        
-        total = len(reviews)
-        positive_percent = (sentiments['POSITIVE'] / total) * 100 if total > 0 else 0
+        aggregates = summarize_reviews(reviews)
+        sentiments = aggregates['sentiments']
+        categories = aggregates['categories']
+        total = aggregates['total']
+        positive_percent = aggregates['positive_percent']
         
         analysis_text = f'''
 Confidence Score: {positive_percent:.0f}% positive reviews
@@ -0,0 +1,307 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import metrics
+from aggregation import summarize_reviews
+from genai_analysis import FALLBACK_SOURCE, MAX_CONCURRENCY, analyze_reviews_with_genai
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_SCRAPING = 'scraping'
+JOB_ANALYZING = 'analyzing'
+JOB_DONE = 'done'
+# Finished, but some batches failed and their reviews only have fallbacks
+JOB_INCOMPLETE = 'incomplete'
+JOB_FAILED = 'failed'
+
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_SCRAPING, JOB_ANALYZING)
+# Jobs worth picking up again from their checkpoints
+RESUMABLE_STATUSES = ACTIVE_STATUSES + (JOB_INCOMPLETE,)
+
+# Query parameters that never change which product a URL points at
+TRACKING_PARAMS = ('fbclid', 'gclid', 'mc_cid', 'mc_eid', '_pos', '_sid', '_ss')
+
+# Latest analyses kept on a job for the page to show while it polls
+RECENT_RESULTS = 20
+
+# Seconds between prunes of old jobs from the datastore
+DATASTORE_PRUNE_INTERVAL = 3600
+
+class JobStore:
+    # In-memory job records, shared by every session in the process
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, url, job_id=None):
+        now = time.time()
+        job = {
+            'id': job_id or uuid.uuid4().hex,
+            'url': url,
+            'status': JOB_QUEUED,
+            'created_at': now,
+            'updated_at': now,
+            'scraped': 0,
+            'analyzed': 0,
+            'recent_results': [],
+            'reviews': None,
+            'genai_output': None,
+            'sentiments': None,
+            'aggregates': None,
+            'error': None,
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot['recent_results'] = list(job['recent_results'])
+            return snapshot
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job['updated_at'] = time.time()
+
+    def add_result(self, job_id, result):
+        with self._lock:
+            job = self._jobs[job_id]
+            job['analyzed'] += 1
+            job['recent_results'] = (job['recent_results'] + [result])[-RECENT_RESULTS:]
+            job['updated_at'] = time.time()
+
+    def prune(self):
+        # Forget finished jobs nobody has looked at for a while
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['status'] not in ACTIVE_STATUSES and job['updated_at'] < cutoff]:
+                del self._jobs[job_id]
+
+class ResultCache:
+    # Finished analyses per normalized product URL, shared across sessions.
+    # Entries expire after ttl seconds, the least recently used go first.
+    def __init__(self, ttl=6 * 3600, max_entries=100):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time() - self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, url, result):
+        key = normalize_url(url)
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def normalize_url(url):
+    # Same product page, same key: lowercase scheme and host, no fragment,
+    # trailing slash or tracking parameters, remaining parameters sorted
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS)
+    return urlunsplit((parts.scheme.lower() or 'https', host, path, urlencode(query), ''))
+
+def is_complete(result):
+    # Only complete analyses are worth serving to the next requester: one
+    # with fallbacks for reviews Mistral never analyzed should be redone
+    if not result['reviews'] or result['genai_output'].startswith('Analysis incomplete'):
+        return False
+    return not any(review.get('analysis', {}).get('source') == FALLBACK_SOURCE for review in result['reviews'])
+
+def result_status(result):
+    # Reviews whose batch failed are reported in the result's error
+    return JOB_INCOMPLETE if result.get('error') else JOB_DONE
+
+def run_review_analysis(job_id, url, store, scraper, scrape_cache, client, model, analysis_cache=None,
+                        datastore=None, resume=False, preclassifier=None, max_concurrency=MAX_CONCURRENCY):
+    # With resume, a job already in the datastore keeps its saved reviews and
+    # only the reviews without a checkpointed analysis are sent to Mistral
+    if datastore is None:
+        return _run_review_analysis(job_id, url, store, scraper, scrape_cache, client, model, analysis_cache,
+                                    preclassifier=preclassifier, max_concurrency=max_concurrency)
+    datastore.create_job(job_id, url, JOB_SCRAPING)
+    try:
+        result = _run_review_analysis(job_id, url, store, scraper, scrape_cache, client, model,
+                                      analysis_cache, datastore, resume, preclassifier, max_concurrency)
+    except Exception as e:
+        datastore.update_job(job_id, JOB_FAILED, error=str(e))
+        raise
+    datastore.update_job(job_id, result_status(result), genai_output=result['genai_output'],
+                         sentiments=result['sentiments'], error=result.get('error'),
+                         aggregates=result['aggregates'])
+    return result
+
+def _run_review_analysis(job_id, url, store, scraper, scrape_cache, client, model, analysis_cache=None,
+                         datastore=None, resume=False, preclassifier=None, max_concurrency=MAX_CONCURRENCY):
+    reviews = datastore.load_reviews(job_id) if resume and datastore is not None else []
+    if reviews:
+        logger.info(f"Resuming job {job_id} with {len(reviews)} saved reviews")
+        store.update(job_id, scraped=len(reviews))
+    else:
+        store.update(job_id, status=JOB_SCRAPING)
+        with metrics.span('scrape') as span:
+            reviews = scraper.scrape_reviews_incremental(url, scrape_cache)
+            span.set(reviews=len(reviews))
+        store.update(job_id, scraped=len(reviews))
+        if datastore is not None:
+            datastore.save_reviews(job_id, reviews)
+    if not reviews:
+        return {'reviews': [], 'genai_output': None, 'sentiments': None, 'aggregates': None}
+
+    store.update(job_id, status=JOB_ANALYZING)
+    if datastore is not None:
+        datastore.update_job(job_id, JOB_ANALYZING)
+
+    def record(index, review, analysis):
+        store.add_result(job_id, {
+            'title': review.get('title', ''),
+            'sentiment': analysis.get('sentiment', ''),
+            'summary': analysis.get('summary', ''),
+        })
+
+    with metrics.span('analysis') as span:
+        span.set(reviews=len(reviews))
+        genai_output, sentiments = analyze_reviews_with_genai(
+            reviews, model, client, max_concurrency=max_concurrency, cache=analysis_cache, on_result=record,
+            datastore=datastore, job_id=job_id, preclassifier=preclassifier
+        )
+    # Computed once here, so the page and the CLI just read them off the result
+    result = {'reviews': reviews, 'genai_output': genai_output, 'sentiments': sentiments,
+              'aggregates': summarize_reviews(reviews)}
+    failed = sum(1 for review in reviews if review.get('analysis', {}).get('error'))
+    if failed:
+        # The job is left resumable, resuming it only sends these reviews again
+        result['error'] = f"{failed} of {len(reviews)} reviews could not be analyzed"
+    return result
+
+class JobQueue:
+    # Runs scrape + analysis jobs on a fixed pool of worker threads so work
+    # survives reruns and concurrent sessions share the same capacity. A URL
+    # already being processed is not started again, later callers get the
+    # running job's id and share its result, and one finished within the
+    # result cache's TTL is answered straight from there.
+    def __init__(self, pipeline, workers=2, store=None, results=None, datastore=None):
+        self.pipeline = pipeline
+        self.store = store or JobStore()
+        self.results = results if results is not None else ResultCache()
+        # Old jobs are pruned from here too, see ReviewStore.prune
+        self.datastore = datastore
+        self.coalesced = 0
+        self._pruned_at = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='review-job')
+
+    def submit(self, url):
+        self.store.prune()
+        self._prune_datastore()
+        key = normalize_url(url)
+        with self._lock:
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                self.coalesced += 1
+                metrics.inc('job_submissions_total', outcome='coalesced')
+                logger.info(f"Attaching to in-flight job {job_id} for {key}")
+                return job_id
+            job = self.store.create(url)
+            result = self.results.get(key)
+            if result is not None:
+                logger.info(f"Serving {key} from the result cache")
+                metrics.inc('job_submissions_total', outcome='cached')
+                self.store.update(job['id'], status=JOB_DONE, scraped=len(result['reviews']),
+                                  analyzed=len(result['reviews']), **result)
+                return job['id']
+            self._inflight[key] = job['id']
+        metrics.inc('job_submissions_total', outcome='started')
+        self._executor.submit(self._run, job['id'], url, key)
+        return job['id']
+
+    def resume(self, job_id, url):
+        # Picks up a job cut short by a crash, restart or failure under the
+        # same id, so pages polling it reattach. Returns the id to poll, which
+        # is another job's when the URL is already being processed.
+        key = normalize_url(url)
+        with self._lock:
+            job = self.store.get(job_id)
+            if job is not None and job['status'] in ACTIVE_STATUSES:
+                return job_id
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return inflight
+            self.store.create(url, job_id=job_id)
+            self._inflight[key] = job_id
+        self._executor.submit(self._run, job_id, url, key, True)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _prune_datastore(self):
+        # A delete over the whole database, so at most once per interval
+        now = time.time()
+        if self.datastore is None or now - self._pruned_at < DATASTORE_PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        removed = self.datastore.prune()
+        if removed:
+            logger.info(f"Pruned {removed} old jobs from the datastore")
+
+    def _run(self, job_id, url, key, resume=False):
+        start = time.perf_counter()
+        try:
+            # Every span of the job shares its id as trace id
+            with metrics.span('job', trace_id=job_id) as span:
+                span.set(url=url, resume=resume)
+                if resume:
+                    result = self.pipeline(job_id, url, self.store, resume=True)
+                else:
+                    result = self.pipeline(job_id, url, self.store)
+            metrics.inc('jobs_total', status=result_status(result))
+            status = dict(result, status=result_status(result))
+            if is_complete(result):
+                self.results.put(key, result)
+            logger.info(f"Job {job_id} finished in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            metrics.inc('jobs_total', status=JOB_FAILED)
+            status = dict(status=JOB_FAILED, error=str(e))
+        # Publish the result and release the key together, so a caller never
+        # attaches to a job that has already been dropped from in-flight
+        with self._lock:
+            self.store.update(job_id, **status)
+            del self._inflight[key]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get("REVIEWAI_LLM_CACHE", os.path.join(".review_cache", "llm_cache.sqlite3"))
+
+def analysis_cache_key(review, model, prompt_version):
+    content = '\x1f'.join([
+        str(prompt_version),
+        model,
+        review.get('title', '') or '',
+        review.get('text', '') or '',
+    ])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+class AnalysisCache:
+    # Parsed per-review analyses on disk, with TTL expiry and LRU eviction
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=30 * 24 * 3600, max_entries=200000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_accessed ON analyses (accessed_at)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay well under SQLite's bound parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, analysis FROM analyses WHERE created_at >= ? AND key IN ({placeholders})",
+                    [now - self.ttl] + chunk
+                ).fetchall()
+                found.update((key, json.loads(analysis)) for key, analysis in rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE analyses SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        rows = [(key, json.dumps(analysis, ensure_ascii=False, separators=(',', ':')), now, now)
+                for key, analysis in items.items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analyses (key, analysis, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM analyses WHERE key IN (SELECT key FROM analyses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,212 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Spans are appended here as JSON lines when set
+TRACE_FILE = os.environ.get("REVIEWAI_TRACE_FILE")
+
+PREFIX = 'reviewai_'
+
+# Upper bounds in seconds, from a DOM poll up to a whole analysis
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _label_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+def _key(name, labels):
+    return name, tuple(sorted((key, _label_value(value)) for key, value in labels.items()))
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class Registry:
+    # Process-wide counters and histograms keyed by name and labels
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': round(h.sum, 6)}
+                               for (name, labels), h in sorted(self.histograms.items())],
+            }
+
+    def prometheus_text(self):
+        # Text exposition format, cumulative buckets as Prometheus expects
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (histogram, labels), h in sorted(self.histograms.items()):
+                    if histogram != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {h.sum}")
+                    lines.append(f"{PREFIX}{name}_count{_labels(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (key + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+registry = Registry()
+
+_ids = itertools.count(1)
+_local = threading.local()
+_trace_lock = threading.Lock()
+_trace_file = None
+
+def _write_trace(record):
+    global _trace_file
+    with _trace_lock:
+        if _trace_file is None:
+            _trace_file = open(TRACE_FILE, 'a', encoding='utf-8', buffering=1)
+        _trace_file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n')
+
+class Span:
+    # Times a block, records it in the `<name>_seconds` histogram and, with
+    # a trace file, as one JSON line. Labels go on the histogram, attributes
+    # set while the span is open only go to the trace.
+    def __init__(self, name, parent=None, trace_id=None, **labels):
+        self.name = name
+        self.labels = labels
+        self.attributes = {}
+        self.parent = parent
+        self.trace_id = trace_id or (parent.trace_id if parent is not None else None)
+        self.span_id = next(_ids)
+        self.start = self.start_time = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = getattr(_local, 'spans', None)
+        if stack is None:
+            stack = _local.spans = []
+        if self.parent is None and stack:
+            self.parent = stack[-1]
+            self.trace_id = self.trace_id or self.parent.trace_id
+        stack.append(self)
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        stack = getattr(_local, 'spans', [])
+        # A generator's span can be closed from another thread by the GC
+        if self in stack:
+            stack.remove(self)
+        status = 'error' if exc_type is not None else 'ok'
+        registry.observe(f"{self.name}_seconds", duration, **self.labels)
+        if exc_type is not None:
+            registry.inc(f"{self.name}_errors_total", **self.labels)
+        if TRACE_FILE:
+            record = {
+                'ts': round(self.start_time, 6),
+                'name': self.name,
+                'duration_ms': round(duration * 1000, 3),
+                'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_id': self.parent.span_id if self.parent is not None else None,
+                'thread': threading.current_thread().name,
+                'status': status,
+            }
+            record.update(self.labels)
+            record.update(self.attributes)
+            if exc is not None:
+                record['error'] = str(exc)
+            _write_trace(record)
+        return False
+
+def span(name, parent=None, trace_id=None, **labels):
+    return Span(name, parent=parent, trace_id=trace_id, **labels)
+
+def current_span():
+    # Pass this as parent= to spans opened on other threads
+    stack = getattr(_local, 'spans', None)
+    return stack[-1] if stack else None
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+def start_metrics_server(port, host='127.0.0.1'):
+    # Serves /metrics (Prometheus text) and /metrics.json from a daemon thread.
+    # http.server is only imported here, it is not needed unless a port is set.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.prometheus_text(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(registry.snapshot()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
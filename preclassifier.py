@@ -0,0 +1,204 @@
+import logging
+import re
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Positive and negative phrases per checklist factor
+FACTOR_KEYWORDS = {
+    'Product Quality': {
+        'positive': ['good quality', 'excellent quality', 'impressive quality', 'high quality', 'premium quality', 'superior quality', 'durable', 'sturdy', 'solid', 'well made', 'premium', 'excellent', 'perfect', 'strong', 'rigid', 'lightweight', 'comfortable', 'soft', 'smooth', 'well constructed', 'top notch', 'first class'],
+        'negative': ['poor quality', 'bad quality', 'low quality', 'cheap quality', 'inferior quality', 'cheap', 'flimsy', 'broke', 'damaged', 'defective', 'weak', 'thin', 'uncomfortable', 'rough', 'scratched', 'torn', 'loose', 'poorly made', 'falling apart', 'not durable']
+    },
+    'Delivery Experience': {
+        'positive': ['fast delivery', 'quick shipping', 'well packed', 'protected', 'on time', 'early', 'secure packaging', 'careful packaging', 'tracked', 'professional delivery'],
+        'negative': ['late', 'delayed', 'damaged package', 'poor packaging', 'lost', 'wrong address', 'missing', 'slow shipping', 'no tracking', 'unprofessional']
+    },
+    'Authenticity': {
+        'positive': ['genuine', 'authentic', 'original', 'real', 'legitimate', 'official', 'verified', 'branded', 'authorized', 'genuine product'],
+        'negative': ['fake', 'counterfeit', 'replica', 'knockoff', 'copy', 'imitation', 'suspicious', 'not original', 'unauthentic', 'questionable']
+    },
+    'Customer Satisfaction': {
+        'positive': ['satisfied', 'happy', 'pleased', 'delighted', 'amazed', 'excellent', 'fantastic', 'wonderful', 'love', 'perfect', 'impressed', 'recommend', 'worth'],
+        'negative': ['disappointed', 'frustrated', 'angry', 'upset', 'terrible', 'poor', 'bad', 'hate', 'regret', 'annoyed', 'dissatisfied', 'waste', 'not worth']
+    }
+}
+
+FACTOR_CATEGORIES = {
+    'Product Quality': 'QUALITY',
+    'Delivery Experience': 'DELIVERY',
+    'Authenticity': 'AUTHENTICATION',
+    'Customer Satisfaction': 'SATISFACTION'
+}
+
+# Phrases that flip the meaning of what follows, so the review goes to the model
+NEGATIONS = ['not', 'no', 'never', 'hardly', 'without', "don't", "doesn't", "didn't", "isn't",
+             "wasn't", "won't", "can't", "couldn't", "wouldn't", 'dont', 'doesnt', 'didnt', 'isnt']
+
+SUMMARY_LENGTH = 120
+
+# Tags analyses made here, so they are never used as training labels
+LOCAL_SOURCE = 'local'
+
+class KeywordAutomaton:
+    # Aho-Corasick automaton over lowercase phrases: one pass over the text
+    # finds every phrase, however many there are
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+    def add(self, phrase, value):
+        state = 0
+        for char in phrase.lower():
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((len(phrase), value))
+
+    def build(self):
+        # Breadth-first, so every state's fail link is set before its children's
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, child in self.goto[state].items():
+                pending.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.fail[child] == child:
+                    self.fail[child] = 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        return self
+
+    def find(self, text):
+        # Yields (start, end, value) for whole-word matches in lowercase text
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                start = end - length
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    yield start, end, value
+
+def _longest_matches(matches):
+    # 'not worth' also contains 'worth': keep the longest of overlapping matches
+    taken = []
+    for start, end, value in sorted(matches, key=lambda m: m[0] - m[1]):
+        if all(end <= s or start >= e for s, e, _ in taken):
+            taken.append((start, end, value))
+    return sorted(taken)
+
+def _summary(review):
+    title = (review.get('title') or '').strip()
+    text = (review.get('text') or '').strip()
+    summary = title or re.split(r'(?<=[.!?])\s', text, maxsplit=1)[0]
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH].rsplit(' ', 1)[0] + '...'
+    return summary
+
+class PreClassifier:
+    # Assigns sentiment and category locally when keyword hits and the star
+    # rating agree, and returns None for anything ambiguous so it goes to
+    # Mistral. With scikit-learn installed a TF-IDF + logistic regression
+    # model trained on earlier analyses can settle reviews without keywords.
+    def __init__(self, keywords=FACTOR_KEYWORDS, min_confidence=0.8):
+        self.min_confidence = min_confidence
+        self.automaton = KeywordAutomaton()
+        for factor, phrases in keywords.items():
+            for polarity in ('positive', 'negative'):
+                for phrase in phrases[polarity]:
+                    self.automaton.add(phrase, (FACTOR_CATEGORIES[factor], polarity))
+        for phrase in NEGATIONS:
+            self.automaton.add(phrase, (None, 'negation'))
+        self.automaton.build()
+        self.sentiment_model = None
+        self.category_model = None
+        self.classified = 0
+        self.deferred = 0
+
+    def fit(self, reviews, min_samples=200):
+        # Trains the optional text models on reviews that already have an analysis
+        labelled = [review for review in reviews if review.get('analysis')]
+        if len(labelled) < min_samples:
+            return False
+        try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.pipeline import make_pipeline
+        except ImportError:
+            return False
+        texts = [f"{review.get('title', '')} {review.get('text', '')}" for review in labelled]
+        models = []
+        for field in ('sentiment', 'category'):
+            labels = [review['analysis'][field] for review in labelled]
+            if len(set(labels)) < 2:
+                return False
+            model = make_pipeline(TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True),
+                                  LogisticRegression(max_iter=1000))
+            models.append(model.fit(texts, labels))
+        self.sentiment_model, self.category_model = models
+        logger.info(f"Pre-classifier text model trained on {len(labelled)} reviews")
+        return True
+
+    def classify(self, review):
+        analysis = self._classify_keywords(review) or self._classify_model(review)
+        if analysis is None:
+            self.deferred += 1
+        else:
+            self.classified += 1
+        return analysis
+
+    def _classify_keywords(self, review):
+        try:
+            rating = int(float(review.get('rating') or 0))
+        except ValueError:
+            return None
+        text = f"{review.get('title', '')}. {review.get('text', '')}".lower()
+        hits = {'positive': {}, 'negative': {}}
+        for _, _, (category, polarity) in _longest_matches(self.automaton.find(text)):
+            if polarity == 'negation':
+                return None
+            hits[polarity][category] = hits[polarity].get(category, 0) + 1
+
+        if rating >= 4 and hits['positive'] and not hits['negative']:
+            sentiment, counts = 'POSITIVE', hits['positive']
+        elif 1 <= rating <= 2 and hits['negative'] and not hits['positive']:
+            sentiment, counts = 'NEGATIVE', hits['negative']
+        else:
+            return None
+
+        # Agreeing keywords and an extreme rating both add confidence
+        confidence = 0.5 + 0.1 * min(sum(counts.values()), 3) + (0.2 if rating in (1, 5) else 0.0)
+        if confidence < self.min_confidence:
+            return None
+
+        # The most mentioned factor wins; a tie only resolves to general satisfaction
+        top = max(counts.values())
+        leaders = [category for category, count in counts.items() if count == top]
+        if len(leaders) == 1:
+            category = leaders[0]
+        elif 'SATISFACTION' in leaders:
+            category = 'SATISFACTION'
+        else:
+            return None
+        return {'summary': _summary(review), 'sentiment': sentiment, 'category': category, 'source': LOCAL_SOURCE}
+
+    def _classify_model(self, review):
+        if self.sentiment_model is None:
+            return None
+        text = [f"{review.get('title', '')} {review.get('text', '')}"]
+        labels = []
+        for model in (self.sentiment_model, self.category_model):
+            probabilities = model.predict_proba(text)[0]
+            best = probabilities.argmax()
+            if probabilities[best] < self.min_confidence:
+                return None
+            labels.append(model.classes_[best])
+        return {'summary': _summary(review), 'sentiment': labels[0], 'category': labels[1], 'source': LOCAL_SOURCE}
@@ -0,0 +1,125 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = burst if burst is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now, rate_factor=1.0):
+        # Takes the tokens right away (going into debt if needed) and returns
+        # how long the caller has to wait before the debt is paid off
+        rate = self.rate_per_minute * rate_factor / 60.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return -self.tokens / rate if self.tokens < 0 else 0.0
+
+    def adjust(self, amount):
+        self.tokens -= amount
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=60, tokens_per_minute=500000, request_burst=None,
+                 max_retries=5, base_delay=1.0, max_delay=60.0):
+        # A request burst of one second's worth keeps calls evenly spread out
+        self.requests = TokenBucket(requests_per_minute, request_burst or max(1, requests_per_minute / 60))
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_factor = 1.0
+        self.rate_limit_hits = 0
+        self.retries = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now, self.rate_factor),
+                self.tokens.reserve(tokens, now, self.rate_factor),
+                self._blocked_until - now,
+            )
+        if wait > 0:
+            metrics.observe('rate_limiter_wait_seconds', wait)
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        # Settle the estimate taken up front against what the API reports
+        with self._lock:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def call(self, fn, *args, estimated_tokens=0, **kwargs):
+        attempt = 0
+        while True:
+            self.acquire(estimated_tokens)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status = _status_code(e)
+                if status not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(e, status, attempt)
+                logger.warning(f"Mistral call failed with status {status}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            with self._lock:
+                # Creep back up to the configured pace after a slowdown
+                self.rate_factor = min(1.0, self.rate_factor + 0.05)
+            return result
+
+    def _backoff(self, error, status, attempt):
+        retry_after = _retry_after(error)
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        metrics.inc('mistral_retries_total', status=status)
+        with self._lock:
+            self.retries += 1
+            if status == 429:
+                self.rate_limit_hits += 1
+                metrics.inc('mistral_rate_limit_hits_total')
+                self.rate_factor = max(0.1, self.rate_factor * 0.5)
+                # A rate limit applies to every caller, so pause them all
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+def _status_code(error):
+    status = getattr(error, 'http_status', None)
+    if status is None and 'rate limit' in str(error).lower():
+        return 429
+    return status
+
+def _retry_after(error):
+    return retry_after_seconds(getattr(error, 'headers', None) or {})
+
+def retry_after_seconds(headers):
+    # Seconds asked for by a Retry-After header (delay or HTTP date), None without one
+    value = None
+    for key, header_value in headers.items():
+        if key.lower() == 'retry-after':
+            value = header_value
+            break
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
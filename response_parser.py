@@ -0,0 +1,153 @@
+import json
+
+SENTIMENTS = ('POSITIVE', 'NEGATIVE', 'NEUTRAL')
+CATEGORIES = ('SATISFACTION', 'DELIVERY', 'AUTHENTICATION', 'QUALITY')
+
+def _clean_tag(value):
+    return str(value or '').strip().strip('[]*').strip().upper()
+
+def normalize_analysis(item):
+    # Returns the analysis in the shape the app expects, or None when it does not fit the schema
+    if not isinstance(item, dict):
+        return None
+    sentiment = _clean_tag(item.get('sentiment'))
+    category = _clean_tag(item.get('category'))
+    summary = item.get('summary')
+    if sentiment not in SENTIMENTS or category not in CATEGORIES or not isinstance(summary, str):
+        return None
+    return {'summary': summary.strip(), 'sentiment': sentiment, 'category': category}
+
+def _review_id(value):
+    try:
+        return int(str(value).strip().lstrip('#'))
+    except (TypeError, ValueError):
+        return None
+
+class JsonObjectStream:
+    # Incrementally pulls flat JSON objects out of model output. Code fences,
+    # prose around the JSON, wrapper objects and a truncated tail are all
+    # tolerated: only complete objects without nested objects are returned.
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.in_string = False
+        self.escape = False
+        self.stack = []
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        objects = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = bool(self.stack)
+            elif char == '{':
+                if self.stack:
+                    self.stack[-1][1] = True
+                self.stack.append([self.pos, False])
+            elif char == '}' and self.stack:
+                start, has_child = self.stack.pop()
+                if not has_child:
+                    try:
+                        objects.append(json.loads(self.buffer[start:self.pos + 1]))
+                    except ValueError:
+                        pass
+            self.pos += 1
+
+        if not self.stack:
+            # Nothing open, drop what has been consumed
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        return objects
+
+class JsonAnalysisStream:
+    # Yields (review id, analysis) pairs as soon as each JSON item is complete
+    def __init__(self):
+        self.objects = JsonObjectStream()
+
+    def feed(self, chunk):
+        results = []
+        for item in self.objects.feed(chunk):
+            review_id = _review_id(item.get('id')) if isinstance(item, dict) else None
+            analysis = normalize_analysis(item)
+            if review_id is not None and analysis is not None:
+                results.append((review_id, analysis))
+        return results
+
+    def close(self):
+        return []
+
+class ReviewBlockStream:
+    # Yields (review number, analysis) pairs for the REVIEW n: / SUMMARY: /
+    # SENTIMENT: / CATEGORY: format once all of a block's fields have arrived
+    def __init__(self):
+        self.pending = ''
+        self.current_analysis = {}
+        self.current_review_num = None
+        self.emitted = False
+        self.blocks = 0
+
+    def feed(self, chunk):
+        self.pending += chunk
+        *lines, self.pending = self.pending.split('\n')
+        results = []
+        for line in lines:
+            self._line(line, results)
+        return results
+
+    def close(self):
+        results = []
+        if self.pending:
+            self._line(self.pending, results)
+            self.pending = ''
+        return results
+
+    def _line(self, line, results):
+        line = line.strip().strip('*').strip()
+        if line.upper().startswith('REVIEW '):
+            self.blocks += 1
+            self.current_analysis = {}
+            self.emitted = False
+            parts = line.split()
+            self.current_review_num = _review_id(parts[1].strip(':')) if len(parts) > 1 else None
+            if self.current_review_num is None:
+                self.current_review_num = self.blocks
+            return
+        if line.startswith('SUMMARY:'):
+            self.current_analysis['summary'] = line[8:].strip()
+        elif line.startswith('SENTIMENT:'):
+            self.current_analysis['sentiment'] = line[10:].strip()
+        elif line.startswith('CATEGORY:'):
+            self.current_analysis['category'] = line[9:].strip()
+        else:
+            return
+        analysis = normalize_analysis(self.current_analysis)
+        if analysis is not None and self.current_review_num is not None and not self.emitted:
+            self.emitted = True
+            results.append((self.current_review_num, analysis))
+
+STREAM_PARSERS = {
+    'text': ReviewBlockStream,
+    'json': JsonAnalysisStream,
+}
+
+def _parse_all(stream, response):
+    analyses = {}
+    for review_id, analysis in stream.feed(response) + stream.close():
+        analyses.setdefault(review_id, analysis)
+    return analyses
+
+def parse_json_analyses(response):
+    # Maps review id to analysis, items failing the schema check are left out
+    return _parse_all(JsonAnalysisStream(), response)
+
+def parse_text_analyses(response):
+    # Maps review number to analysis for the REVIEW n: format
+    return _parse_all(ReviewBlockStream(), response)
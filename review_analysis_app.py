@@ -1,28 +1,18 @@
 import os
-import json
 import streamlit as st
-from mistralai.client import MistralClient
 from dotenv import load_dotenv
 import time
-import statistics
-import re
-import pandas as pd
+import metrics
 from scraper import JashanmalScraper
-from genai_analysis import analyze_reviews_with_genai
-import urllib3
-import ssl
-import certifi
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-
-# Disable SSL verification warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# Create a custom SSL context
-ssl_context = ssl.create_default_context(cafile=certifi.where())
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
+from scrape_cache import ScrapeCache
+from llm_cache import AnalysisCache
+from datastore import ReviewStore
+from aggregation import summarize_reviews
+from preclassifier import FACTOR_CATEGORIES, PreClassifier
+from genai_analysis import read_error_bodies
+from jobs import (ACTIVE_STATUSES, JOB_DONE, JOB_FAILED, JOB_INCOMPLETE, JOB_QUEUED, JOB_SCRAPING, RESUMABLE_STATUSES,
+                  JobQueue, ResultCache, run_review_analysis)
+from functools import partial
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -33,6 +23,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Script runs are timed into ui_render_seconds, labelled by the view they drew
+render_start = time.perf_counter()
+
+# Serves /metrics for Prometheus (and /metrics.json) when a port is set
+@st.cache_resource
+def get_metrics_server():
+    port = os.environ.get("REVIEWAI_METRICS_PORT")
+    return metrics.start_metrics_server(int(port)) if port else None
+
+get_metrics_server()
+
 # Add some spacing
 st.markdown("""
     <style>
@@ -117,118 +118,85 @@ if not api_key:
     st.stop()
 
 model = "mistral-large-latest"
-client = MistralClient(api_key=api_key)
 
-# Initialize scraper with SSL context
-scraper = JashanmalScraper(verify_ssl=False)
+# Retries and rate limit backoff are handled by genai_analysis.mistral_limiter,
+# which honours Retry-After, so the SDK's own fixed retry loop is turned off.
+# Built once per API key instead of on every rerun.
+@st.cache_resource
+def get_mistral_client(api_key):
+    from mistralai.client import MistralClient
+    # MISTRAL_ENDPOINT can point at benchmarks/fake_mistral.py for load tests
+    endpoint = os.environ.get("MISTRAL_ENDPOINT", "https://api.mistral.ai")
+    return read_error_bodies(MistralClient(api_key=api_key, endpoint=endpoint, max_retries=1))
 
-# --- Helper to parse markdown table to DataFrame ---
-def parse_markdown_table(md_table):
-    lines = [line.strip() for line in md_table.splitlines() if line.strip()]
-    table_lines = [line for line in lines if line.startswith('|') and line.endswith('|')]
-    if len(table_lines) < 2:
-        return None
-    header = [h.strip() for h in table_lines[0].strip('|').split('|')]
-    rows = []
-    for line in table_lines[2:]:
-        row = [c.strip() for c in line.strip('|').split('|')]
-        if len(row) == len(header):
-            rows.append(row)
-    if not rows:
+client = get_mistral_client(api_key)
+
+# Initialize scraper with SSL context. Cached across reruns and sessions so its
+# pool of warm Chrome drivers survives between analyses.
+@st.cache_resource
+def get_scraper():
+    return JashanmalScraper(verify_ssl=False)
+
+scraper = get_scraper()
+
+# Reviews already read per product URL, so a re-analysis only fetches new ones
+@st.cache_resource
+def get_scrape_cache():
+    return ScrapeCache()
+
+scrape_cache = get_scrape_cache()
+
+# Mistral analyses keyed by review content, prompt version and model
+@st.cache_resource
+def get_analysis_cache():
+    return AnalysisCache()
+
+analysis_cache = get_analysis_cache()
+
+# Per-job reviews and analyses, kept apart so concurrent sessions don't clash
+@st.cache_resource
+def get_datastore():
+    return ReviewStore()
+
+datastore = get_datastore()
+
+# Settles clear-cut reviews from keywords and star rating before Mistral sees
+# them. Its optional text model learns from analyses already in the datastore.
+@st.cache_resource
+def get_preclassifier():
+    if os.environ.get("REVIEWAI_PRECLASSIFY", "1") == "0":
         return None
-    return pd.DataFrame(rows, columns=header)
+    preclassifier = PreClassifier()
+    preclassifier.fit(datastore.labelled_reviews())
+    return preclassifier
 
-# --- UI ---
-url = st.text_input("Product Reviews URL", "")
+preclassifier = get_preclassifier()
 
-if 'scraped_reviews' not in st.session_state:
-    st.session_state['scraped_reviews'] = None
-if 'genai_output' not in st.session_state:
-    st.session_state['genai_output'] = None
-if 'gallery_items' not in st.session_state:
-    st.session_state['gallery_items'] = None
-if 'verdict' not in st.session_state:
-    st.session_state['verdict'] = None
-if 'summary' not in st.session_state:
-    st.session_state['summary'] = None
+# One worker pool for the whole server, so concurrent sessions share browser
+# and Mistral capacity instead of each running their own scrape and LLM loop
+@st.cache_resource
+def get_job_queue():
+    pipeline = partial(run_review_analysis, scraper=scraper, scrape_cache=scrape_cache,
+                       client=client, model=model, analysis_cache=analysis_cache, datastore=datastore,
+                       preclassifier=preclassifier)
+    # Finished analyses are kept per product URL so a repeat request from any
+    # session is answered without scraping or calling Mistral again
+    results = ResultCache(ttl=int(os.environ.get("REVIEWAI_RESULT_TTL", str(6 * 3600))))
+    job_queue = JobQueue(pipeline, workers=int(os.environ.get("REVIEWAI_JOB_WORKERS", "2")), results=results,
+                         datastore=datastore)
+    # Carry on with jobs a crash or restart cut short, from their last saved
+    # batch, and retry the failed batches of incomplete ones
+    for job in datastore.jobs_with_status(RESUMABLE_STATUSES):
+        job_queue.resume(job['id'], job['url'])
+    return job_queue
 
-if st.button("Analyze Product Reviews"):
-    if not url.strip():
-        st.warning("Please enter a valid product reviews URL.")
-        st.stop()
-    step = st.empty()
-    progress = st.progress(0, text="Starting Reading...")
-    status = st.empty()
-    
-    step.info("Step 1: Reading reviews...")
-    spinner = st.empty()
-    with spinner:
-        st.spinner("Reading reviews from the product page...")
-        try:
-            reviews = scraper.scrape_reviews(url)
-            st.session_state['scraped_reviews'] = reviews
-            
-            # Save reviews to review.json, overwriting any existing file
-            with open('review.json', 'w', encoding='utf-8') as f:
-                json.dump(reviews, f, ensure_ascii=False, indent=2)
-                
-            progress.progress(1.0, text="Reading complete!")
-            status.success(f"Read {len(reviews)} reviews in total.")
-            step.success("Step 1: Reviews read successfully!")
-
-            # Clear the spinner
-            spinner.empty()
-
-            # Check if no reviews were found after showing completion
-            if not reviews:
-                st.markdown("""
-                <div style='background-color:#e9ecef;padding:20px;border-radius:10px;color:#000000;margin:20px 0;'>
-                    <h2 style='margin-bottom:0.2em;color:#000000 !important;'>⚠️ No Reviews Available</h2>
-                    <p style='margin:0;color:#000000;'>No reviews were found for this product. We cannot provide a recommendation at this time.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                st.stop()
-        except Exception as e:
-            st.error(f"Error reading reviews: {str(e)}")
-            st.stop()
-
-    # --- GenAI analysis ---
-    step.info("Step 2: Analyzing reviews with GenAI...")
-    progress2 = st.progress(0, text="Starting GenAI analysis...")
-    
-    try:
-        total_reviews = len(reviews)
-        for i in range(total_reviews):
-            progress2.progress((i+1)/total_reviews, text=f"Analyzing review {i+1} of {total_reviews}")
-            time.sleep(0.1)  # Small delay to show progress
-            
-        with st.spinner("Analyzing reviews with Mistral GenAI..."):
-            genai_output, sentiments = analyze_reviews_with_genai(reviews, model, client)
-            
-            # Check if analysis was incomplete due to rate limits
-            if "Analysis incomplete due to API rate limits" in genai_output:
-                st.warning("⚠️ Analysis was incomplete due to API rate limits. Some reviews may not be fully analyzed.")
-                
-                # Try to load progress from temporary file
-                try:
-                    with open('review_analysis_progress.json', 'r', encoding='utf-8') as f:
-                        reviews = json.load(f)
-                        st.info("✓ Loaded partially analyzed reviews from progress file.")
-                except:
-                    st.error("Could not load progress file. Please try again later.")
-                    st.stop()
-            
-        progress2.progress(1.0, text="GenAI analysis complete!")
-        step.success("Step 2: Analysis complete!")
-        st.session_state['genai_output'] = genai_output
-        st.session_state['sentiments'] = sentiments
-        
-    except Exception as e:
-        st.error(f"Error during analysis: {str(e)}")
-        st.warning("Please try again with fewer reviews or wait a few minutes before retrying.")
-        st.stop()
+job_queue = get_job_queue()
 
-    # --- Parse GenAI output ---
+# --- Helper to split the GenAI report into its sections ---
+# Cached by report text, so reruns and other sessions showing the same
+# analysis skip the parsing
+@st.cache_data(max_entries=100)
+def parse_genai_output(genai_output):
     output_lines = genai_output.splitlines()
     confidence = ''
     checklist = {}
@@ -262,12 +230,141 @@ if st.button("Analyze Product Reviews"):
             verdict = line
         elif section == 'verdict' and verdict and not verdict_reason and line:
             verdict_reason = line
-    st.session_state['verdict'] = verdict
-    st.session_state['confidence'] = confidence
-    st.session_state['checklist'] = checklist
-    st.session_state['details'] = details
-    st.session_state['images_analysis'] = images_analysis
-    st.session_state['verdict_reason'] = verdict_reason
+    return {
+        'verdict': verdict,
+        'confidence': confidence,
+        'checklist': checklist,
+        'details': details,
+        'images_analysis': images_analysis,
+        'verdict_reason': verdict_reason,
+    }
+
+# --- Helper to parse markdown table to DataFrame ---
+def parse_markdown_table(md_table):
+    import pandas as pd
+    lines = [line.strip() for line in md_table.splitlines() if line.strip()]
+    table_lines = [line for line in lines if line.startswith('|') and line.endswith('|')]
+    if len(table_lines) < 2:
+        return None
+    header = [h.strip() for h in table_lines[0].strip('|').split('|')]
+    rows = []
+    for line in table_lines[2:]:
+        row = [c.strip() for c in line.strip('|').split('|')]
+        if len(row) == len(header):
+            rows.append(row)
+    if not rows:
+        return None
+    return pd.DataFrame(rows, columns=header)
+
+# --- UI ---
+url = st.text_input("Product Reviews URL", "")
+
+if 'scraped_reviews' not in st.session_state:
+    st.session_state['scraped_reviews'] = None
+if 'genai_output' not in st.session_state:
+    st.session_state['genai_output'] = None
+if 'gallery_items' not in st.session_state:
+    st.session_state['gallery_items'] = None
+if 'verdict' not in st.session_state:
+    st.session_state['verdict'] = None
+if 'summary' not in st.session_state:
+    st.session_state['summary'] = None
+
+if st.button("Analyze Product Reviews"):
+    if not url.strip():
+        st.warning("Please enter a valid product reviews URL.")
+        st.stop()
+    # The scrape and analysis run on the shared job queue, this page only polls
+    st.session_state['job_id'] = job_queue.submit(url.strip())
+    st.session_state['loaded_job'] = None
+    st.query_params['job'] = st.session_state['job_id']
+    st.session_state['scraped_reviews'] = None
+    st.session_state['genai_output'] = None
+
+# Reattach to a job after a browser refresh
+if not st.session_state.get('job_id') and st.query_params.get('job'):
+    st.session_state['job_id'] = st.query_params['job']
+
+job_id = st.session_state.get('job_id')
+job = job_queue.get(job_id) if job_id else None
+if job_id and job is None:
+    # Not known in memory, e.g. after a restart, so look in the datastore
+    saved = datastore.get_job(job_id)
+    if saved is not None and saved['status'] in (JOB_DONE, JOB_INCOMPLETE):
+        job = dict(saved, reviews=datastore.load_reviews(job_id))
+    elif saved is not None:
+        job_id = job_queue.resume(job_id, saved['url'])
+        st.session_state['job_id'] = job_id
+        st.query_params['job'] = job_id
+        job = job_queue.get(job_id)
+if job_id and job is None:
+    st.session_state['job_id'] = None
+    st.query_params.clear()
+    st.warning("This analysis is no longer available. Please run it again.")
+    # Don't fall through to results another job left in the session
+    st.stop()
+
+elif job and job['status'] in ACTIVE_STATUSES:
+    if job['status'] == JOB_QUEUED:
+        st.info("Waiting for a free worker...")
+    elif job['status'] == JOB_SCRAPING:
+        st.info("Step 1: Reading reviews...")
+        st.progress(0, text="Reading reviews from the product page...")
+    else:
+        st.success(f"Step 1: Read {job['scraped']} reviews in total.")
+        st.info("Step 2: Analyzing reviews with GenAI...")
+        analyzed = min(job['analyzed'], job['scraped'])
+        st.progress(analyzed / job['scraped'] if job['scraped'] else 0,
+                    text=f"Analyzed {analyzed} of {job['scraped']} reviews")
+        if job['recent_results']:
+            with st.expander("Live analysis results", expanded=False):
+                for result in job['recent_results']:
+                    sentiment_icon = '🟢' if result['sentiment'] == 'POSITIVE' else '🔴'
+                    st.markdown(f"{sentiment_icon} **{result['title']}**: {result['summary']}")
+    metrics.observe('ui_render_seconds', time.perf_counter() - render_start, view='progress')
+    time.sleep(1)
+    st.rerun()
+
+elif job and job['status'] == JOB_FAILED:
+    st.session_state['job_id'] = None
+    st.query_params.clear()
+    st.error(f"Error during analysis: {job['error']}")
+    st.warning("Please try again with fewer reviews or wait a few minutes before retrying.")
+    st.stop()
+
+elif job and st.session_state.get('loaded_job') != job_id:
+    st.session_state['loaded_job'] = job_id
+    reviews = job['reviews']
+    st.session_state['scraped_reviews'] = reviews
+
+    # Check if no reviews were found
+    if not reviews:
+        st.markdown("""
+        <div style='background-color:#e9ecef;padding:20px;border-radius:10px;color:#000000;margin:20px 0;'>
+            <h2 style='margin-bottom:0.2em;color:#000000 !important;'>⚠️ No Reviews Available</h2>
+            <p style='margin:0;color:#000000;'>No reviews were found for this product. We cannot provide a recommendation at this time.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        st.stop()
+
+    genai_output = job['genai_output']
+    sentiments = job['sentiments']
+
+    # Some batches failed, e.g. on API rate limits: their reviews count as
+    # neutral until the job is resumed
+    st.session_state['incomplete_job'] = None
+    if job['status'] == JOB_INCOMPLETE:
+        st.session_state['incomplete_job'] = {'id': job_id, 'url': job['url'], 'error': job['error']}
+
+    st.session_state['genai_output'] = genai_output
+    st.session_state['sentiments'] = sentiments
+    # Ratings, sentiment and category aggregates for the results view, computed
+    # by the job. Only jobs saved before they were stored need them worked out.
+    st.session_state['aggregates'] = job.get('aggregates') or summarize_reviews(reviews)
+
+    # --- Parse GenAI output ---
+    for key, value in parse_genai_output(genai_output).items():
+        st.session_state[key] = value
 
 # --- Show results if already in session state ---
 if st.session_state.get('scraped_reviews') and st.session_state.get('genai_output'):
@@ -281,6 +378,7 @@ if st.session_state.get('scraped_reviews') and st.session_state.get('genai_outpu
     verdict = st.session_state.get('verdict', None)
     verdict_reason = st.session_state.get('verdict_reason', '')
     summary = st.session_state.get('summary', None)
+    aggregates = st.session_state['aggregates']
 
     # Check if no reviews were found
     if not reviews:
@@ -292,26 +390,27 @@ if st.session_state.get('scraped_reviews') and st.session_state.get('genai_outpu
         """, unsafe_allow_html=True)
         st.stop()
 
+    incomplete_job = st.session_state.get('incomplete_job')
+    if incomplete_job:
+        st.warning(f"⚠️ Analysis incomplete: {incomplete_job['error']}. They count as neutral below.")
+        if st.button("Retry the missing reviews"):
+            # Resumes from the job's checkpoints, only the failed batches are sent again
+            job_id = job_queue.resume(incomplete_job['id'], incomplete_job['url'])
+            st.session_state['job_id'] = job_id
+            st.session_state['loaded_job'] = None
+            st.query_params['job'] = job_id
+            st.rerun()
+
     # --- Average Star Rating at Top ---
-    ratings = []
-    for r in reviews:
-        if r['rating']:
-            try:
-                val = int(r['rating'])
-                ratings.append(val)
-            except:
-                pass
-    if ratings:
-        avg_rating = round(statistics.mean(ratings), 2)
+    if aggregates['rated']:
+        avg_rating = round(aggregates['avg_rating'], 2)
         st.markdown(f"<h2 style='color:gold;margin-bottom:0.5em;'>⭐ {avg_rating} / 5</h2>", unsafe_allow_html=True)
     else:
         st.markdown("No ratings found.")
 
     # --- Confidence and Verdict ---
     # Calculate confidence based on percentage of positive reviews
-    total_reviews = len(reviews)
-    positive_reviews = sum(1 for r in reviews if r.get('analysis', {}).get('sentiment') == 'POSITIVE')
-    conf_val = (positive_reviews / total_reviews * 100) if total_reviews > 0 else 0
+    conf_val = aggregates['positive_percent']
     
     # Decide verdict color and text based on positive reviews percentage
     verdict_color = '#d4edda'
@@ -339,25 +438,7 @@ if st.session_state.get('scraped_reviews') and st.session_state.get('genai_outpu
     status_color = {'good': '🟢', 'high': '🟢', 'verified': '🟢',
                    'minor issues': '🟡', 'average': '🟡', 'mixed': '🟡', 'unclear': '🟡',
                    'bad': '🔴', 'low': '🔴', 'fake': '🔴', 'insufficient data': '⚪'}
-    # Define robust keyword sets for each factor with positive and negative keywords
-    factor_keywords_map = {
-        'Product Quality': {
-            'positive': ['good quality', 'excellent quality', 'impressive quality', 'high quality', 'premium quality', 'superior quality', 'durable', 'sturdy', 'solid', 'well made', 'premium', 'excellent', 'perfect', 'strong', 'rigid', 'lightweight', 'comfortable', 'soft', 'smooth', 'well constructed', 'top notch', 'first class'],
-            'negative': ['poor quality', 'bad quality', 'low quality', 'cheap quality', 'inferior quality', 'cheap', 'flimsy', 'broke', 'damaged', 'defective', 'weak', 'thin', 'uncomfortable', 'rough', 'scratched', 'torn', 'loose', 'poorly made', 'falling apart', 'not durable']
-        },
-        'Delivery Experience': {
-            'positive': ['fast delivery', 'quick shipping', 'well packed', 'protected', 'on time', 'early', 'secure packaging', 'careful packaging', 'tracked', 'professional delivery'],
-            'negative': ['late', 'delayed', 'damaged package', 'poor packaging', 'lost', 'wrong address', 'missing', 'slow shipping', 'no tracking', 'unprofessional']
-        },
-        'Authenticity': {
-            'positive': ['genuine', 'authentic', 'original', 'real', 'legitimate', 'official', 'verified', 'branded', 'authorized', 'genuine product'],
-            'negative': ['fake', 'counterfeit', 'replica', 'knockoff', 'copy', 'imitation', 'suspicious', 'not original', 'unauthentic', 'questionable']
-        },
-        'Customer Satisfaction': {
-            'positive': ['satisfied', 'happy', 'pleased', 'delighted', 'amazed', 'excellent', 'fantastic', 'wonderful', 'love', 'perfect', 'impressed', 'recommend', 'worth'],
-            'negative': ['disappointed', 'frustrated', 'angry', 'upset', 'terrible', 'poor', 'bad', 'hate', 'regret', 'annoyed', 'dissatisfied', 'waste', 'not worth']
-        }
-    }
+    category_map = FACTOR_CATEGORIES
 
     if checklist:
         st.markdown("### Key Factors Checklist")
@@ -367,16 +448,8 @@ if st.session_state.get('scraped_reviews') and st.session_state.get('genai_outpu
                 if v.lower() == 'insufficient data':
                     st.info("Insufficient data to judge this factor from the reviews.")
                 
-                # Filter reviews for this category
-                category_map = {
-                    'Product Quality': 'QUALITY',
-                    'Delivery Experience': 'DELIVERY',
-                    'Authenticity': 'AUTHENTICATION',
-                    'Customer Satisfaction': 'SATISFACTION'
-                }
-                
-                # Filter reviews for this category
-                category_reviews = [r for r in reviews if r.get('analysis', {}).get('category') == category_map.get(k)]
+                # Reviews of this category, grouped once in the aggregates
+                category_reviews = [reviews[i] for i in aggregates['category_groups'].get(category_map.get(k), [])]
                 
                 if category_reviews:
                     st.markdown("<p style='font-size: 1.25rem; font-weight: bold; margin-bottom: 0.5em; text-decoration: underline;'>Customer Reviews:</p>", unsafe_allow_html=True)
@@ -414,12 +487,9 @@ if st.session_state.get('scraped_reviews') and st.session_state.get('genai_outpu
     st.markdown("### 📝 Final Words")
     
     # Create recommendation and summary based on confidence and ratings
-    if conf_val is not None and ratings:
-        avg_rating = round(statistics.mean(ratings), 2)
-        
-        # Calculate positive reviews percentage from the reviews' analysis
-        positive_reviews = sum(1 for r in reviews if r.get('analysis', {}).get('sentiment') == 'POSITIVE')
-        positive_percent = (positive_reviews / len(reviews)) * 100 if reviews else 0
+    if conf_val is not None and aggregates['rated']:
+        avg_rating = round(aggregates['avg_rating'], 2)
+        positive_percent = aggregates['positive_percent']
         
         if conf_val > 70:
             final_icon = "✅"
@@ -438,4 +508,6 @@ if st.session_state.get('scraped_reviews') and st.session_state.get('genai_outpu
 
 Final Recommendation: {final_icon} <span style='text-decoration: underline;'>{recommendation}</span>"""        
         st.markdown(summary, unsafe_allow_html=True)
-        
\ No newline at end of file
+        
+
+metrics.observe('ui_render_seconds', time.perf_counter() - render_start, view='results')
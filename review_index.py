@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+FINGERPRINT_FIELDS = ('text', 'reviewer', 'date')
+
+def review_fingerprint(review):
+    # Whitespace and case differences between the HTTP and Selenium extractions
+    # should not make the same review look new
+    parts = [' '.join(str(review.get(field) or '').split()).lower() for field in FINGERPRINT_FIELDS]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+class ReviewIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self.records = {}
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def add(self, review):
+        fingerprint = review_fingerprint(review)
+        with self._lock:
+            if fingerprint in self.records:
+                self.duplicates += 1
+                return False
+            self.records[fingerprint] = review
+            return True
+
+    def __contains__(self, review):
+        return review_fingerprint(review) in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def reviews(self):
+        with self._lock:
+            return list(self.records.values())
+
+    def load(self, path=None):
+        path = path or self.path
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        with self._lock:
+            self.records.update(records)
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            data = json.dumps(self.records, ensure_ascii=False, separators=(',', ':'))
+        # Write to a temp file first so a crash never leaves a truncated index behind
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
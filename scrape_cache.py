@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from jobs import normalize_url
+from review_index import ReviewIndex
+
+DEFAULT_CACHE_DIR = os.environ.get("REVIEWAI_CACHE_DIR", ".review_cache")
+
+# Seconds after a full scrape before a product is scraped in full again.
+# Incremental scrapes only add reviews newer than the cached ones, so a
+# first scrape cut short would otherwise stay the baseline for good.
+FULL_SCRAPE_MAX_AGE = int(os.environ.get("REVIEWAI_FULL_SCRAPE_MAX_AGE", str(24 * 3600)))
+
+class ScrapeCache:
+    # Reviews already scraped per product URL, newest first, one JSON file per
+    # URL. Next to it the URL's ReviewIndex is saved, so later runs load the
+    # fingerprints instead of rehashing every cached review. Entries are
+    # keyed by normalized URL and expire max_age seconds after their last
+    # full scrape.
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_age=FULL_SCRAPE_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix='.json'):
+        key = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def _load(self, url):
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get(self, url):
+        # None when nothing is cached or the last full scrape is too old,
+        # either way the caller scrapes everything again
+        entry = self._load(url)
+        if entry is None:
+            return None
+        # Entries written before full_scrape_at was kept were full scrapes
+        if time.time() - entry.get('full_scrape_at', entry['updated_at']) > self.max_age:
+            return None
+        return entry['reviews']
+
+    def index(self, url, reviews=None):
+        # The persisted index, or one built from the cached reviews for
+        # entries written before indexes were saved
+        path = self._path(url, '.index.json')
+        if os.path.exists(path):
+            return ReviewIndex(path)
+        index = ReviewIndex()
+        for review in reviews if reviews is not None else self.get(url) or []:
+            index.add(review)
+        return index
+
+    def put(self, url, reviews, incremental=False):
+        # Analyses are attached to the same dicts later on, only keep the scraped fields
+        reviews = [{k: v for k, v in review.items() if k != 'analysis'} for review in reviews]
+        now = time.time()
+        full_scrape_at = now
+        if incremental:
+            # New reviews on top of the cached ones, the entry still expires
+            # with the full scrape it started from
+            entry = self._load(url)
+            if entry is not None:
+                full_scrape_at = entry.get('full_scrape_at', entry['updated_at'])
+        data = json.dumps({'url': url, 'updated_at': now, 'full_scrape_at': full_scrape_at, 'reviews': reviews},
+                          ensure_ascii=False, separators=(',', ':'))
+        index = ReviewIndex()
+        for review in reviews:
+            index.add(review)
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(url))
+            index.save(self._path(url, '.index.json'))
@@ -1,39 +1,167 @@
 import time
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import json
-from fake_useragent import UserAgent
-import random
-import requests
-from bs4 import BeautifulSoup
-import urllib3
-import ssl
-import certifi
-
-# Disable SSL verification warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import metrics
+from driver_pool import DriverPool
+from wait_strategies import get_wait_strategy
+from review_index import ReviewIndex
+from stamped_parser import (
+    STAMPED_REVIEWS_API, extract_widget_html, parse_reviews, parse_total_reviews,
+    parse_widget_config, widget_page_params
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sent by the HTTP engines, the Chrome engine picks a random one per driver
+HTTP_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                   'Chrome/91.0.4472.124 Safari/537.36')
+
+# Extracts every review on the current page in a single WebDriver round trip
+EXTRACT_PAGE_REVIEWS_JS = """
+    function cleanImageUrl(url) {
+        // Clean up the URL by removing query parameters and transforming to high resolution
+        return url.split('?')[0].replace('tr:h-180', 'tr:h-800');
+    }
+
+    function text(el, selector) {
+        return el.querySelector(selector)?.textContent?.trim() || '';
+    }
+
+    return Array.from(document.querySelectorAll('.stamped-review')).map(function(el) {
+        var images = [];
+        el.querySelectorAll('.stamped-review-image a').forEach(function(link) {
+            var href = link.getAttribute('href');
+            if (href) {
+                href = cleanImageUrl(href);
+                if (!images.includes(href)) {
+                    images.push(href);
+                }
+            }
+
+            // Also check the img tag within the link
+            var img = link.querySelector('img');
+            var src = img && img.getAttribute('src');
+            if (src) {
+                src = cleanImageUrl(src);
+                if (!images.includes(src)) {
+                    images.push(src);
+                }
+            }
+        });
+
+        return {
+            reviewer: text(el, '.stamped-review-header-title'),
+            rating: el.querySelectorAll('.stamped-fa.stamped-fa-star:not(.stamped-fa-empty)').length,
+            title: text(el, '.stamped-review-header-title'),
+            text: text(el, '.stamped-review-content-body'),
+            date: text(el, '.created'),
+            verified: !!el.querySelector('.stamped-review-verified'),
+            images: images,
+            location: text(el, '.review-location')
+        };
+    });
+"""
+
+# Clicks the paginator link for arguments[0], returns whether it exists
+CLICK_PAGE_JS = """
+    var nextPageBtn = document.querySelector('a[data-page="' + arguments[0] + '"]');
+    if (nextPageBtn) {
+        nextPageBtn.click();
+        return true;
+    }
+    return false;
+"""
+
+# Clicks the furthest visible page after arguments[0] and up to arguments[1], returns its number
+CLICK_NEAREST_PAGE_JS = """
+    var current = arguments[0];
+    var target = arguments[1];
+    var best = null;
+    var bestPage = 0;
+    document.querySelectorAll('a[data-page]').forEach(function(link) {
+        var page = parseInt(link.getAttribute('data-page'), 10);
+        if (page > current && page <= target && page > bestPage) {
+            best = link;
+            bestPage = page;
+        }
+    });
+    if (best) {
+        best.click();
+    }
+    return bestPage;
+"""
+
+def _wait_for_element(driver, selector, timeout):
+    # Selenium is imported on first use, so HTTP-only scrapes never load it
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+
 class JashanmalScraper:
-    def __init__(self, verify_ssl=False):
+    def __init__(self, verify_ssl=False, pool_size=2, driver_max_uses=20, engine='auto', http_timeout=15,
+                 wait_strategy='mutation', workers=1, stamped_api=STAMPED_REVIEWS_API):
         self.base_url = "https://www.jashanmal.com"
         self.verify_ssl = verify_ssl
-        self.session = requests.Session()
-        self.session.verify = verify_ssl
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.user_agent = UserAgent()
+        # Stamped widget endpoint, overridable to point at a local fixture server
+        self.stamped_api = stamped_api
+        # 'http' fetches the Stamped widget directly, 'selenium' drives Chrome,
+        # 'auto' tries HTTP first and falls back to Chrome, 'async' fetches the
+        # widget with AsyncJashanmalScraper on one event loop shared by all threads
+        self.engine = engine
+        self.http_timeout = http_timeout
+        # How pagination waits for the next page: 'fixed' sleeps, 'dom' polls the
+        # first review id, 'mutation' waits on a MutationObserver in the page
+        self.wait_strategy = get_wait_strategy(wait_strategy)
+        # Pages fetched in parallel per scrape, each worker uses its own driver or HTTP session
+        self.workers = workers
+        self._local = threading.local()
+        self._user_agent = None
+        self._async = None
+        self._async_lock = threading.Lock()
+        self.driver_pool = DriverPool(self._create_driver, max_size=max(pool_size, workers),
+                                      max_uses=driver_max_uses)
+
+    @property
+    def user_agent(self):
+        # fake_useragent loads its browser data when built, only do that for Chrome
+        if self._user_agent is None:
+            from fake_useragent import UserAgent
+            self._user_agent = UserAgent()
+        return self._user_agent
+
+    @property
+    def session(self):
+        return self._http_session()
+
+    def _new_session(self):
+        # requests is imported with the first session rather than at startup
+        import requests
+        import urllib3
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Disable SSL verification warnings
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        session = requests.Session()
+        session.verify = self.verify_ssl
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'User-Agent': HTTP_USER_AGENT})
+        return session
         
     def _get_chrome_options(self):
+        from selenium.webdriver.chrome.options import Options
         options = Options()
         options.add_argument("--headless")
         options.add_argument('--disable-notifications')
@@ -48,22 +176,170 @@ class JashanmalScraper:
         options.add_argument('--disable-software-rasterizer')
         options.add_argument('--disable-extensions')
         return options
-        
-    def scrape_reviews(self, url, max_reviews=None):
-        driver = None
+
+    def _create_driver(self):
+        from selenium import webdriver
+        driver = webdriver.Chrome(options=self._get_chrome_options())
+        driver.set_page_load_timeout(30)
+        return driver
+
+    def close(self):
+        self.driver_pool.close()
+        if self._async is not None:
+            import asyncio
+            loop, thread, scraper = self._async
+            asyncio.run_coroutine_threadsafe(scraper.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            self._async = None
+
+    def _async_scraper(self):
+        # Started on first use: an event loop thread and its aiohttp pool,
+        # shared by every job thread so their requests reuse the same connections
+        with self._async_lock:
+            if self._async is None:
+                import asyncio
+                from async_scraper import AsyncJashanmalScraper
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-scraper', daemon=True)
+                thread.start()
+                scraper = AsyncJashanmalScraper(verify_ssl=self.verify_ssl, page_concurrency=max(self.workers, 1),
+                                                http_timeout=self.http_timeout, stamped_api=self.stamped_api)
+                self._async = (loop, thread, scraper)
+            return self._async
+
+    def _scrape_reviews_async(self, url, max_reviews, index, known=None):
+        import asyncio
+        loop, _, scraper = self._async_scraper()
+        return asyncio.run_coroutine_threadsafe(scraper.scrape_reviews(url, max_reviews, index, known), loop).result()
+
+    def scrape_reviews(self, url, max_reviews=None, index=None, known=None):
+        # Pass a (persisted) ReviewIndex to also drop reviews seen by earlier runs.
+        # With `known`, the scrape walks pages in order and stops at the first known review.
+        if self.engine == 'async':
+            return self._scrape_reviews_async(url, max_reviews, index if index is not None else ReviewIndex(), known)
+        if self.engine in ('auto', 'http'):
+            import requests
+            try:
+                reviews = self._scrape_reviews_http(url, max_reviews, index if index is not None else ReviewIndex(),
+                                                    known)
+                if reviews is not None:
+                    return reviews
+                logger.info("Stamped widget settings not found in page HTML")
+            except requests.RequestException as e:
+                if self.engine == 'http':
+                    raise
+                logger.warning(f"HTTP scrape failed: {str(e)}")
+            if self.engine == 'http':
+                return []
+            logger.info("Falling back to Selenium scraping")
+        return self._scrape_reviews_selenium(url, max_reviews, index if index is not None else ReviewIndex(), known)
+
+    def scrape_reviews_incremental(self, url, cache, max_reviews=None):
+        cached = cache.get(url)
+        if cached is None:
+            reviews = self.scrape_reviews(url)
+            cache.put(url, reviews)
+            return reviews[:max_reviews] if max_reviews else reviews
+
+        # Stamped lists reviews newest first, so everything before the first
+        # cached review is new
+        delta = self.scrape_reviews(url, known=cache.index(url, cached))
+        logger.info(f"Found {len(delta)} new reviews, {len(cached)} already cached")
+        reviews = delta + cached
+        if delta:
+            cache.put(url, reviews, incremental=True)
+        return reviews[:max_reviews] if max_reviews else reviews
+
+    def _http_session(self):
+        # requests sessions are not thread safe, every worker thread gets its own
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._new_session()
+            self._local.session = session
+        return session
+
+    def _fetch_widget_page(self, widget, page):
+        with metrics.span('page_load', engine='http') as span:
+            span.set(page=page)
+            response = self._http_session().get(
+                self.stamped_api,
+                params=widget_page_params(widget, page),
+                timeout=self.http_timeout
+            )
+            response.raise_for_status()
+            return extract_widget_html(response.text)
+
+    def _parse_page(self, html, page):
+        with metrics.span('page_extract', engine='http') as span:
+            reviews = parse_reviews(html)
+            span.set(page=page, reviews=len(reviews))
+        metrics.inc('reviews_extracted_total', len(reviews), engine='http')
+        return reviews
+
+    def _scrape_reviews_http(self, url, max_reviews, index, known=None):
+        logger.info(f"Loading URL over HTTP: {url}")
+        with metrics.span('product_page_load', engine='http'):
+            response = self._http_session().get(url, timeout=self.http_timeout)
+            response.raise_for_status()
+
+        widget = parse_widget_config(response.text, url)
+        if widget is None or not widget['product_id'] or not widget['api_key']:
+            return None
+
+        page_html = self._fetch_widget_page(widget, 1)
+        total_reviews = parse_total_reviews(page_html) or parse_total_reviews(widget['html'])
+        if max_reviews is None:
+            max_reviews = total_reviews
+
+        logger.info(f"Found {total_reviews} total reviews. Will read up to {max_reviews}")
+
+        page_reviews = self._parse_page(page_html, 1)
+        last_page = self._last_page(max_reviews, len(page_reviews))
+        if self.workers > 1 and last_page > 1 and known is None:
+            page_results = {1: page_reviews}
+            page_results.update(self._map_shards(
+                self._scrape_http_shard, self._shard_pages(range(2, last_page + 1), self.workers), widget
+            ))
+            all_reviews = self._merge_pages(page_results, index)
+            logger.info(f"Read {len(all_reviews)} reviews from {last_page} pages with {self.workers} workers, "
+                        f"dropped {index.duplicates} duplicates")
+            return all_reviews[:max_reviews]
+
+        all_reviews = []
+        current_page = 1
+        while True:
+            new_reviews, reached_known = self._take_new(page_reviews, index, known)
+            all_reviews.extend(new_reviews)
+            logger.info(f"Read {len(all_reviews)} reviews from page {current_page}")
+
+            # An empty or repeated page means we ran past the last one
+            if reached_known or not new_reviews or (max_reviews and len(all_reviews) >= max_reviews):
+                break
+            current_page += 1
+            page_reviews = self._parse_page(self._fetch_widget_page(widget, current_page), current_page)
+
+        logger.info(f"Dropped {index.duplicates} duplicate reviews")
+        return all_reviews[:max_reviews] if max_reviews else all_reviews
+
+    def _scrape_http_shard(self, widget, pages):
+        results = {}
+        for page in pages:
+            results[page] = self._parse_page(self._fetch_widget_page(widget, page), page)
+        return results
+
+    def _scrape_reviews_selenium(self, url, max_reviews, index, known=None):
+        driver = self.driver_pool.acquire()
         try:
-            options = self._get_chrome_options()
-            driver = webdriver.Chrome(options=options)
-            driver.set_page_load_timeout(30)
             logger.info(f"Loading URL: {url}")
             
-            driver.get(url)
-            time.sleep(2)  # Reduced initial wait time
-            
-            # Wait for the review container
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '#stamped-main-widget'))
-            )
+            with metrics.span('product_page_load', engine='selenium'):
+                driver.get(url)
+                self.wait_strategy.wait_for_load(driver)
+
+                # Wait for the review container
+                _wait_for_element(driver, '#stamped-main-widget', 10)
             
             # Get total review count
             total_reviews = self._get_total_reviews(driver)
@@ -71,6 +347,26 @@ class JashanmalScraper:
                 max_reviews = total_reviews
             
             logger.info(f"Found {total_reviews} total reviews. Will read up to {max_reviews}")
+            if not max_reviews:
+                # Nothing to read, don't wait for reviews that never render
+                return []
+
+            workers = min(self.workers, self.driver_pool.max_size)
+            if workers > 1 and known is None:
+                first_page = self._extract_reviews_from_page(driver, 1)
+                last_page = self._last_page(max_reviews, len(first_page))
+                if last_page > 1:
+                    # Hand this driver back so the shard workers can use it
+                    self.driver_pool.release(driver)
+                    driver = None
+                    page_results = {1: first_page}
+                    page_results.update(self._map_shards(
+                        self._scrape_selenium_shard, self._shard_pages(range(2, last_page + 1), workers), url
+                    ))
+                    all_reviews = self._merge_pages(page_results, index)
+                    logger.info(f"Read {len(all_reviews)} reviews from {last_page} pages with {workers} browsers, "
+                                f"dropped {index.duplicates} duplicates")
+                    return all_reviews[:max_reviews]
             
             all_reviews = []
             current_page = 1
@@ -79,8 +375,14 @@ class JashanmalScraper:
             
             while len(all_reviews) < max_reviews and retry_count < 3:
                 try:
-                    # Extract current page reviews
-                    new_reviews = self._extract_reviews_from_page(driver)
+                    # Extract current page reviews, a page we already read counts as no progress
+                    new_reviews, reached_known = self._take_new(
+                        self._extract_reviews_from_page(driver, current_page), index, known
+                    )
+                    if reached_known:
+                        all_reviews.extend(new_reviews)
+                        logger.info(f"Reached already known reviews on page {current_page}")
+                        break
                     
                     # Check if we got new reviews
                     if len(new_reviews) > 0:
@@ -92,128 +394,168 @@ class JashanmalScraper:
                         
                         # Try to go to next page using JavaScript
                         if len(all_reviews) < max_reviews:
-                            script = f"""
-                            var nextPageBtn = document.querySelector('a[data-page="{current_page}"]');
-                            if(nextPageBtn) {{
-                                nextPageBtn.click();
-                                return true;
-                            }}
-                            return false;
-                            """
-                            has_next = driver.execute_script(script)
-                            if not has_next:
+                            if not self._click_page(driver, current_page):
                                 break
-                            time.sleep(1)  # Short wait after click
                     else:
                         retry_count += 1
-                        time.sleep(1)
+                        self.wait_strategy.wait_before_retry(driver)
                         
                 except Exception as e:
                     logger.warning(f"Error on page {current_page}: {str(e)}")
                     retry_count += 1
                     if retry_count >= 3:
                         break
-                    time.sleep(1)
+                    self.wait_strategy.wait_before_retry(driver)
             
+            logger.info(f"Dropped {index.duplicates} duplicate reviews")
             return all_reviews[:max_reviews]
             
         finally:
-            if driver:
-                driver.quit()
+            # Crashed or hung drivers are dropped by the pool, healthy ones are reset and kept warm
+            if driver is not None:
+                self.driver_pool.release(driver)
+            stats = self.driver_pool.stats()
+            logger.info(f"Driver pool: {stats['hits']} hits, {stats['misses']} misses, "
+                        f"avg startup {stats['startup_avg']:.2f}s, last startup {stats['startup_last']:.2f}s")
+
+    def _scrape_selenium_shard(self, url, pages):
+        results = {}
+        driver = self.driver_pool.acquire()
+        try:
+            driver.get(url)
+            self.wait_strategy.wait_for_load(driver)
+            # Every page of a shard is below the last one, so a page we cannot
+            # reach or read is an error and the shard is retried
+            if not self._goto_page(driver, pages[0]):
+                raise RuntimeError(f"Could not reach page {pages[0]}")
+            for page in pages:
+                if page != pages[0] and not self._click_page(driver, page):
+                    raise RuntimeError(f"Could not click through to page {page}")
+                results[page] = self._extract_reviews_from_page(driver, page, strict=True)
+            return results
+        finally:
+            self.driver_pool.release(driver)
+
+    def _click_page(self, driver, page):
+        marker = self.wait_strategy.page_marker(driver)
+        if not driver.execute_script(CLICK_PAGE_JS, page):
+            return False
+        with metrics.span('pagination_wait', strategy=self.wait_strategy.name) as span:
+            changed = self.wait_strategy.wait_for_page_change(driver, marker)
+            span.set(page=page, changed=bool(changed))
+        if not changed:
+            metrics.inc('pagination_wait_timeouts_total', strategy=self.wait_strategy.name)
+            logger.warning(f"Page {page} did not change before the wait timed out")
+        return True
+
+    def _goto_page(self, driver, target):
+        # The paginator only links a window of pages, so hop to the furthest
+        # visible page before the target until the target itself is reachable
+        current = 1
+        while current < target:
+            marker = self.wait_strategy.page_marker(driver)
+            clicked = driver.execute_script(CLICK_NEAREST_PAGE_JS, current, target)
+            if not clicked:
+                return False
+            with metrics.span('pagination_wait', strategy=self.wait_strategy.name) as span:
+                span.set(page=clicked)
+                self.wait_strategy.wait_for_page_change(driver, marker)
+            current = clicked
+        return True
+
+    def _last_page(self, max_reviews, per_page):
+        if not per_page or not max_reviews:
+            return 1
+        return math.ceil(max_reviews / per_page)
+
+    def _shard_pages(self, pages, workers):
+        # Contiguous runs, so a browser worker can click through its shard in order
+        pages = list(pages)
+        size = math.ceil(len(pages) / workers) if pages else 0
+        return [pages[i:i + size] for i in range(0, len(pages), size)] if size else []
+
+    def _map_shards(self, scrape_shard, shards, target):
+        page_results = {}
+        parent = metrics.current_span()
+
+        def run_shard(shard):
+            with metrics.span('scrape_shard', parent=parent) as span:
+                span.set(first_page=shard[0], last_page=shard[-1])
+                return scrape_shard(target, shard)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(len(shards), 1)) as executor:
+            futures = {executor.submit(run_shard, shard): shard for shard in shards}
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    page_results.update(future.result())
+                except Exception as e:
+                    logger.warning(f"Failed to read pages {shard[0]}-{shard[-1]}, retrying them: {str(e)}")
+                    failed.append(shard)
+
+        # Retry failed shards one at a time. A second failure is raised, so a
+        # scrape missing a range of pages never passes for a complete one.
+        for shard in sorted(failed):
+            page_results.update(run_shard(shard))
+        return page_results
+
+    def _take_new(self, page_reviews, index, known):
+        new_reviews = []
+        for review in page_reviews:
+            if known is not None and review in known:
+                return new_reviews, True
+            if index.add(review):
+                new_reviews.append(review)
+        return new_reviews, False
+
+    def _merge_pages(self, page_results, index):
+        all_reviews = []
+        for page in sorted(page_results):
+            all_reviews.extend(review for review in page_results[page] if index.add(review))
+        return all_reviews
                 
     def _get_total_reviews(self, driver):
         try:
-            summary_text = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '.stamped-summary-text'))
-            ).text
+            summary_text = _wait_for_element(driver, '.stamped-summary-text', 5).text
             count_match = re.search(r'Based on (\d+) Reviews', summary_text)
             return int(count_match.group(1)) if count_match else 0
         except:
             return 0
             
-    def _extract_reviews_from_page(self, driver):
+    def _extract_reviews_from_page(self, driver, page=None, strict=False):
+        # strict raises extraction errors instead of returning no reviews
         reviews = []
-        try:
-            # Wait for reviews to be present and get them all at once
-            review_elements = WebDriverWait(driver, 5).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.stamped-review'))
-            )
-            
-            for element in review_elements:
-                try:
-                    # Extract review data including images using JavaScript
-                    review_data = driver.execute_script("""
-                        var el = arguments[0];
-                        
-                        // Extract images with better selectors
-                        var images = [];
-                        var imageLinks = el.querySelectorAll('.stamped-review-image a');
-                        imageLinks.forEach(function(link) {
-                            var href = link.getAttribute('href');
-                            if (href) {
-                                // Clean up the URL by removing query parameters and transforming to high resolution
-                                href = href.split('?')[0];
-                                href = href.replace('tr:h-180', 'tr:h-800');
-                                if (!images.includes(href)) {
-                                    images.push(href);
-                                }
-                            }
-                            
-                            // Also check the img tag within the link
-                            var img = link.querySelector('img');
-                            if (img) {
-                                var src = img.getAttribute('src');
-                                if (src) {
-                                    src = src.split('?')[0];
-                                    src = src.replace('tr:h-180', 'tr:h-800');
-                                    if (!images.includes(src)) {
-                                        images.push(src);
-                                    }
-                                }
-                            }
-                        });
-                        
-                        return {
-                            reviewer: el.querySelector('.stamped-review-header-title')?.textContent?.trim() || '',
-                            rating: el.querySelectorAll('.stamped-fa.stamped-fa-star:not(.stamped-fa-empty)').length,
-                            title: el.querySelector('.stamped-review-header-title')?.textContent?.trim() || '',
-                            text: el.querySelector('.stamped-review-content-body')?.textContent?.trim() || '',
-                            date: el.querySelector('.created')?.textContent?.trim() || '',
-                            verified: !!el.querySelector('.stamped-review-verified'),
-                            images: images,
-                            location: el.querySelector('.review-location')?.textContent?.trim() || ''
-                        };
-                    """, element)
-                    
+        start = time.perf_counter()
+        with metrics.span('page_extract', engine='selenium') as span:
+            try:
+                # Wait for reviews to be present, then pull the whole page in one round trip
+                _wait_for_element(driver, '.stamped-review', 5)
+                page_reviews = driver.execute_script(EXTRACT_PAGE_REVIEWS_JS) or []
+
+                # Duplicates are dropped by the scrape-wide ReviewIndex
+                for review_data in page_reviews:
                     # Convert rating to string to match existing format
                     review_data['rating'] = str(review_data['rating'])
-                    
-                    # Check for duplicates using a more robust method
-                    is_duplicate = False
-                    for existing_review in reviews:
-                        if (existing_review['text'] == review_data['text'] and 
-                            existing_review['reviewer'] == review_data['reviewer'] and
-                            existing_review['date'] == review_data['date']):
-                            is_duplicate = True
-                            break
-                    
-                    if review_data['text'] and not is_duplicate:
+                    if review_data['text']:
                         reviews.append(review_data)
-                        
-                except Exception as e:
-                    logger.debug(f"Failed to extract review: {str(e)}")
-                    continue
-                    
-        except Exception as e:
-            logger.warning(f"Failed to get review elements: {str(e)}")
-            
+
+            except Exception as e:
+                if strict:
+                    raise
+                logger.warning(f"Failed to get review elements: {str(e)}")
+            span.set(page=page, reviews=len(reviews))
+
+        metrics.inc('reviews_extracted_total', len(reviews), engine='selenium')
+        logger.info(f"Extracted {len(reviews)} reviews from page {page or '?'} "
+                    f"in {time.perf_counter() - start:.3f}s")
         return reviews
 
     def get_product_image(self, driver):
         try:
             # Wait for and get the product image
-            product_img = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '.stamped-product-image img, .product-image img, .product__media img'))
+            product_img = _wait_for_element(
+                driver, '.stamped-product-image img, .product-image img, .product__media img', 5
             )
             src = product_img.get_attribute('src')
             if src and 'data:image' not in src:  # Avoid base64 encoded images
@@ -230,6 +572,7 @@ if __name__ == '__main__':
     max_reviews = int(max_reviews) if max_reviews.strip() else None
     
     reviews = scraper.scrape_reviews(url, max_reviews=max_reviews)
+    scraper.close()
     
     output_file = 'review.json'
     with open(output_file, 'w', encoding='utf-8') as f:
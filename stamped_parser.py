@@ -0,0 +1,124 @@
+import json
+import re
+from urllib.parse import urlparse
+
+STAMPED_REVIEWS_API = "https://stamped.io/api/widget/reviews"
+
+_API_KEY_PATTERNS = [
+    re.compile(r'data-api-key=["\']([^"\']+)["\']'),
+    re.compile(r'apiKey["\']?\s*[:=]\s*["\']([^"\']+)["\']'),
+]
+_STORE_ID_PATTERNS = [
+    re.compile(r'data-store-id=["\'](\d+)["\']'),
+    re.compile(r'sId["\']?\s*[:=]\s*["\']?(\d+)'),
+]
+_STORE_URL_PATTERNS = [
+    re.compile(r'data-store-url=["\']([^"\']+)["\']'),
+    re.compile(r'Shopify\.shop\s*=\s*["\']([^"\']+)["\']'),
+]
+
+def _soup(html):
+    # bs4 and lxml load on first parse, not when the app starts
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'lxml')
+
+def _text(el, selector):
+    found = el.select_one(selector)
+    return found.get_text().strip() if found else ''
+
+def _first_match(patterns, html):
+    for pattern in patterns:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+def clean_image_url(url):
+    # Drop query parameters and ask the image CDN for the high resolution rendition
+    return url.split('?')[0].replace('tr:h-180', 'tr:h-800')
+
+def parse_widget_config(html, page_url):
+    soup = _soup(html)
+    widget = soup.select_one('#stamped-main-widget')
+    if widget is None:
+        return None
+    store_url = _first_match(_STORE_URL_PATTERNS, html) or urlparse(page_url).netloc
+    return {
+        'product_id': widget.get('data-product-id'),
+        'product_name': widget.get('data-name', ''),
+        'product_sku': widget.get('data-product-sku', ''),
+        'product_type': widget.get('data-product-type', ''),
+        'api_key': _first_match(_API_KEY_PATTERNS, html),
+        'store_id': _first_match(_STORE_ID_PATTERNS, html),
+        'store_url': store_url,
+        'html': str(widget),
+    }
+
+def widget_page_params(widget, page):
+    params = {
+        'productId': widget['product_id'],
+        'productName': widget['product_name'],
+        'productSKU': widget['product_sku'],
+        'productType': widget['product_type'],
+        'apiKey': widget['api_key'],
+        'storeUrl': widget['store_url'],
+        'page': page,
+    }
+    if widget.get('store_id'):
+        params['sId'] = widget['store_id']
+    return params
+
+def extract_widget_html(body):
+    # The widget endpoint answers with JSON wrapping the rendered HTML, older
+    # deployments return the HTML fragment directly
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict):
+        return data.get('widget') or data.get('html') or ''
+    return ''
+
+def parse_total_reviews(html):
+    summary = _soup(html).select_one('.stamped-summary-text')
+    if summary is None:
+        return 0
+    count = summary.get('data-count')
+    if count and count.isdigit():
+        return int(count)
+    count_match = re.search(r'Based on (\d+) Reviews', summary.get_text())
+    return int(count_match.group(1)) if count_match else 0
+
+def parse_review_element(el):
+    images = []
+    for link in el.select('.stamped-review-image a'):
+        href = link.get('href')
+        if href:
+            href = clean_image_url(href)
+            if href not in images:
+                images.append(href)
+        img = link.select_one('img')
+        if img is not None and img.get('src'):
+            src = clean_image_url(img.get('src'))
+            if src not in images:
+                images.append(src)
+
+    # Same shape (and string rating) as the Selenium extraction
+    return {
+        'reviewer': _text(el, '.stamped-review-header-title'),
+        'rating': str(len(el.select('.stamped-fa.stamped-fa-star:not(.stamped-fa-empty)'))),
+        'title': _text(el, '.stamped-review-header-title'),
+        'text': _text(el, '.stamped-review-content-body'),
+        'date': _text(el, '.created'),
+        'verified': el.select_one('.stamped-review-verified') is not None,
+        'images': images,
+        'location': _text(el, '.review-location'),
+    }
+
+def parse_reviews(html):
+    reviews = []
+    for el in _soup(html).select('.stamped-review'):
+        review = parse_review_element(el)
+        if review['text']:
+            reviews.append(review)
+    return reviews
@@ -0,0 +1,15 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules live at the top of the repo, the benchmark helpers under benchmarks/
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+@pytest.fixture(autouse=True)
+def unthrottled_mistral(monkeypatch):
+    # The fake clients answer instantly, the account limits and backoff only slow the tests down
+    import genai_analysis
+    from rate_limiter import RateLimiter
+    monkeypatch.setattr(genai_analysis, 'mistral_limiter',
+                        RateLimiter(requests_per_minute=600000, tokens_per_minute=10 ** 9, base_delay=0.01))
@@ -0,0 +1,283 @@
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+PRODUCT_URL = 'https://www.jashanmal.com/products/leather-weekender-bag'
+
+def make_review(number, rating=5, text=None, title=None):
+    # Shaped like the scrapers' output
+    return {
+        'reviewer': title or f"Review {number}",
+        'rating': str(rating),
+        'title': title or f"Review {number}",
+        'text': text or f"Soft leather and neat stitching, bag number {number}.",
+        'date': '01/03/2024',
+        'verified': True,
+        'images': [],
+        'location': 'Dubai',
+    }
+
+def make_reviews(count, start=1):
+    return [make_review(number) for number in range(start, start + count)]
+
+def review_html(review, review_id):
+    stars = ''.join('<i class="stamped-fa stamped-fa-star"></i>' if i < int(review['rating'])
+                    else '<i class="stamped-fa stamped-fa-star stamped-fa-empty"></i>' for i in range(5))
+    verified = '<span class="stamped-review-verified">Verified Buyer</span>' if review['verified'] else ''
+    images = ''.join(f'<div class="stamped-review-image"><a href="{url}"><img src="{url}"></a></div>'
+                     for url in review['images'])
+    return (f'<div id="stamped-review-{review_id}" class="stamped-review" data-review-id="{review_id}">'
+            f'<div class="stamped-review-header">{verified}'
+            f'<div class="review-location">{review["location"]}</div>'
+            f'<div class="created">{review["date"]}</div></div>'
+            f'<div class="stamped-review-content"><div class="stamped-review-header-starratings">{stars}</div>'
+            f'<h3 class="stamped-review-header-title">{review["title"]}</h3>'
+            f'<p class="stamped-review-content-body">{review["text"]}</p>{images}</div></div>')
+
+def widget_html(reviews, total, first_id=1000):
+    body = ''.join(review_html(review, first_id + i) for i, review in enumerate(reviews))
+    return (f'<div class="stamped-container" data-count="{total}"><div class="stamped-summary">'
+            f'<span class="stamped-summary-text" data-count="{total}">Based on {total} Reviews</span></div>'
+            f'<div class="stamped-reviews">{body}</div></div>')
+
+def product_html(product_id='7301234567890', api_key='pubkey-test', store_id='123456'):
+    widget = (f'<div id="stamped-main-widget" data-product-id="{product_id}" data-name="Leather Weekender Bag" '
+              f'data-product-sku="JM-001" data-product-type="Bags"></div>' if product_id else '')
+    return (f'<html><head><script>var Shopify = Shopify || {{}}; Shopify.shop = "jashanmal-uae.myshopify.com";'
+            f'</script><script>StampedFn.init({{ apiKey: "{api_key}", sId: "{store_id}" }});</script></head>'
+            f'<body><h1>Leather Weekender Bag</h1>{widget}</body></html>')
+
+class FakeStamped:
+    # A product page and its widget pages, `per_page` reviews each, newest first
+    def __init__(self, reviews, per_page=5, product_id='7301234567890'):
+        self.reviews = reviews
+        self.per_page = per_page
+        self.product_id = product_id
+        self.requested_pages = []
+        self._lock = threading.Lock()
+
+    def page(self, number):
+        start = (number - 1) * self.per_page
+        reviews = self.reviews[start:start + self.per_page] if number >= 1 else []
+        return widget_html(reviews, len(self.reviews), first_id=1000 + start)
+
+    def respond(self, url, params=None):
+        # Widget page requests are the ones with query parameters
+        if params is not None:
+            with self._lock:
+                self.requested_pages.append(int(params['page']))
+            return json.dumps({'widget': self.page(int(params['page']))})
+        return product_html(self.product_id)
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+class FakeSession:
+    # Stands in for the requests session of JashanmalScraper's HTTP engine
+    def __init__(self, stamped, fail_pages=()):
+        self.stamped = stamped
+        self.fail_pages = set(fail_pages)
+
+    def get(self, url, params=None, timeout=None):
+        if params is not None and int(params['page']) in self.fail_pages:
+            self.fail_pages.discard(int(params['page']))
+            return FakeResponse('', 503)
+        return FakeResponse(self.stamped.respond(url, params))
+
+def use_session(scraper, session):
+    # Every worker thread of the scraper gets the same fake session
+    scraper._http_session = lambda: session
+    return scraper
+
+_REVIEW_RE = re.compile(r'^Review (\d+):\nTitle: (.*)\nText: (.*)$', re.M)
+
+def fake_analysis(number, title, text):
+    words = f"{title} {text}".lower()
+    sentiment = 'NEGATIVE' if any(word in words for word in ('broke', 'late', 'fake')) else 'POSITIVE'
+    category = 'DELIVERY' if 'late' in words else 'QUALITY'
+    return {'id': number, 'summary': title, 'sentiment': sentiment, 'category': category}
+
+class FakeMistralClient:
+    # Answers batch prompts in the format they ask for. `skip` leaves reviews
+    # whose text contains it out of every answer, `error` is raised instead
+    # of answering.
+    def __init__(self, skip=None, error=None):
+        self.skip = skip
+        self.error = error
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def reply(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        if self.error is not None:
+            raise self.error
+        items = [fake_analysis(int(number), title, text) for number, title, text in _REVIEW_RE.findall(prompt)
+                 if not (self.skip and self.skip in text)]
+        if 'JSON array' in prompt:
+            return json.dumps(items)
+        return '\n\n'.join(f"REVIEW {item['id']}:\nSUMMARY: {item['summary']}\nSENTIMENT: {item['sentiment']}\n"
+                           f"CATEGORY: {item['category']}" for item in items)
+
+    def reviewed_texts(self):
+        # Review texts sent so far, over all prompts
+        return [text for prompt in self.prompts for _, _, text in _REVIEW_RE.findall(prompt)]
+
+    def chat(self, model, messages):
+        content = self.reply(messages[-1].content)
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def chat_stream(self, model, messages):
+        content = self.reply(messages[-1].content)
+        for i in range(0, len(content), 16):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 16]))],
+                                  usage=None)
+        yield SimpleNamespace(choices=[],
+                              usage=SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20))
+
+class FakeElement:
+    def __init__(self, text=''):
+        self.text = text
+
+    def get_attribute(self, name):
+        return None
+
+class FakeBrowser:
+    # Plays the Stamped widget for the Chrome engine: answers the scraper's
+    # scripts from FakeStamped pages, with a paginator linking `window` pages
+    # either side of the current one, except those in `unreachable_pages`
+    def __init__(self, stamped, window=2, unreachable_pages=()):
+        self.stamped = stamped
+        self.window = window
+        self.unreachable_pages = set(unreachable_pages)
+        self.page = None
+        self.visited_pages = []
+        self.quit_calls = 0
+
+    def _reviews(self):
+        start = (self.page - 1) * self.stamped.per_page
+        return self.stamped.reviews[start:start + self.stamped.per_page]
+
+    def _open(self, page):
+        self.page = page
+        self.visited_pages.append(page)
+
+    def _links(self):
+        last = -(-len(self.stamped.reviews) // self.stamped.per_page)
+        return [page for page in range(max(1, self.page - self.window), min(last, self.page + self.window) + 1)
+                if page != self.page and page not in self.unreachable_pages]
+
+    def get(self, url):
+        if url == 'about:blank':
+            self.page = None
+        else:
+            self._open(1)
+
+    def find_element(self, by, selector):
+        from selenium.common.exceptions import NoSuchElementException
+        if self.page is None or (selector == '.stamped-review' and not self._reviews()):
+            raise NoSuchElementException(selector)
+        if selector == '.stamped-summary-text':
+            return FakeElement(f"Based on {len(self.stamped.reviews)} Reviews")
+        return FakeElement()
+
+    def execute_script(self, script, *args):
+        from scraper import CLICK_NEAREST_PAGE_JS, CLICK_PAGE_JS, EXTRACT_PAGE_REVIEWS_JS
+        from wait_strategies import FIRST_REVIEW_MARKER_JS
+        if script == EXTRACT_PAGE_REVIEWS_JS:
+            # The browser hands ratings back as numbers
+            return [dict(review, rating=int(review['rating'])) for review in self._reviews()]
+        if script == FIRST_REVIEW_MARKER_JS:
+            reviews = self._reviews() if self.page else []
+            return reviews[0]['title'] if reviews else None
+        if script == CLICK_PAGE_JS:
+            if args[0] not in self._links():
+                return False
+            self._open(args[0])
+            return True
+        if script == CLICK_NEAREST_PAGE_JS:
+            current, target = args
+            candidates = [page for page in self._links() if current < page <= target]
+            if candidates:
+                self._open(max(candidates))
+                return max(candidates)
+            return 0
+        return None
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quit_calls += 1
+
+def use_browsers(scraper, stamped, **options):
+    # Every driver the scraper's pool starts is a FakeBrowser on `stamped`
+    from driver_pool import DriverPool
+    browsers = []
+
+    def start():
+        browsers.append(FakeBrowser(stamped, **options))
+        return browsers[-1]
+
+    scraper.driver_pool = DriverPool(start, max_size=scraper.driver_pool.max_size)
+    return browsers
+
+class StampedServer:
+    # FakeStamped over real HTTP on localhost, for the aiohttp engine.
+    # Each page in `fail_pages` answers 503 once, with `retry_after` if set.
+    def __init__(self, stamped, fail_pages=(), retry_after=None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlsplit
+        self.stamped = stamped
+        self.fail_pages = set(fail_pages)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                if parts.path == '/api/widget/reviews':
+                    page = int(params['page'])
+                    if page in server.fail_pages:
+                        server.fail_pages.discard(page)
+                        self.send_response(503)
+                        if retry_after is not None:
+                            self.send_header('Retry-After', str(retry_after))
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    body = stamped.respond(parts.path, params)
+                else:
+                    body = stamped.respond(parts.path)
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.product_url = base_url + '/products/leather-weekender-bag'
+        self.widget_api = base_url + '/api/widget/reviews'
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.01,), daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
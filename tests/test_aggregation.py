@@ -0,0 +1,31 @@
+from aggregation import summarize_reviews
+
+def analysed(rating, sentiment, category):
+    return {'rating': rating, 'analysis': {'sentiment': sentiment, 'category': category}}
+
+def test_counts_and_averages():
+    reviews = [
+        analysed('5', 'POSITIVE', 'QUALITY'),
+        analysed('4', 'POSITIVE', 'DELIVERY'),
+        analysed('1', 'NEGATIVE', 'QUALITY'),
+        analysed('n/a', 'NEUTRAL', 'SATISFACTION'),
+    ]
+    aggregates = summarize_reviews(reviews)
+    assert aggregates['total'] == 4
+    assert aggregates['rated'] == 3
+    assert aggregates['avg_rating'] == 10 / 3
+    assert aggregates['sentiments'] == {'POSITIVE': 2, 'NEGATIVE': 1, 'NEUTRAL': 1}
+    assert aggregates['categories'] == {'QUALITY': 2, 'DELIVERY': 1, 'AUTHENTICATION': 0, 'SATISFACTION': 1}
+    assert aggregates['positive_percent'] == 50
+    assert aggregates['category_groups'] == {'QUALITY': [0, 2], 'DELIVERY': [1], 'SATISFACTION': [3]}
+
+def test_unanalysed_reviews_count_as_neutral_satisfaction():
+    aggregates = summarize_reviews([{'rating': '5'}, analysed('3', 'POSITIVE', 'QUALITY')])
+    assert aggregates['sentiments']['NEUTRAL'] == 1
+    assert aggregates['categories']['SATISFACTION'] == 1
+    # Only analysed reviews are grouped
+    assert aggregates['category_groups'] == {'QUALITY': [1]}
+
+def test_no_reviews():
+    aggregates = summarize_reviews([])
+    assert (aggregates['total'], aggregates['avg_rating'], aggregates['positive_percent']) == (0, None, 0)
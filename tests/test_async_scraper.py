@@ -0,0 +1,76 @@
+import asyncio
+import time
+import pytest
+from async_scraper import AsyncJashanmalScraper
+from fakes import FakeStamped, StampedServer, make_reviews
+from rate_limiter import retry_after_seconds
+from review_index import ReviewIndex
+from scraper import JashanmalScraper
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+async def scrape(server, **kwargs):
+    async with AsyncJashanmalScraper(stamped_api=server.widget_api, backoff_factor=0.01, **kwargs) as scraper:
+        return await scraper.scrape_reviews(server.product_url)
+
+def test_reads_every_page():
+    reviews = make_reviews(23)
+    stamped = FakeStamped(reviews)
+    with StampedServer(stamped) as server:
+        assert run(scrape(server, page_concurrency=2)) == reviews
+    assert sorted(stamped.requested_pages) == [1, 2, 3, 4, 5]
+
+def test_stops_at_max_reviews_and_known_reviews():
+    reviews = make_reviews(23)
+    known = ReviewIndex()
+    for review in reviews[12:]:
+        known.add(review)
+
+    async def scrape_limited(server):
+        async with AsyncJashanmalScraper(stamped_api=server.widget_api, page_concurrency=1) as scraper:
+            limited = await scraper.scrape_reviews(server.product_url, max_reviews=7)
+            delta = await scraper.scrape_reviews(server.product_url, known=known)
+            return limited, delta
+
+    with StampedServer(FakeStamped(reviews)) as server:
+        limited, delta = run(scrape_limited(server))
+    assert limited == reviews[:7]
+    assert delta == reviews[:12]
+
+def test_retries_honour_retry_after():
+    reviews = make_reviews(12)
+    with StampedServer(FakeStamped(reviews), fail_pages=[2], retry_after=0.3) as server:
+        start = time.perf_counter()
+        assert run(scrape(server)) == reviews
+        assert time.perf_counter() - start >= 0.3
+
+def test_retry_after_seconds():
+    assert retry_after_seconds({'Retry-After': '2.5'}) == 2.5
+    assert retry_after_seconds({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0.0
+    assert retry_after_seconds({'Content-Type': 'text/html'}) is None
+    assert retry_after_seconds({'Retry-After': 'soon'}) is None
+
+def test_scrape_products_reports_each_product():
+    async def scrape_all(server):
+        async with AsyncJashanmalScraper(stamped_api=server.widget_api, max_retries=0) as scraper:
+            return [item async for item in scraper.scrape_products([server.product_url, 'http://127.0.0.1:9/x'])]
+
+    reviews = make_reviews(6)
+    with StampedServer(FakeStamped(reviews)) as server:
+        results = {url: (found, error) for url, found, error in run(scrape_all(server))}
+        assert results[server.product_url] == (reviews, None)
+    assert results['http://127.0.0.1:9/x'][1] is not None
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_sync_scraper_runs_the_async_engine(workers):
+    reviews = make_reviews(23)
+    with StampedServer(FakeStamped(reviews)) as server:
+        scraper = JashanmalScraper(engine='async', workers=workers, stamped_api=server.widget_api)
+        try:
+            assert scraper.scrape_reviews(server.product_url) == reviews
+            # The event loop and its session are kept for the next scrape
+            assert scraper.scrape_reviews(server.product_url, max_reviews=3) == reviews[:3]
+        finally:
+            scraper.close()
+        assert scraper._async is None
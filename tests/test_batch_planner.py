@@ -0,0 +1,38 @@
+from batch_planner import estimate_tokens, format_review, plan_batches, review_tokens
+
+def review(words):
+    return {'title': 'Bag', 'text': ' '.join(['leather'] * words)}
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('a' * 400) == 100
+    # Punctuation-heavy text counts by word pieces rather than length
+    assert estimate_tokens('!!!!') == 6
+
+def test_format_review_matches_the_prompt():
+    assert format_review(3, {'title': 'Bag', 'text': 'Nice'}) == "Review 3:\nTitle: Bag\nText: Nice"
+
+def test_batches_keep_order_and_respect_the_review_cap():
+    reviews = [review(5) for _ in range(12)]
+    batches = plan_batches(reviews, max_reviews=5)
+    assert batches == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9], [10, 11]]
+
+def test_output_budget_caps_the_batch_size():
+    reviews = [review(5) for _ in range(6)]
+    assert plan_batches(reviews, max_output_tokens=160, output_tokens_per_review=80) == [[0, 1], [2, 3], [4, 5]]
+
+def test_input_budget_packs_by_length():
+    reviews = [review(5), review(400), review(5), review(5)]
+    budget = review_tokens(reviews[1]) + 100
+    batches = plan_batches(reviews, prompt_tokens=50, max_input_tokens=budget)
+    assert [i for batch in batches for i in batch] == [0, 1, 2, 3]
+    assert all(50 + sum(review_tokens(reviews[i]) for i in batch) <= budget for batch in batches)
+
+def test_oversized_review_gets_its_own_batch():
+    reviews = [review(5), review(5000), review(5)]
+    assert plan_batches(reviews, max_input_tokens=500) == [[0], [1], [2]]
+
+def test_only_the_given_indices_are_planned():
+    reviews = [review(5) for _ in range(6)]
+    assert plan_batches(reviews, indices=[1, 4, 5]) == [[1, 4, 5]]
+    assert plan_batches(reviews, indices=[]) == []
@@ -0,0 +1,56 @@
+import pytest
+from capture_fixtures import BENCH_API_KEY, capture, scrub
+from fake_mistral import FakeMistralServer
+from genai_analysis import analyze_reviews_with_genai, read_error_bodies
+from stamped_fixtures import FixtureServer, StampedFixtures, sample_reviews
+from stamped_parser import parse_reviews, parse_total_reviews, parse_widget_config
+from scraper import JashanmalScraper
+
+MODEL = 'mistral-large-latest'
+
+def test_widget_pages_are_built_from_the_fixture_page():
+    fixtures = StampedFixtures(12)
+    widget = parse_widget_config(fixtures.product_html, 'https://www.jashanmal.com/products/leather-weekender-bag')
+    assert widget['product_id'] and widget['api_key']
+    assert parse_total_reviews(fixtures.widget_page(1)) == 12
+    assert [len(parse_reviews(fixtures.widget_page(page))) for page in range(1, fixtures.pages + 2)] == [5, 5, 2, 0]
+    # Repeated reviews are made unique, so none of them are deduplicated away
+    assert len({review['text'] for review in sample_reviews(12)}) == 12
+
+def test_http_engine_against_the_fixture_server():
+    with FixtureServer(42) as server:
+        scraper = JashanmalScraper(engine='http', workers=3, stamped_api=server.widget_api)
+        assert scraper.scrape_reviews(server.product_url) == sample_reviews(42)
+    assert server.requests == 1 + server.fixtures.pages
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_mistral_client_against_the_fake_server(stream):
+    from mistralai.client import MistralClient
+    reviews = sample_reviews(12)
+    with FakeMistralServer(rate_limit_every=2, retry_after=0.01) as server:
+        client = read_error_bodies(MistralClient(api_key='test-key', endpoint=server.url, max_retries=1))
+        _, sentiments = analyze_reviews_with_genai(reviews, MODEL, client, stream=stream,
+                                                   batch_budget={'max_reviews': 4})
+    assert sum(sentiments.values()) == 12
+    assert server.rate_limited >= 1
+    assert not any(review['analysis'].get('source') == 'fallback' for review in reviews)
+
+def test_scrub_removes_credentials_and_reviewers():
+    html = ('<script src="widget.min.js" data-api-key="pubkey-Live123" data-store-id="987654"></script>'
+            '<script>StampedFn.init({ apiKey: "pubkey-Live123", sId: "987654" });</script>'
+            '<div class="stamped-summary-text" data-count="87">Based on 87 Reviews</div>'
+            '<div class="stamped-review-avatar-content">JD</div><strong class="author">Jane D.</strong>'
+            '<p class="stamped-review-content-body">Write to jane.doe+shop@mail.example.ae</p>')
+    scrubbed = scrub(html, 'pubkey-Live123')
+    for secret in ('pubkey-Live123', '987654', 'Jane', 'JD', 'jane.doe', '87'):
+        assert secret not in scrubbed
+    assert scrubbed.count(BENCH_API_KEY) == 2
+    assert 'Based on {total} Reviews' in scrubbed and 'data-count="{total}"' in scrubbed
+
+def test_capture_from_a_product_page():
+    with FixtureServer(12) as server:
+        product_html, widget_html = capture(server.product_url, stamped_api=server.widget_api)
+    assert parse_widget_config(product_html, server.product_url)['api_key'] == BENCH_API_KEY
+    assert 'Sara A.' not in widget_html
+    fixtures = StampedFixtures(12)
+    assert len(parse_reviews(widget_html.replace('{total}', '12'))) == fixtures.per_page
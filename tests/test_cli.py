@@ -0,0 +1,120 @@
+import json
+import threading
+import pytest
+import cli
+from aggregation import summarize_reviews
+from cli import BatchRunner, build_pipeline, read_urls, result_record
+from fakes import make_reviews
+
+BAG = 'https://www.jashanmal.com/products/bag'
+WALLET = 'https://www.jashanmal.com/products/wallet'
+
+def analysed_reviews(count):
+    reviews = make_reviews(count)
+    for review in reviews:
+        review['analysis'] = {'summary': review['title'], 'sentiment': 'POSITIVE', 'category': 'QUALITY'}
+    return reviews
+
+class Pipeline:
+    def __init__(self, failing=(), incomplete=()):
+        self.failing = set(failing)
+        self.incomplete = set(incomplete)
+        self.urls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, job_id, url, store):
+        with self._lock:
+            self.urls.append(url)
+        if url in self.failing:
+            raise RuntimeError("Stamped is down")
+        reviews = analysed_reviews(3)
+        result = {'reviews': reviews, 'genai_output': 'Overall positive', 'sentiments': None,
+                  'aggregates': summarize_reviews(reviews)}
+        if url in self.incomplete:
+            result['error'] = '1 of 3 reviews could not be analyzed'
+        return result
+
+def test_read_urls(tmp_path):
+    url_file = tmp_path / 'urls.txt'
+    url_file.write_text(f"# bags\n{BAG}\n\n  {WALLET}  \n")
+    assert list(read_urls(['https://jashanmal.com/a'], str(url_file))) == ['https://jashanmal.com/a', BAG, WALLET]
+    assert list(read_urls([BAG], None)) == [BAG]
+
+def test_result_record():
+    reviews = analysed_reviews(4)
+    result = {'reviews': reviews, 'genai_output': 'Overall positive', 'aggregates': summarize_reviews(reviews)}
+    record = result_record(BAG, 'job', result, 1.23456)
+    assert record['status'] == 'done'
+    assert (record['reviews'], record['avg_rating'], record['positive_percent']) == (4, 5.0, 100.0)
+    assert record['sentiments']['POSITIVE'] == 4
+    assert record['elapsed_s'] == 1.235
+    assert 'review_items' not in record
+    assert result_record(BAG, 'job', {'reviews': []}, 0, include_reviews=True)['review_items'] == []
+
+def test_runner_skips_duplicates_and_reports_failures():
+    pipeline = Pipeline(failing=[WALLET])
+    runner = BatchRunner(pipeline, jobs=2)
+    urls = [BAG, WALLET, BAG + '?utm_source=mail'] + [f"https://jashanmal.com/products/{n}" for n in range(6)]
+    records = list(runner.run(urls))
+    assert len(records) == 8
+    assert (runner.done, runner.failed, runner.skipped) == (7, 1, 1)
+    failed = [record for record in records if record['status'] == 'failed']
+    assert failed[0]['url'] == WALLET and failed[0]['error'] == 'Stamped is down'
+    # Finished jobs do not pile up in the store
+    assert runner.store.get(records[0]['job_id']) is None
+
+def test_runner_prunes_the_datastore_first():
+    calls = []
+
+    class Datastore:
+        def prune(self):
+            calls.append('prune')
+
+    class Recording(Pipeline):
+        def __call__(self, job_id, url, store):
+            calls.append(url)
+            return super().__call__(job_id, url, store)
+
+    list(BatchRunner(Recording(), datastore=Datastore()).run([BAG]))
+    assert calls == ['prune', BAG]
+
+class Scraper:
+    closed = False
+
+    def close(self):
+        Scraper.closed = True
+
+def test_main_writes_json_lines(monkeypatch, tmp_path):
+    pipeline = Pipeline()
+    monkeypatch.setenv('MISTRAL_API_KEY', 'test-key')
+    monkeypatch.setattr(cli, 'build_pipeline', lambda args: (pipeline, Scraper(), None))
+    output = tmp_path / 'out.jsonl'
+    assert cli.main([BAG, WALLET, '-o', str(output)]) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record['url'] for record in records) == [BAG, WALLET]
+    assert Scraper.closed
+
+def test_incomplete_jobs_are_reported(monkeypatch, tmp_path):
+    monkeypatch.setenv('MISTRAL_API_KEY', 'test-key')
+    monkeypatch.setattr(cli, 'build_pipeline', lambda args: (Pipeline(incomplete=[WALLET]), Scraper(), None))
+    output = tmp_path / 'out.jsonl'
+    assert cli.main([BAG, WALLET, '-o', str(output)]) == 1
+    records = {record['url']: record for record in map(json.loads, output.read_text().splitlines())}
+    assert records[BAG]['status'] == 'done'
+    assert (records[WALLET]['status'], records[WALLET]['error']) == ('incomplete', '1 of 3 reviews could not be analyzed')
+
+def test_main_needs_urls():
+    with pytest.raises(SystemExit):
+        cli.main([])
+
+def test_build_pipeline_passes_llm_concurrency(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MISTRAL_API_KEY', 'test-key')
+    args = cli.argparse.Namespace(browsers=1, engine='http', wait_strategy='dom', scrape_workers=1, stamped_api=None,
+                                  no_db=False, db=str(tmp_path / 'db.sqlite3'), no_preclassify=True, model=cli.MODEL,
+                                  no_cache=True, llm_concurrency=7)
+    pipeline, scraper, datastore = build_pipeline(args)
+    assert pipeline.keywords['max_concurrency'] == 7
+    assert pipeline.keywords['analysis_cache'] is None
+    scraper.close()
+    datastore.close()
@@ -0,0 +1,131 @@
+import time
+import pytest
+from datastore import ReviewStore
+from fakes import FakeMistralClient, make_reviews
+from jobs import JOB_DONE, JOB_INCOMPLETE, RESUMABLE_STATUSES, JobStore, run_review_analysis
+
+URL = 'https://www.jashanmal.com/products/leather-weekender-bag'
+SAVED = {'summary': 'Saved before the restart', 'sentiment': 'POSITIVE', 'category': 'QUALITY'}
+
+class NoScraper:
+    def scrape_reviews_incremental(self, url, cache):
+        raise AssertionError("a resumed job should not scrape again")
+
+@pytest.fixture
+def datastore(tmp_path):
+    store = ReviewStore(str(tmp_path / 'reviewai.sqlite3'))
+    yield store
+    store.close()
+
+def test_reviews_and_analyses_round_trip(datastore):
+    reviews = make_reviews(3)
+    reviews[0]['analysis'] = SAVED
+    datastore.create_job('job', URL, 'scraping')
+    datastore.save_reviews('job', reviews)
+    datastore.save_analyses('job', {1: SAVED})
+
+    loaded = datastore.load_reviews('job')
+    assert [review['text'] for review in loaded] == [review['text'] for review in reviews]
+    # Analyses come from the analyses table only
+    assert 'analysis' not in loaded[0]
+    assert loaded[1]['analysis'] == SAVED
+
+def test_job_rows_follow_the_job(datastore):
+    datastore.create_job('job', URL, 'scraping')
+    datastore.update_job('job', 'done', genai_output='Overall positive', sentiments=['POSITIVE'])
+    job = datastore.get_job('job')
+    assert (job['url'], job['status'], job['genai_output']) == (URL, 'done', 'Overall positive')
+    assert job['sentiments'] == ['POSITIVE']
+    assert datastore.get_job('missing') is None
+
+def test_resume_only_sends_missing_reviews(datastore):
+    reviews = make_reviews(10)
+    datastore.create_job('job', URL, 'analyzing')
+    datastore.save_reviews('job', reviews)
+    datastore.save_analyses('job', {i: SAVED for i in range(6)})
+
+    store = JobStore()
+    store.create(URL, job_id='job')
+    client = FakeMistralClient()
+    result = run_review_analysis('job', URL, store, NoScraper(), None, client, 'mistral-large-latest',
+                                 datastore=datastore, resume=True)
+
+    assert len(result['reviews']) == 10
+    assert client.reviewed_texts() == [review['text'] for review in reviews[6:]]
+
+    analyses = datastore.load_analyses('job')
+    assert sorted(analyses) == list(range(10))
+    assert all(analyses[i] == SAVED for i in range(6))
+    job = datastore.get_job('job')
+    assert job['status'] == JOB_DONE
+    # The aggregates are computed once by the job and stored with it
+    assert result['aggregates']['total'] == 10
+    assert job['aggregates'] == result['aggregates']
+
+def test_failed_batches_leave_the_job_resumable(datastore):
+    reviews = make_reviews(4)
+
+    class Scraper:
+        def scrape_reviews_incremental(self, url, cache):
+            return [dict(review) for review in reviews]
+
+    store = JobStore()
+    store.create(URL, job_id='job')
+    result = run_review_analysis('job', URL, store, Scraper(), None, FakeMistralClient(error=ValueError("429")),
+                                 'mistral-large-latest', datastore=datastore)
+    assert result['error'] == '4 of 4 reviews could not be analyzed'
+    job = datastore.get_job('job')
+    assert (job['status'], job['error']) == (JOB_INCOMPLETE, result['error'])
+    assert [job['id'] for job in datastore.jobs_with_status(RESUMABLE_STATUSES)] == ['job']
+    # Fallbacks of failed batches are not checkpointed
+    assert datastore.load_analyses('job') == {}
+
+    client = FakeMistralClient()
+    result = run_review_analysis('job', URL, store, NoScraper(), None, client, 'mistral-large-latest',
+                                 datastore=datastore, resume=True)
+    assert 'error' not in result
+    assert client.reviewed_texts() == [review['text'] for review in reviews]
+    job = datastore.get_job('job')
+    assert (job['status'], job['error']) == (JOB_DONE, None)
+
+def test_labelled_reviews_skip_tagged_analyses(datastore):
+    reviews = make_reviews(3)
+    datastore.create_job('job', URL, 'done')
+    datastore.save_reviews('job', reviews)
+    datastore.save_analyses('job', {
+        0: SAVED,
+        1: dict(SAVED, source='local'),
+        2: dict(SAVED, sentiment='NEUTRAL', source='fallback'),
+    })
+    labelled = datastore.labelled_reviews()
+    assert [review['text'] for review in labelled] == [reviews[0]['text']]
+    assert labelled[0]['analysis'] == SAVED
+
+def test_old_databases_gain_the_aggregates_column(tmp_path):
+    import sqlite3
+    path = str(tmp_path / 'old.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, url TEXT NOT NULL, status TEXT NOT NULL, "
+                 "created_at REAL NOT NULL, updated_at REAL NOT NULL, genai_output TEXT, sentiments TEXT, "
+                 "error TEXT)")
+    conn.execute("INSERT INTO jobs VALUES ('job', ?, 'done', 0, 0, 'Overall positive', NULL, NULL)", (URL,))
+    conn.commit()
+    conn.close()
+    store = ReviewStore(path)
+    assert store.get_job('job')['aggregates'] is None
+    store.update_job('job', 'done', aggregates={'total': 3})
+    assert store.get_job('job')['aggregates'] == {'total': 3}
+    store.close()
+
+def test_prune_drops_old_jobs_with_their_rows(datastore, monkeypatch):
+    for job_id in ('old', 'new'):
+        datastore.create_job(job_id, URL, 'done')
+        datastore.save_reviews(job_id, make_reviews(2))
+        datastore.save_analyses(job_id, {0: SAVED})
+    now = time.time()
+    monkeypatch.setattr('datastore.time.time', lambda: now + 3600)
+    datastore.update_job('new', 'done')
+    assert datastore.prune(max_age=60) == 1
+    assert datastore.get_job('old') is None
+    assert datastore.load_reviews('old') == [] and datastore.load_analyses('old') == {}
+    assert len(datastore.load_reviews('new')) == 2
@@ -0,0 +1,107 @@
+import threading
+import pytest
+from driver_pool import DriverPool
+
+class FakeDriver:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.quit_calls = 0
+        self.visited = []
+
+    def execute_script(self, script, *args):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def quit(self):
+        self.quit_calls += 1
+
+class Factory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.drivers) + 1)
+        self.drivers.append(driver)
+        return driver
+
+@pytest.fixture
+def factory():
+    return Factory()
+
+def test_released_drivers_are_reused(factory):
+    pool = DriverPool(factory, max_size=2)
+    driver = pool.acquire()
+    pool.release(driver)
+    assert pool.acquire() is driver
+    assert len(factory.drivers) == 1
+    # Released drivers are reset before anyone else gets them
+    assert driver.visited == ['about:blank']
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['started']) == (1, 1, 1)
+
+def test_drivers_are_recycled_after_max_uses(factory):
+    pool = DriverPool(factory, max_size=1, max_uses=2)
+    first = pool.acquire()
+    pool.release(first)
+    pool.release(pool.acquire())
+    assert first.quit_calls == 1
+    assert pool.acquire() is not first
+    assert pool.stats()['recycled'] == 1
+
+def test_crashed_drivers_are_replaced(factory):
+    pool = DriverPool(factory, max_size=1)
+    driver = pool.acquire()
+    pool.release(driver)
+    # Dies while parked in the pool
+    driver.alive = False
+    replacement = pool.acquire()
+    assert replacement is not driver
+    assert driver.quit_calls == 1
+    pool.release(replacement, broken=True)
+    assert pool.stats()['crashed'] == 2
+    assert pool.acquire() is factory.drivers[-1]
+
+def test_acquire_waits_for_a_free_driver(factory):
+    pool = DriverPool(factory, max_size=1, acquire_timeout=5)
+    driver = pool.acquire()
+    timer = threading.Timer(0.1, pool.release, [driver])
+    timer.start()
+    assert pool.acquire() is driver
+    timer.join()
+
+def test_acquire_times_out_when_exhausted(factory):
+    pool = DriverPool(factory, max_size=1, acquire_timeout=0.05)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+def test_failed_startup_frees_its_slot():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("chromedriver missing")
+        return FakeDriver(len(attempts))
+
+    pool = DriverPool(flaky, max_size=1, acquire_timeout=0.05)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert pool.acquire().number == 2
+
+def test_warm_and_close(factory):
+    pool = DriverPool(factory, max_size=3)
+    pool.warm(2)
+    assert pool.stats()['idle'] == 2
+    pool.close()
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+import pytest
+from fakes import FakeMistralClient, make_review, make_reviews
+from genai_analysis import MAX_REPAIR_ATTEMPTS, analyze_reviews_with_genai, read_error_bodies
+from llm_cache import AnalysisCache
+from preclassifier import LOCAL_SOURCE, PreClassifier
+
+MODEL = 'mistral-large-latest'
+
+def test_every_review_gets_its_analysis():
+    reviews = make_reviews(30) + [make_review(31, rating=1, text='Arrived late and scuffed.')]
+    client = FakeMistralClient()
+    text, sentiments = analyze_reviews_with_genai(reviews, MODEL, client, max_concurrency=3,
+                                                  batch_budget={'max_reviews': 8})
+    assert len(client.prompts) == 4
+    assert sentiments['POSITIVE'] == 30 and sentiments['NEGATIVE'] == 1
+    assert [review['analysis']['summary'] for review in reviews] == [review['title'] for review in reviews]
+    assert reviews[-1]['analysis']['category'] == 'DELIVERY'
+    assert 'Analysis based on 31 reviews' in text
+
+def test_failed_batches_fall_back_to_neutral():
+    reviews = make_reviews(4)
+    client = FakeMistralClient(error=ValueError("invalid model"))
+    _, sentiments = analyze_reviews_with_genai(reviews, MODEL, client)
+    assert sentiments['NEUTRAL'] == 4
+    assert all(review['analysis']['summary'] == 'Analysis failed due to API limits' for review in reviews)
+    assert all(review['analysis']['source'] == 'fallback' for review in reviews)
+    assert all(review['analysis']['error'] == 'invalid model' for review in reviews)
+
+def test_cached_reviews_are_not_sent_again(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'llm.sqlite3'))
+    analyze_reviews_with_genai(make_reviews(5), MODEL, FakeMistralClient(), cache=cache)
+    client = FakeMistralClient()
+    reviews = make_reviews(7)
+    analyze_reviews_with_genai(reviews, MODEL, client, cache=cache)
+    assert client.reviewed_texts() == [review['text'] for review in reviews[5:]]
+    assert all(review.get('analysis') for review in reviews)
+    cache.close()
+
+@pytest.mark.parametrize('stream', [False, True])
+@pytest.mark.parametrize('output_mode', ['json', 'text'])
+def test_reviews_missing_after_repair_count_as_neutral(output_mode, stream):
+    reviews = make_reviews(5)
+    reviews[2]['text'] = 'Never mentioned by the model.'
+    client = FakeMistralClient(skip='Never mentioned')
+    _, sentiments = analyze_reviews_with_genai(reviews, MODEL, client, output_mode=output_mode, stream=stream)
+    # Only the missing review is asked for again
+    assert len(client.prompts) == 1 + MAX_REPAIR_ATTEMPTS
+    assert client.reviewed_texts()[5:] == [reviews[2]['text']] * MAX_REPAIR_ATTEMPTS
+    assert sum(sentiments.values()) == 5
+    assert reviews[2]['analysis']['summary'] == 'Analysis missing from the model response'
+    assert reviews[2]['analysis']['sentiment'] == 'NEUTRAL'
+
+def test_clear_cut_reviews_are_settled_locally():
+    reviews = make_reviews(4) + [make_review(5, rating=3, text='It is a bag.')]
+    reviews[0]['text'] = 'Excellent, durable and sturdy leather.'
+    client = FakeMistralClient()
+    analyze_reviews_with_genai(reviews, MODEL, client, preclassifier=PreClassifier())
+    assert reviews[0]['analysis']['source'] == LOCAL_SOURCE
+    assert reviews[0]['text'] not in client.reviewed_texts()
+    assert 'It is a bag.' in client.reviewed_texts()
+
+@pytest.mark.parametrize('output_mode', ['json', 'text'])
+def test_results_are_reported_as_they_arrive(output_mode):
+    reviews = make_reviews(6)
+    seen = []
+    analyze_reviews_with_genai(reviews, MODEL, FakeMistralClient(), output_mode=output_mode, stream=True,
+                               on_result=lambda i, review, analysis: seen.append((i, analysis['summary'])))
+    assert sorted(seen) == [(i, review['title']) for i, review in enumerate(reviews)]
+
+def test_read_error_bodies_hooks_responses():
+    http_client = SimpleNamespace(event_hooks={'request': [], 'response': []})
+    client = SimpleNamespace(_client=http_client)
+    assert read_error_bodies(client) is client
+    assert len(http_client.event_hooks['response']) == 1
+
+def test_read_error_bodies_fails_loudly_without_httpx_client():
+    with pytest.raises(RuntimeError, match='mistralai version'):
+        read_error_bodies(SimpleNamespace())
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from importtime import ENTRY_POINTS, HEAVY_MODULES, ROOT, run, top_level_imports
+
+def test_entry_points_do_not_import_heavy_modules():
+    modules = list(dict.fromkeys(module for entry in ENTRY_POINTS
+                                 for module in top_level_imports(os.path.join(ROOT, entry))))
+    code = '\n'.join([f"import {module}" for module in modules] + [
+        "import sys",
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+    ])
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == []
+
+def test_top_level_imports_skip_function_level_ones(tmp_path):
+    path = tmp_path / 'entry.py'
+    path.write_text("import os, json\nfrom jobs import JobQueue\nfrom . import sibling\n"
+                    "def load():\n    import pandas\n")
+    assert top_level_imports(str(path)) == ['os', 'json', 'jobs']
+
+def test_own_time_leaves_out_interpreter_startup(tmp_path):
+    path = tmp_path / 'entry.py'
+    path.write_text("print('nothing imported')\n")
+    result = run([str(path)], repeats=3)[str(path)]
+    # Only what a bare interpreter imports anyway
+    assert result['baseline_ms'] > 0
+    assert result['own_ms'] == 0
+
+def test_scraper_loads_asyncio_only_for_the_async_engine():
+    # streamlit brings its own event loop, the CLI and job workers should not
+    code = "import cli, jobs, scraper, sys; print('asyncio' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
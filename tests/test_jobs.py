@@ -0,0 +1,172 @@
+import threading
+import time
+import pytest
+from genai_analysis import fallback_analysis
+from jobs import JOB_DONE, JOB_FAILED, JOB_INCOMPLETE, JOB_QUEUED, JobQueue, JobStore, ResultCache, normalize_url
+
+def test_normalize_url_same_product():
+    key = normalize_url('https://www.jashanmal.com/products/bag')
+    assert normalize_url('HTTPS://WWW.Jashanmal.com/products/bag/') == key
+    assert normalize_url('  https://jashanmal.com/products/bag#reviews ') == key
+    assert normalize_url('https://jashanmal.com/products/bag?utm_source=mail&fbclid=abc&_pos=2') == key
+
+def test_normalize_url_keeps_product_parameters():
+    assert normalize_url('https://jashanmal.com/products/bag?variant=2&color=red') == \
+        normalize_url('https://jashanmal.com/products/bag?color=red&variant=2')
+    assert normalize_url('https://jashanmal.com/products/bag?variant=2') != \
+        normalize_url('https://jashanmal.com/products/bag?variant=3')
+
+def test_normalize_url_defaults():
+    assert normalize_url('https://jashanmal.com') == 'https://jashanmal.com/'
+    assert normalize_url('//jashanmal.com/products/bag') == 'https://jashanmal.com/products/bag'
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in (JOB_DONE, JOB_INCOMPLETE, JOB_FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']}")
+
+class Pipeline:
+    # Finishes once `gate` is set, recording every call
+    def __init__(self, reviews=({'title': 'Bag', 'text': 'Nice'},), genai_output='Overall positive', error=None):
+        self.reviews = list(reviews)
+        self.genai_output = genai_output
+        self.error = error
+        self.result_error = None
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, job_id, url, store, resume=False):
+        self.calls.append((job_id, url, resume))
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        result = {'reviews': self.reviews, 'genai_output': self.genai_output, 'sentiments': ['POSITIVE']}
+        if self.result_error is not None:
+            result['error'] = self.result_error
+        return result
+
+@pytest.fixture
+def pipeline():
+    return Pipeline()
+
+@pytest.fixture
+def queue(pipeline):
+    queue = JobQueue(pipeline, workers=2)
+    yield queue
+    pipeline.gate.set()
+    queue.shutdown()
+
+def test_job_store_tracks_progress():
+    store = JobStore()
+    job = store.create('https://jashanmal.com/products/bag')
+    assert job['status'] == JOB_QUEUED
+    for number in range(25):
+        store.add_result(job['id'], {'title': f"Review {number}"})
+    job = store.get(job['id'])
+    assert job['analyzed'] == 25
+    assert len(job['recent_results']) == 20
+    assert job['recent_results'][-1] == {'title': 'Review 24'}
+
+def test_job_store_prunes_only_old_finished_jobs():
+    store = JobStore(ttl=0)
+    finished = store.create('https://jashanmal.com/products/a')['id']
+    running = store.create('https://jashanmal.com/products/b')['id']
+    store.update(finished, status=JOB_DONE)
+    time.sleep(0.01)
+    store.prune()
+    assert store.get(finished) is None
+    assert store.get(running) is not None
+
+def test_queue_runs_jobs_in_the_background(queue, pipeline):
+    job = wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    assert job['genai_output'] == 'Overall positive'
+    assert job['reviews'] == pipeline.reviews
+
+def test_failed_jobs_record_the_error(pipeline, queue):
+    pipeline.error = RuntimeError("Stamped is down")
+    job = wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    assert job['status'] == JOB_FAILED
+    assert job['error'] == 'Stamped is down'
+
+def test_jobs_with_failed_batches_are_incomplete(queue, pipeline):
+    pipeline.result_error = '1 of 1 reviews could not be analyzed'
+    job = wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    assert (job['status'], job['error']) == (JOB_INCOMPLETE, '1 of 1 reviews could not be analyzed')
+    # Resuming it runs the job again
+    pipeline.result_error = None
+    assert wait_for(queue, queue.resume(job['id'], job['url']))['status'] == JOB_DONE
+    assert pipeline.calls[-1] == (job['id'], job['url'], True)
+
+def test_submit_prunes_the_datastore_at_most_hourly(pipeline):
+    class Datastore:
+        prunes = 0
+
+        def prune(self):
+            Datastore.prunes += 1
+            return 0
+
+    queue = JobQueue(pipeline, datastore=Datastore())
+    for product in ('a', 'b', 'c'):
+        wait_for(queue, queue.submit(f"https://jashanmal.com/products/{product}"))
+    queue.shutdown()
+    assert Datastore.prunes == 1
+
+def test_resume_reruns_under_the_same_id(queue, pipeline):
+    job_id = queue.resume('saved-job', 'https://jashanmal.com/products/bag')
+    assert job_id == 'saved-job'
+    assert wait_for(queue, job_id)['status'] == JOB_DONE
+    assert pipeline.calls == [('saved-job', 'https://jashanmal.com/products/bag', True)]
+
+def test_same_product_shares_the_running_job(queue, pipeline):
+    pipeline.gate.clear()
+    first = queue.submit('https://www.jashanmal.com/products/bag?utm_source=mail')
+    second = queue.submit('https://jashanmal.com/products/bag/')
+    assert first == second
+    assert queue.coalesced == 1
+    # Resuming another job for the same product attaches too
+    assert queue.resume('saved-job', 'https://jashanmal.com/products/bag') == first
+    pipeline.gate.set()
+    wait_for(queue, first)
+    assert len(pipeline.calls) == 1
+
+def test_finished_results_are_served_from_the_cache(queue, pipeline):
+    wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    job = wait_for(queue, queue.submit('https://jashanmal.com/products/bag#reviews'))
+    assert job['genai_output'] == 'Overall positive'
+    assert job['analyzed'] == 1
+    assert len(pipeline.calls) == 1
+    assert queue.results.hits == 1
+
+def test_incomplete_results_are_not_cached(queue, pipeline):
+    pipeline.genai_output = 'Analysis incomplete: 1 of 2 batches failed'
+    wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    assert len(pipeline.calls) == 2
+
+def test_results_with_fallback_analyses_are_not_cached(queue, pipeline):
+    pipeline.reviews = [
+        {'title': 'Bag', 'analysis': {'sentiment': 'POSITIVE', 'category': 'QUALITY'}},
+        {'title': 'Strap', 'analysis': fallback_analysis('Analysis failed due to API limits')},
+    ]
+    wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    wait_for(queue, queue.submit('https://jashanmal.com/products/bag'))
+    assert len(pipeline.calls) == 2
+    assert queue.results.hits == 0
+
+def test_result_cache_expiry_and_eviction(monkeypatch):
+    cache = ResultCache(ttl=60, max_entries=2)
+    cache.put('https://jashanmal.com/products/a', 'a')
+    cache.put('https://jashanmal.com/products/b', 'b')
+    assert cache.get('https://www.jashanmal.com/products/a/') == 'a'
+    cache.put('https://jashanmal.com/products/c', 'c')
+    # b was the least recently used
+    assert cache.get('https://jashanmal.com/products/b') is None
+    now = time.time()
+    monkeypatch.setattr('jobs.time.time', lambda: now + 61)
+    assert cache.get('https://jashanmal.com/products/a') is None
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,54 @@
+import llm_cache
+from llm_cache import AnalysisCache, analysis_cache_key
+
+REVIEW = {'title': 'Great bag', 'text': 'Soft leather.'}
+ANALYSIS = {'summary': 'Great bag', 'sentiment': 'POSITIVE', 'category': 'QUALITY'}
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_key_covers_model_prompt_version_and_content():
+    key = analysis_cache_key(REVIEW, 'mistral-small', 1)
+    assert key == analysis_cache_key(dict(REVIEW, rating='5'), 'mistral-small', 1)
+    assert key != analysis_cache_key(REVIEW, 'mistral-large', 1)
+    assert key != analysis_cache_key(REVIEW, 'mistral-small', 2)
+    assert key != analysis_cache_key(dict(REVIEW, text='Scuffed.'), 'mistral-small', 1)
+
+def test_round_trip_and_hit_rate(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'llm.sqlite3'))
+    cache.put_many({'a': ANALYSIS})
+    assert cache.get_many(['a', 'b', 'a']) == {'a': ANALYSIS}
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+    cache.close()
+
+    # Persists across instances
+    reopened = AnalysisCache(str(tmp_path / 'llm.sqlite3'))
+    assert reopened.get_many(['a']) == {'a': ANALYSIS}
+    reopened.close()
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock)
+    cache = AnalysisCache(str(tmp_path / 'llm.sqlite3'), ttl=60)
+    cache.put_many({'a': ANALYSIS})
+    clock.now += 61
+    assert cache.get_many(['a']) == {}
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock)
+    cache = AnalysisCache(str(tmp_path / 'llm.sqlite3'), max_entries=2)
+    cache.put_many({'a': ANALYSIS})
+    clock.now += 1
+    cache.put_many({'b': ANALYSIS})
+    clock.now += 1
+    cache.get_many(['a'])
+    clock.now += 1
+    cache.put_many({'c': ANALYSIS})
+    assert set(cache.get_many(['a', 'b', 'c'])) == {'a', 'c'}
+    cache.close()
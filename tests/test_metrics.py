@@ -0,0 +1,84 @@
+import json
+import threading
+import urllib.request
+import pytest
+import metrics
+from metrics import Registry
+
+def test_prometheus_text_exposition():
+    registry = Registry()
+    registry.inc('jobs_total', status='done')
+    registry.inc('jobs_total', 2, status='failed')
+    registry.observe('scrape_seconds', 0.3, engine='http')
+    registry.observe('scrape_seconds', 4.0, engine='http')
+    text = registry.prometheus_text()
+    assert '# TYPE reviewai_jobs_total counter\n' in text
+    assert 'reviewai_jobs_total{status="done"} 1\n' in text
+    assert 'reviewai_jobs_total{status="failed"} 2\n' in text
+    assert '# TYPE reviewai_scrape_seconds histogram\n' in text
+    # Buckets are cumulative
+    assert 'reviewai_scrape_seconds_bucket{engine="http",le="0.25"} 0\n' in text
+    assert 'reviewai_scrape_seconds_bucket{engine="http",le="0.5"} 1\n' in text
+    assert 'reviewai_scrape_seconds_bucket{engine="http",le="5.0"} 2\n' in text
+    assert 'reviewai_scrape_seconds_bucket{engine="http",le="+Inf"} 2\n' in text
+    assert 'reviewai_scrape_seconds_count{engine="http"} 2\n' in text
+    assert 'reviewai_scrape_seconds_sum{engine="http"} 4.3\n' in text
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.inc('errors_total', reason='bad "quote"\nnext', retried=True)
+    assert 'reviewai_errors_total{reason="bad \\"quote\\"\\nnext",retried="true"} 1' in registry.prometheus_text()
+
+def test_spans_record_duration_errors_and_traces(tmp_path, monkeypatch):
+    registry = Registry()
+    trace = tmp_path / 'trace.jsonl'
+    monkeypatch.setattr(metrics, 'registry', registry)
+    monkeypatch.setattr(metrics, 'TRACE_FILE', str(trace))
+    monkeypatch.setattr(metrics, '_trace_file', None)
+    with metrics.span('job', trace_id='job-1') as job:
+        job.set(url='https://jashanmal.com/products/bag')
+        with pytest.raises(ValueError):
+            with metrics.span('scrape', engine='http'):
+                raise ValueError("no widget")
+    metrics._trace_file.close()
+
+    snapshot = registry.snapshot()
+    assert [h['name'] for h in snapshot['histograms']] == ['job_seconds', 'scrape_seconds']
+    assert snapshot['counters'] == [{'name': 'scrape_errors_total', 'labels': {'engine': 'http'}, 'value': 1}]
+    scrape, outer = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert scrape['parent_id'] == outer['span_id']
+    assert scrape['trace_id'] == outer['trace_id'] == 'job-1'
+    assert (scrape['status'], scrape['error'], scrape['engine']) == ('error', 'no widget', 'http')
+    assert outer['url'] == 'https://jashanmal.com/products/bag'
+
+def test_spans_on_other_threads_take_an_explicit_parent(monkeypatch):
+    monkeypatch.setattr(metrics, 'registry', Registry())
+    children = []
+    with metrics.span('analysis', trace_id='job-2'):
+        parent = metrics.current_span()
+
+        def work():
+            with metrics.span('batch', parent=parent) as child:
+                children.append(child)
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    assert children[0].trace_id == 'job-2'
+    assert metrics.current_span() is None
+
+def test_metrics_server(monkeypatch):
+    registry = Registry()
+    registry.inc('jobs_total', status='done')
+    monkeypatch.setattr(metrics, 'registry', registry)
+    server = metrics.start_metrics_server(0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(base + '/metrics') as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert 'reviewai_jobs_total{status="done"} 1' in response.read().decode()
+        with urllib.request.urlopen(base + '/metrics.json') as response:
+            assert json.load(response)['counters'][0]['value'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
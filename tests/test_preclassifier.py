@@ -0,0 +1,47 @@
+import pytest
+from preclassifier import LOCAL_SOURCE, PreClassifier
+
+@pytest.fixture
+def classifier():
+    return PreClassifier()
+
+def test_clear_positive(classifier):
+    analysis = classifier.classify({'rating': '5', 'title': 'Love it', 'text': 'Soft and durable leather.'})
+    assert analysis['sentiment'] == 'POSITIVE'
+    assert analysis['category'] == 'QUALITY'
+    assert analysis['summary'] == 'Love it'
+    assert analysis['source'] == LOCAL_SOURCE
+
+def test_clear_negative(classifier):
+    analysis = classifier.classify({'rating': '1', 'title': '', 'text': 'Arrived late. Delayed twice.'})
+    assert analysis['sentiment'] == 'NEGATIVE'
+    assert analysis['category'] == 'DELIVERY'
+    assert analysis['summary'] == 'Arrived late.'
+
+def test_confidence_threshold(classifier):
+    # A 4 star rating needs more agreeing keywords than a 5 star one
+    assert classifier.classify({'rating': '4', 'text': 'Very durable.'}) is None
+    assert classifier.classify({'rating': '4', 'text': 'Durable, sturdy and well made.'}) is not None
+    strict = PreClassifier(min_confidence=0.95)
+    assert strict.classify({'rating': '5', 'text': 'Very durable.'}) is None
+
+@pytest.mark.parametrize('review', [
+    # Negations go to the model
+    {'rating': '5', 'text': 'Not durable at all.'},
+    # Keywords disagreeing with the rating or with each other
+    {'rating': '5', 'text': 'Flimsy and cheap.'},
+    {'rating': '1', 'text': 'Durable but flimsy.'},
+    {'rating': '5', 'text': 'Durable, but it came damaged.'},
+    # Middle ratings, no keywords, no rating
+    {'rating': '3', 'text': 'Durable and sturdy.'},
+    {'rating': '5', 'text': 'Bought it last week.'},
+    {'rating': '', 'text': 'Durable and sturdy.'},
+    {'rating': 'n/a', 'text': 'Durable and sturdy.'},
+])
+def test_ambiguous_reviews_are_deferred(classifier, review):
+    assert classifier.classify(review) is None
+
+def test_counts(classifier):
+    classifier.classify({'rating': '5', 'text': 'Excellent, durable and sturdy.'})
+    classifier.classify({'rating': '3', 'text': 'Fine.'})
+    assert (classifier.classified, classifier.deferred) == (1, 1)
@@ -0,0 +1,76 @@
+import pytest
+import rate_limiter
+from rate_limiter import RateLimiter, TokenBucket
+
+class ApiError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"status {status}")
+        self.http_status = status
+        self.headers = headers or {}
+
+class Flaky:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', slept.append)
+    return slept
+
+def test_bucket_goes_into_debt_and_reports_the_wait():
+    bucket = TokenBucket(60, burst=1)
+    assert bucket.reserve(1, now=bucket.updated) == 0
+    # Second request in the same instant waits for one token at 1/s
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1.0)
+    # Half the pace doubles the wait
+    slow = TokenBucket(60, burst=1)
+    slow.reserve(1, now=slow.updated)
+    assert slow.reserve(1, now=slow.updated, rate_factor=0.5) == pytest.approx(2.0)
+
+def test_retries_server_errors_with_backoff(sleeps):
+    limiter = RateLimiter(requests_per_minute=600000, base_delay=0.5, max_delay=4)
+    fn = Flaky(ApiError(503), ApiError(502))
+    assert limiter.call(fn) == 'ok'
+    assert fn.calls == 3
+    assert limiter.retries == 2
+    assert all(0 <= delay <= 4 for delay in sleeps)
+
+def test_does_not_retry_client_errors(sleeps):
+    limiter = RateLimiter(requests_per_minute=600000)
+    with pytest.raises(ApiError):
+        limiter.call(Flaky(ApiError(400)))
+    assert limiter.retries == 0
+
+def test_gives_up_after_max_retries(sleeps):
+    limiter = RateLimiter(requests_per_minute=600000, max_retries=2, base_delay=0.01)
+    fn = Flaky(*[ApiError(500)] * 5)
+    with pytest.raises(ApiError):
+        limiter.call(fn)
+    assert fn.calls == 3
+
+def test_rate_limit_honours_retry_after_and_slows_down(sleeps):
+    limiter = RateLimiter(requests_per_minute=600000, base_delay=0.01, max_delay=60)
+    assert limiter.call(Flaky(ApiError(429, {'retry-after': '7'}))) == 'ok'
+    assert 7 <= max(sleeps) <= 7.01
+    assert limiter.rate_limit_hits == 1
+    # Halved, then crept back up by the successful call
+    assert limiter.rate_factor == pytest.approx(0.55)
+
+def test_rate_limit_recognised_from_message(sleeps):
+    limiter = RateLimiter(requests_per_minute=600000, base_delay=0.01)
+    assert limiter.call(Flaky(Exception("Rate limit exceeded"))) == 'ok'
+    assert limiter.rate_limit_hits == 1
+
+def test_record_usage_settles_the_estimate():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    limiter.acquire(tokens=100)
+    limiter.record_usage(estimated_tokens=100, actual_tokens=400)
+    assert limiter.tokens.tokens == pytest.approx(600, abs=1)
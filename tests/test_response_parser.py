@@ -0,0 +1,37 @@
+from response_parser import JsonObjectStream, parse_json_analyses, parse_text_analyses
+
+ITEM = '{"id": %d, "summary": "Nice {bag}", "sentiment": "POSITIVE", "category": "QUALITY"}'
+
+def test_objects_split_across_chunks():
+    text = '[' + ITEM % 1 + ', ' + ITEM % 2 + ']'
+    stream = JsonObjectStream()
+    objects = []
+    for i in range(0, len(text), 7):
+        objects.extend(stream.feed(text[i:i + 7]))
+    assert [item['id'] for item in objects] == [1, 2]
+    # Braces inside strings do not open objects
+    assert objects[0]['summary'] == 'Nice {bag}'
+
+def test_fences_prose_and_wrappers_are_tolerated():
+    response = ('Here are the analyses:\n```json\n{"analyses": [' + ITEM % 1 + ',\n' + ITEM % 2 +
+                ']}\n```\nLet me know if you need more.')
+    assert sorted(parse_json_analyses(response)) == [1, 2]
+
+def test_truncated_tail_keeps_complete_items():
+    response = '[' + ITEM % 1 + ', ' + ITEM % 2 + ', {"id": 3, "summary": "Cut sh'
+    analyses = parse_json_analyses(response)
+    assert sorted(analyses) == [1, 2]
+
+def test_invalid_items_are_left_out():
+    response = ('[' + ITEM % 1 + ', {"id": 2, "summary": "x", "sentiment": "MOSTLY POSITIVE", "category": "QUALITY"}, '
+                '{"id": 3, "summary": "x", "sentiment": "negative", "category": "[DELIVERY]"}, {"id": 4, oops}]')
+    analyses = parse_json_analyses(response)
+    assert sorted(analyses) == [1, 3]
+    assert analyses[3] == {'summary': 'x', 'sentiment': 'NEGATIVE', 'category': 'DELIVERY'}
+
+def test_text_blocks():
+    response = ('**REVIEW 1:**\nSUMMARY: Soft leather\nSENTIMENT: POSITIVE\nCATEGORY: QUALITY\n\n'
+                'REVIEW 2:\nSUMMARY: Late\nSENTIMENT: NEGATIVE\nCATEGORY: DELIVERY')
+    analyses = parse_text_analyses(response)
+    assert analyses[1]['summary'] == 'Soft leather'
+    assert analyses[2] == {'summary': 'Late', 'sentiment': 'NEGATIVE', 'category': 'DELIVERY'}
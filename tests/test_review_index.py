@@ -0,0 +1,28 @@
+from fakes import make_review
+from review_index import ReviewIndex, review_fingerprint
+
+def test_fingerprint_ignores_whitespace_case_and_rating():
+    review = make_review(1)
+    same = dict(review, text='  ' + review['text'].upper().replace(' ', '\n'), rating='4', images=['x.jpg'])
+    assert review_fingerprint(same) == review_fingerprint(review)
+    assert review_fingerprint(dict(review, date='02/03/2024')) != review_fingerprint(review)
+
+def test_add_counts_duplicates():
+    index = ReviewIndex()
+    assert index.add(make_review(1)) is True
+    assert index.add(make_review(1)) is False
+    assert index.add(make_review(2)) is True
+    assert (len(index), index.duplicates) == (2, 1)
+    assert make_review(2) in index
+    assert make_review(3) not in index
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'index.json')
+    index = ReviewIndex()
+    index.add(make_review(1))
+    index.save(path)
+    loaded = ReviewIndex(path)
+    assert make_review(1) in loaded
+    assert loaded.reviews() == [make_review(1)]
+    # No temp file left behind
+    assert [path.name for path in tmp_path.iterdir()] == ['index.json']
@@ -0,0 +1,55 @@
+import os
+import scrape_cache
+from fakes import make_reviews
+from scrape_cache import ScrapeCache
+
+URL = 'https://www.jashanmal.com/products/leather-weekender-bag'
+
+def test_put_saves_reviews_and_index(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    reviews = make_reviews(7)
+    reviews[0]['analysis'] = {'sentiment': 'POSITIVE'}
+    cache.put(URL, reviews)
+
+    cached = cache.get(URL)
+    assert len(cached) == 7
+    assert 'analysis' not in cached[0]
+    assert os.path.exists(cache._path(URL, '.index.json'))
+
+    index = cache.index(URL)
+    assert len(index) == 7
+    assert all(review in index for review in reviews)
+    assert make_reviews(8)[7] not in index
+
+def test_index_rebuilt_for_old_entries(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    reviews = make_reviews(4)
+    cache.put(URL, reviews)
+    os.remove(cache._path(URL, '.index.json'))
+    assert len(cache.index(URL)) == 4
+    assert len(cache.index(URL, reviews[:2])) == 2
+
+def test_missing_url(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    assert cache.get(URL) is None
+    assert len(cache.index(URL)) == 0
+
+def test_url_variants_share_an_entry(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    cache.put(URL, make_reviews(3))
+    assert len(cache.get('https://jashanmal.com/products/leather-weekender-bag/?utm_source=mail#reviews')) == 3
+
+def test_expires_after_the_last_full_scrape(tmp_path, monkeypatch):
+    cache = ScrapeCache(str(tmp_path), max_age=60)
+    now = [1000.0]
+    monkeypatch.setattr(scrape_cache.time, 'time', lambda: now[0])
+    cache.put(URL, make_reviews(3))
+    # New reviews on top keep the entry tied to its full scrape
+    now[0] += 50
+    cache.put(URL, make_reviews(4), incremental=True)
+    assert len(cache.get(URL)) == 4
+    now[0] += 20
+    assert cache.get(URL) is None
+    # A full scrape starts the clock again
+    cache.put(URL, make_reviews(5))
+    assert len(cache.get(URL)) == 5
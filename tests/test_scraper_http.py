@@ -0,0 +1,100 @@
+import pytest
+from fakes import PRODUCT_URL, FakeSession, FakeStamped, make_review, make_reviews, use_session
+from review_index import ReviewIndex
+from scrape_cache import ScrapeCache
+from scraper import JashanmalScraper
+
+def http_scraper(stamped, engine='http', workers=1, fail_pages=()):
+    scraper = JashanmalScraper(engine=engine, workers=workers)
+    return use_session(scraper, FakeSession(stamped, fail_pages))
+
+def test_reads_every_page():
+    reviews = make_reviews(12)
+    stamped = FakeStamped(reviews)
+    assert http_scraper(stamped).scrape_reviews(PRODUCT_URL) == reviews
+    assert stamped.requested_pages == [1, 2, 3]
+
+def test_max_reviews_stops_early():
+    stamped = FakeStamped(make_reviews(12))
+    assert len(http_scraper(stamped).scrape_reviews(PRODUCT_URL, max_reviews=4)) == 4
+    assert stamped.requested_pages == [1]
+
+def test_page_without_widget():
+    stamped = FakeStamped(make_reviews(3), product_id=None)
+    assert http_scraper(stamped).scrape_reviews(PRODUCT_URL) == []
+
+def test_auto_falls_back_to_selenium(monkeypatch):
+    scraper = http_scraper(FakeStamped(make_reviews(3), product_id=None), engine='auto')
+    monkeypatch.setattr(scraper, '_scrape_reviews_selenium', lambda url, *args: ['from chrome'])
+    assert scraper.scrape_reviews(PRODUCT_URL) == ['from chrome']
+
+def test_shards_pages_across_workers():
+    reviews = make_reviews(23)
+    stamped = FakeStamped(reviews)
+    assert http_scraper(stamped, workers=3).scrape_reviews(PRODUCT_URL) == reviews
+    assert sorted(stamped.requested_pages) == [1, 2, 3, 4, 5]
+
+def test_shards_are_contiguous_runs():
+    scraper = JashanmalScraper(engine='http')
+    assert scraper._shard_pages(range(2, 9), 3) == [[2, 3, 4], [5, 6, 7], [8]]
+    assert scraper._shard_pages([], 3) == []
+
+def test_failed_shard_is_retried():
+    reviews = make_reviews(20)
+    stamped = FakeStamped(reviews)
+    assert http_scraper(stamped, workers=2, fail_pages=[3]).scrape_reviews(PRODUCT_URL) == reviews
+    # Pages 2-3 form one shard, so both are read again
+    assert sorted(stamped.requested_pages) == [1, 2, 2, 3, 4]
+
+def test_shard_failing_twice_fails_the_scrape():
+    scraper = JashanmalScraper(engine='http', workers=2)
+
+    def scrape_shard(target, pages):
+        if 4 in pages:
+            raise RuntimeError("page 4 unreachable")
+        return {page: [] for page in pages}
+
+    with pytest.raises(RuntimeError):
+        scraper._map_shards(scrape_shard, [[2, 3], [4, 5]], None)
+
+def test_duplicates_across_pages_are_dropped():
+    reviews = make_reviews(6)
+    # The widget repeats a review on the next page, with different whitespace
+    repeated = dict(reviews[2], text='  ' + reviews[2]['text'].upper())
+    stamped = FakeStamped(reviews[:5] + [repeated] + reviews[5:])
+    index = ReviewIndex()
+    assert http_scraper(stamped).scrape_reviews(PRODUCT_URL, index=index) == reviews
+    assert index.duplicates == 1
+
+def test_known_reviews_stop_the_walk():
+    reviews = make_reviews(12)
+    stamped = FakeStamped(reviews)
+    known = ReviewIndex()
+    for review in reviews[7:]:
+        known.add(review)
+    assert http_scraper(stamped).scrape_reviews(PRODUCT_URL, known=known) == reviews[:7]
+    assert stamped.requested_pages == [1, 2]
+
+def test_incremental_scrape_only_reads_new_reviews(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    reviews = make_reviews(12)
+    assert http_scraper(FakeStamped(reviews)).scrape_reviews_incremental(PRODUCT_URL, cache) == reviews
+
+    # Two new reviews on top, the walk stops on the first page
+    new = [make_review(100, rating=1, text='Arrived late.'), make_review(101)]
+    stamped = FakeStamped(new + reviews)
+    assert http_scraper(stamped).scrape_reviews_incremental(PRODUCT_URL, cache) == new + reviews
+    assert stamped.requested_pages == [1]
+    assert cache.get(PRODUCT_URL) == new + reviews
+
+    # Nothing new: the cache is answered as is
+    assert http_scraper(stamped).scrape_reviews_incremental(PRODUCT_URL, cache, max_reviews=3) == (new + reviews)[:3]
+
+def test_expired_cache_is_scraped_in_full(tmp_path):
+    cache = ScrapeCache(str(tmp_path), max_age=-1)
+    # A first scrape cut short at one page
+    cache.put(PRODUCT_URL, make_reviews(5))
+    reviews = make_reviews(12)
+    stamped = FakeStamped(reviews)
+    assert http_scraper(stamped).scrape_reviews_incremental(PRODUCT_URL, cache) == reviews
+    assert stamped.requested_pages == [1, 2, 3]
@@ -0,0 +1,80 @@
+import time
+import pytest
+from driver_pool import DriverPool
+from fakes import PRODUCT_URL, FakeBrowser, FakeStamped, make_reviews, use_browsers
+from review_index import ReviewIndex
+from scraper import CLICK_PAGE_JS, EXTRACT_PAGE_REVIEWS_JS, JashanmalScraper
+from wait_strategies import DomChangeWait
+
+def selenium_scraper(workers=1):
+    return JashanmalScraper(engine='selenium', workers=workers, pool_size=1,
+                            wait_strategy=DomChangeWait(timeout=1, poll_frequency=0.01, retry_timeout=0.01))
+
+def test_reads_every_page_through_the_paginator():
+    reviews = make_reviews(23)
+    scraper = selenium_scraper()
+    browsers = use_browsers(scraper, FakeStamped(reviews))
+    assert scraper.scrape_reviews(PRODUCT_URL) == reviews
+    assert browsers[0].visited_pages == [1, 2, 3, 4, 5]
+
+def test_max_reviews_stops_clicking():
+    scraper = selenium_scraper()
+    browsers = use_browsers(scraper, FakeStamped(make_reviews(23)))
+    assert len(scraper.scrape_reviews(PRODUCT_URL, max_reviews=7)) == 7
+    assert browsers[0].visited_pages == [1, 2]
+
+def test_known_reviews_stop_the_walk():
+    reviews = make_reviews(23)
+    known = ReviewIndex()
+    for review in reviews[8:]:
+        known.add(review)
+    scraper = selenium_scraper()
+    use_browsers(scraper, FakeStamped(reviews))
+    assert scraper.scrape_reviews(PRODUCT_URL, known=known) == reviews[:8]
+
+def test_shards_hop_to_their_first_page():
+    reviews = make_reviews(48)
+    scraper = selenium_scraper(workers=3)
+    browsers = use_browsers(scraper, FakeStamped(reviews))
+    assert scraper.scrape_reviews(PRODUCT_URL) == reviews
+    # At most one browser per worker, the paginator only links two pages
+    # ahead so the later shards hop there through the pages in between
+    assert len(browsers) <= 3
+    assert set(page for browser in browsers for page in browser.visited_pages) == set(range(1, 11))
+
+@pytest.mark.parametrize('window, unreachable', [
+    # Page 7 can't be clicked on from page 6, in the middle of a shard
+    (2, [7]),
+    # Nothing links past page 3, so the last shard never reaches page 8
+    (1, [4]),
+])
+def test_unreachable_pages_fail_the_scrape(window, unreachable):
+    scraper = selenium_scraper(workers=3)
+    use_browsers(scraper, FakeStamped(make_reviews(48)), window=window, unreachable_pages=unreachable)
+    with pytest.raises(RuntimeError):
+        scraper.scrape_reviews(PRODUCT_URL)
+
+def test_extraction_errors_fail_the_shard():
+    class BrokenBrowser(FakeBrowser):
+        def execute_script(self, script, *args):
+            if script == EXTRACT_PAGE_REVIEWS_JS and self.page == 3:
+                raise RuntimeError("no such window")
+            return super().execute_script(script, *args)
+
+    browser = BrokenBrowser(FakeStamped(make_reviews(23)))
+    scraper = selenium_scraper()
+    scraper.driver_pool = DriverPool(lambda: browser, max_size=1)
+    with pytest.raises(RuntimeError):
+        scraper._scrape_selenium_shard(PRODUCT_URL, [2, 3])
+    # The sequential walk only logs them
+    browser.get(PRODUCT_URL)
+    browser.execute_script(CLICK_PAGE_JS, 3)
+    assert scraper._extract_reviews_from_page(browser, 3) == []
+
+def test_product_without_reviews_returns_quickly():
+    scraper = JashanmalScraper(engine='selenium', pool_size=1, wait_strategy=DomChangeWait(timeout=5))
+    browsers = use_browsers(scraper, FakeStamped([]))
+    start = time.perf_counter()
+    assert scraper.scrape_reviews(PRODUCT_URL) == []
+    assert time.perf_counter() - start < 1
+    assert browsers[0].visited_pages == [1]
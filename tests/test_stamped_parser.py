@@ -0,0 +1,57 @@
+import json
+from fakes import FakeStamped, make_review, make_reviews, product_html, widget_html
+from stamped_parser import (
+    extract_widget_html, parse_reviews, parse_total_reviews, parse_widget_config, widget_page_params
+)
+
+PAGE_URL = 'https://www.jashanmal.com/products/leather-weekender-bag'
+
+def test_widget_config_from_product_page():
+    widget = parse_widget_config(product_html(api_key='pubkey-abc', store_id='98765'), PAGE_URL)
+    assert widget['product_id'] == '7301234567890'
+    assert widget['product_name'] == 'Leather Weekender Bag'
+    assert widget['api_key'] == 'pubkey-abc'
+    assert widget['store_id'] == '98765'
+    assert widget['store_url'] == 'jashanmal-uae.myshopify.com'
+
+    params = widget_page_params(widget, 3)
+    assert params['page'] == 3
+    assert params['sId'] == '98765'
+    assert params['productId'] == '7301234567890'
+
+def test_widget_config_missing():
+    assert parse_widget_config('<html><body>No widget</body></html>', PAGE_URL) is None
+
+def test_reviews_from_widget_page():
+    reviews = [
+        make_review(1),
+        dict(make_review(2, rating=2), verified=False),
+        dict(make_review(3, rating=4), images=['https://ik.imagekit.io/stamped/tr:h-180/1.jpg?v=3']),
+    ]
+    html = widget_html(reviews, 42)
+    assert parse_total_reviews(html) == 42
+
+    parsed = parse_reviews(html)
+    assert [review['rating'] for review in parsed] == ['5', '2', '4']
+    assert parsed[0] == reviews[0]
+    assert parsed[1]['verified'] is False
+    # Query strings dropped, high resolution rendition requested
+    assert parsed[2]['images'] == ['https://ik.imagekit.io/stamped/tr:h-800/1.jpg']
+
+def test_reviews_without_text_are_skipped():
+    assert parse_reviews(widget_html([dict(make_review(1), text='')], 1)) == []
+
+def test_total_reviews_from_summary_text():
+    html = '<span class="stamped-summary-text">Based on 17 Reviews</span>'
+    assert parse_total_reviews(html) == 17
+    assert parse_total_reviews('<div></div>') == 0
+
+def test_pages_past_the_end_are_empty():
+    stamped = FakeStamped(make_reviews(12))
+    assert [len(parse_reviews(stamped.page(page))) for page in range(1, 5)] == [5, 5, 2, 0]
+
+def test_extract_widget_html():
+    assert extract_widget_html(json.dumps({'widget': '<div>a</div>'})) == '<div>a</div>'
+    assert extract_widget_html(json.dumps({'html': '<div>b</div>'})) == '<div>b</div>'
+    assert extract_widget_html('<div>c</div>') == '<div>c</div>'
+    assert extract_widget_html('[]') == ''
@@ -0,0 +1,78 @@
+import time
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from wait_strategies import DomChangeWait, FixedSleepWait, MutationObserverWait, get_wait_strategy
+
+class FakeDriver:
+    # `markers` is the first review id seen on each execute_script call, the
+    # last one repeating. `present` says whether reviews are rendered at all.
+    def __init__(self, markers=(None,), present=True):
+        self.markers = list(markers)
+        self.present = present
+        self.script_calls = 0
+
+    def execute_script(self, script, *args):
+        self.script_calls += 1
+        return self.markers.pop(0) if len(self.markers) > 1 else self.markers[0]
+
+    def find_element(self, by, value):
+        if not self.present:
+            raise NoSuchElementException(value)
+        return object()
+
+def test_get_wait_strategy():
+    assert isinstance(get_wait_strategy('dom'), DomChangeWait)
+    assert isinstance(get_wait_strategy('mutation'), MutationObserverWait)
+    custom = FixedSleepWait(0, 0, 0)
+    assert get_wait_strategy(custom) is custom
+    with pytest.raises(ValueError):
+        get_wait_strategy('sleepy')
+
+def test_page_change_returns_once_the_first_review_changes():
+    wait = DomChangeWait(timeout=2, poll_frequency=0.01)
+    driver = FakeDriver(['review-1', 'review-1', 'review-6'])
+    start = time.perf_counter()
+    assert wait.wait_for_page_change(driver, 'review-1') is True
+    assert time.perf_counter() - start < 1
+    assert driver.script_calls == 3
+
+def test_page_change_times_out_when_nothing_changes():
+    wait = DomChangeWait(timeout=0.05, poll_frequency=0.01)
+    assert wait.wait_for_page_change(FakeDriver(['review-1']), 'review-1') is False
+
+def test_page_marker_survives_script_errors():
+    class BrokenDriver(FakeDriver):
+        def execute_script(self, script, *args):
+            raise RuntimeError("no such window")
+    assert DomChangeWait().page_marker(BrokenDriver()) is None
+    assert DomChangeWait().page_marker(FakeDriver(['review-1'])) == 'review-1'
+
+def test_wait_for_load_returns_as_soon_as_reviews_render():
+    start = time.perf_counter()
+    DomChangeWait(timeout=5).wait_for_load(FakeDriver())
+    assert time.perf_counter() - start < 1
+
+def test_wait_for_load_returns_once_the_widget_renders_without_reviews():
+    class EmptyWidgetDriver(FakeDriver):
+        def find_element(self, by, value):
+            if value == '.stamped-review':
+                raise NoSuchElementException(value)
+            return object()
+
+    start = time.perf_counter()
+    DomChangeWait(timeout=5).wait_for_load(EmptyWidgetDriver())
+    assert time.perf_counter() - start < 1
+
+def test_mutation_observer_wait_uses_async_script():
+    class AsyncDriver(FakeDriver):
+        def set_script_timeout(self, seconds):
+            self.script_timeout = seconds
+
+        def execute_async_script(self, script, marker, timeout_ms):
+            self.async_args = (marker, timeout_ms)
+            return True
+
+    driver = AsyncDriver()
+    assert MutationObserverWait(timeout=3).wait_for_page_change(driver, 'review-1') is True
+    assert driver.async_args == ('review-1', 3000)
+    assert driver.script_timeout == 8
@@ -0,0 +1,146 @@
+import time
+
+# Identifies the first review currently rendered, used to tell one page from the next
+FIRST_REVIEW_MARKER_JS = """
+    var el = document.querySelector('.stamped-review');
+    if (!el) {
+        return null;
+    }
+    return el.getAttribute('data-review-id') || el.id || (el.textContent || '').trim().slice(0, 200);
+"""
+
+# Rendered by the Stamped widget whether or not the product has reviews
+WIDGET_RENDERED_SELECTOR = '.stamped-review, .stamped-summary-text, .stamped-container'
+
+# Resolves true as soon as the first review changes, false after the timeout
+WAIT_FOR_MARKER_CHANGE_JS = """
+    var marker = arguments[0];
+    var timeoutMs = arguments[1];
+    var done = arguments[arguments.length - 1];
+
+    function current() {
+        var el = document.querySelector('.stamped-review');
+        if (!el) {
+            return null;
+        }
+        return el.getAttribute('data-review-id') || el.id || (el.textContent || '').trim().slice(0, 200);
+    }
+
+    function changed() {
+        var now = current();
+        return now !== null && now !== marker;
+    }
+
+    if (changed()) {
+        done(true);
+        return;
+    }
+
+    var timer = null;
+    var observer = new MutationObserver(function() {
+        if (changed()) {
+            observer.disconnect();
+            clearTimeout(timer);
+            done(true);
+        }
+    });
+    observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(function() {
+        observer.disconnect();
+        done(false);
+    }, timeoutMs);
+"""
+
+class FixedSleepWait:
+    # The original fixed delays, kept as a baseline for benchmarks
+    name = 'fixed'
+
+    def __init__(self, load_delay=2, page_delay=1, retry_delay=1):
+        self.load_delay = load_delay
+        self.page_delay = page_delay
+        self.retry_delay = retry_delay
+
+    def wait_for_load(self, driver):
+        time.sleep(self.load_delay)
+
+    def page_marker(self, driver):
+        return None
+
+    def wait_for_page_change(self, driver, marker):
+        time.sleep(self.page_delay)
+        return True
+
+    def wait_before_retry(self, driver):
+        time.sleep(self.retry_delay)
+
+class DomChangeWait:
+    # Polls the DOM until the first review id differs from the one seen before the click
+    name = 'dom'
+
+    def __init__(self, timeout=10, poll_frequency=0.1, retry_timeout=2):
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.retry_timeout = retry_timeout
+
+    def wait_for_load(self, driver):
+        # Done once the widget renders, a product without reviews never shows one
+        self._wait_for(driver, WIDGET_RENDERED_SELECTOR, self.timeout)
+
+    def page_marker(self, driver):
+        try:
+            return driver.execute_script(FIRST_REVIEW_MARKER_JS)
+        except Exception:
+            return None
+
+    def wait_for_page_change(self, driver, marker):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        def changed(d):
+            current = d.execute_script(FIRST_REVIEW_MARKER_JS)
+            return current is not None and current != marker
+        try:
+            WebDriverWait(driver, self.timeout, poll_frequency=self.poll_frequency).until(changed)
+            return True
+        except TimeoutException:
+            return False
+
+    def wait_before_retry(self, driver):
+        self._wait_for(driver, '.stamped-review', self.retry_timeout)
+
+    def _wait_for(self, driver, selector, timeout):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+            )
+        except TimeoutException:
+            pass
+
+class MutationObserverWait(DomChangeWait):
+    # Lets the browser push the change through a MutationObserver instead of polling
+    name = 'mutation'
+
+    def wait_for_page_change(self, driver, marker):
+        from selenium.common.exceptions import TimeoutException
+        driver.set_script_timeout(self.timeout + 5)
+        try:
+            return bool(driver.execute_async_script(WAIT_FOR_MARKER_CHANGE_JS, marker, int(self.timeout * 1000)))
+        except TimeoutException:
+            return False
+
+WAIT_STRATEGIES = {
+    FixedSleepWait.name: FixedSleepWait,
+    DomChangeWait.name: DomChangeWait,
+    MutationObserverWait.name: MutationObserverWait,
+}
+
+def get_wait_strategy(strategy):
+    if isinstance(strategy, str):
+        if strategy not in WAIT_STRATEGIES:
+            raise ValueError(f"Unknown wait strategy '{strategy}', expected one of {', '.join(WAIT_STRATEGIES)}")
+        return WAIT_STRATEGIES[strategy]()
+    return strategy